@@ -0,0 +1,375 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import vtk
+
+import instrumentation
+from mesh_extractor import ISOSURFACE_ENGINES, MeshExtractor, configure_smp
+from volume_processor import VolumeProcessor
+from volume_renderer import VolumeRenderer
+
+
+# Same starting values as the GUI controls.
+DEFAULT_PARAMS = {
+    'gaussian_sigma': 1.0,
+    'clahe_clip_limit': 2.0,
+    'isovalue': 128.0,
+    'low_color': (0.0, 0.2, 0.4),
+    'high_color': (1.0, 0.8, 0.6),
+    'opacity': 0.3,
+    'preserve_dtype': False,
+    'isosurface_engine': 'marching_cubes',
+    'render_mode': 'mesh',
+    'image_size': (800, 600),
+    'background': (0.1, 0.1, 0.2),
+    'azimuths': (0.0,),
+    'render': True,
+    'export': True,
+    'export_format': 'ply',
+    'use_gpu': True
+}
+
+RENDER_MODES = ('mesh', 'volume', 'both')
+
+EXPORT_FORMATS = ('ply', 'obj', 'vtp')
+
+MESH_EXTENSIONS = ('.obj', '.ply')
+
+MANIFEST_HELP = """manifest format (JSON):
+  {
+    "output_dir": "batch_output",
+    "defaults": {"gaussian_sigma": 1.0, "isovalue": 128, "render_mode": "both"},
+    "jobs": [
+      {"dicom": "real_dicom", "clahe_clip_limit": 3.0},
+      {"mesh": "data/dragon.obj", "gaussian_sigma": 0.5, "high_color": [0.9, 0.9, 0.9]}
+    ]
+  }
+A plain list of jobs is accepted as well. Relative paths are resolved
+against the manifest's folder. Per-job keys override "defaults", which
+override the GUI defaults: """ + ", ".join(sorted(DEFAULT_PARAMS))
+
+
+def load_manifest(manifest_path: str, output_dir: str = None) -> list:
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    output_dir = output_dir or os.path.join(base, manifest.get('output_dir', 'batch_output'))
+    defaults = dict(DEFAULT_PARAMS, **manifest.get('defaults', {}))
+
+    jobs = []
+    names = set()
+    for index, entry in enumerate(manifest.get('jobs', [])):
+        job = dict(defaults, **entry)
+        sources = [key for key in ('dicom', 'mesh', 'obj') if key in entry]
+        if len(sources) != 1:
+            raise ValueError(f"Job {index} needs exactly one of 'dicom', 'mesh' or 'obj'")
+
+        job['kind'] = 'dicom' if sources[0] == 'dicom' else 'mesh'
+        job['source'] = os.path.join(base, entry[sources[0]])
+        if job['kind'] == 'mesh' and os.path.splitext(job['source'])[1].lower() not in MESH_EXTENSIONS:
+            raise ValueError(f"Job {index}: mesh files must be one of {MESH_EXTENSIONS}")
+        if job['render_mode'] not in RENDER_MODES:
+            raise ValueError(f"Job {index}: unknown render_mode '{job['render_mode']}', expected one of {RENDER_MODES}")
+        if job['export_format'] not in EXPORT_FORMATS:
+            raise ValueError(f"Job {index}: unknown export_format '{job['export_format']}', "
+                             f"expected one of {EXPORT_FORMATS}")
+        if job['isosurface_engine'] not in ISOSURFACE_ENGINES:
+            raise ValueError(f"Job {index}: unknown isosurface_engine '{job['isosurface_engine']}'")
+
+        name = entry.get('name') or os.path.splitext(os.path.basename(os.path.normpath(job['source'])))[0]
+        unique = name
+        suffix = 1
+        while unique in names:
+            suffix += 1
+            unique = f"{name}_{suffix}"
+        names.add(unique)
+        job['name'] = unique
+        job['output_dir'] = output_dir
+        jobs.append(job)
+
+    if not jobs:
+        raise ValueError(f"Manifest {manifest_path} contains no jobs")
+    return jobs
+
+
+def effective_isovalue(scalar_range, isovalue: float, preserve_dtype: bool) -> float:
+    # Isovalues are given on the GUI's 0-255 slider scale; with the native
+    # dtype kept they are mapped onto the data range, as the GUI does.
+    if not preserve_dtype:
+        return isovalue
+    low, high = scalar_range
+    return low + (high - low) * isovalue / 255.0
+
+
+def timed(timings: dict, stage: str, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+    return result
+
+
+def render_snapshots(props: list, base_path: str, job: dict) -> list:
+    renderer = vtk.vtkRenderer()
+    renderer.SetBackground(*job['background'])
+    for prop in props:
+        renderer.AddViewProp(prop)
+
+    render_window = vtk.vtkRenderWindow()
+    render_window.SetOffScreenRendering(1)
+    render_window.SetSize(*job['image_size'])
+    render_window.AddRenderer(renderer)
+    renderer.ResetCamera()
+
+    paths = []
+    try:
+        previous = 0.0
+        for azimuth in job['azimuths']:
+            renderer.GetActiveCamera().Azimuth(azimuth - previous)
+            previous = azimuth
+            renderer.ResetCameraClippingRange()
+            render_window.Render()
+
+            capture = vtk.vtkWindowToImageFilter()
+            capture.SetInput(render_window)
+            capture.SetInputBufferTypeToRGB()
+            capture.ReadFrontBufferOff()
+            capture.Update()
+
+            path = base_path + ('.png' if len(job['azimuths']) == 1 else f"_az{azimuth:g}.png")
+            writer = vtk.vtkPNGWriter()
+            writer.SetFileName(path)
+            writer.SetInputConnection(capture.GetOutputPort())
+            writer.Write()
+            paths.append(path)
+    finally:
+        render_window.Finalize()
+    return paths
+
+
+def export_mesh(mesh, path: str, export_format: str, extractor: MeshExtractor) -> str:
+    if export_format == 'ply':
+        return extractor.save_ply_file(path, mesh)
+
+    writer = vtk.vtkOBJWriter() if export_format == 'obj' else vtk.vtkXMLPolyDataWriter()
+    writer.SetFileName(path)
+    writer.SetInputData(mesh)
+    if not writer.Write():
+        raise RuntimeError(f"Could not write {path}")
+    return path
+
+
+def mesh_actor(extractor: MeshExtractor, mesh, job: dict):
+    extractor.mesh_data = mesh
+    return extractor.create_mesh_actor(tuple(job['high_color']), job['opacity'])
+
+
+def run_dicom_job(job: dict, timings: dict, outputs: list) -> dict:
+    base_path = os.path.join(job['output_dir'], job['name'])
+    processor = VolumeProcessor()
+    timed(timings, 'load', processor.load_dicom_series, job['source'])
+    processed = timed(timings, 'process', processor.process_volume, gaussian_sigma=job['gaussian_sigma'],
+                      clahe_clip_limit=job['clahe_clip_limit'], preserve_dtype=job['preserve_dtype'])
+    statistics = timed(timings, 'process', processor.get_processed_statistics)
+    counts = {'voxels': int(processed.size)}
+    props = []
+
+    if job['render_mode'] in ('mesh', 'both'):
+        extractor = MeshExtractor(engine=job['isosurface_engine'])
+        extractor.numpy_to_vtk_image(processed, preserve_dtype=job['preserve_dtype'])
+        isovalue = effective_isovalue((statistics['min'], statistics['max']), job['isovalue'],
+                                      job['preserve_dtype'])
+        mesh = timed(timings, 'isosurface', extractor.extract_isosurface, isovalue)
+        if extractor.needs_smoothing():
+            mesh = timed(timings, 'smooth', extractor.smooth_mesh, mesh=mesh)
+        counts['triangles'] = mesh.GetNumberOfPolys()
+        if job['export'] and mesh.GetNumberOfPoints():
+            outputs.append(timed(timings, 'export', export_mesh, mesh,
+                                 f"{base_path}.{job['export_format']}", job['export_format'], extractor))
+        props.append(mesh_actor(extractor, mesh, job))
+
+    if job['render_mode'] in ('volume', 'both') and job['render']:
+        renderer = VolumeRenderer()
+        renderer.use_gpu = job['use_gpu']
+        renderer.numpy_to_vtk_image(processed, preserve_dtype=job['preserve_dtype'], statistics=statistics)
+        renderer.create_volume_mapper()
+        renderer.create_volume_property(low_color=tuple(job['low_color']), high_color=tuple(job['high_color']),
+                                        opacity=job['opacity'],
+                                        isovalue=effective_isovalue(renderer.data_range(), job['isovalue'],
+                                                                    job['preserve_dtype']))
+        props.append(renderer.create_volume())
+
+    if job['render'] and props:
+        outputs.extend(timed(timings, 'render', render_snapshots, props, base_path, job))
+    return counts
+
+
+def run_mesh_job(job: dict, timings: dict, outputs: list) -> dict:
+    base_path = os.path.join(job['output_dir'], job['name'])
+    extractor = MeshExtractor()
+    original = timed(timings, 'load', extractor.load_mesh_file, job['source'])
+    # Same sigma-to-iterations mapping as the GUI's mesh smoothing stage.
+    iterations = int(job['gaussian_sigma'] * 10) if job['gaussian_sigma'] > 0.1 else 0
+    mesh = timed(timings, 'smooth', extractor.smooth_mesh, iterations, 0.1, mesh=original)
+
+    if job['export']:
+        outputs.append(timed(timings, 'export', export_mesh, mesh,
+                             f"{base_path}_smoothed.{job['export_format']}", job['export_format'], extractor))
+    if job['render']:
+        outputs.extend(timed(timings, 'render', render_snapshots, [mesh_actor(extractor, mesh, job)],
+                             base_path, job))
+    return {'triangles': mesh.GetNumberOfPolys()}
+
+
+def run_job(job: dict) -> dict:
+    timings = {}
+    outputs = []
+    instrumentation.tracker.reset()
+    start = time.perf_counter()
+    try:
+        os.makedirs(job['output_dir'], exist_ok=True)
+        run = run_dicom_job if job['kind'] == 'dicom' else run_mesh_job
+        counts = run(job, timings, outputs)
+        status, error = 'done', None
+    except Exception as e:
+        counts = {}
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+    result = {
+        'name': job['name'],
+        'source': job['source'],
+        'status': status,
+        'error': error,
+        'seconds': time.perf_counter() - start,
+        'timings': timings,
+        'counts': counts,
+        'outputs': outputs,
+        'pid': os.getpid(),
+        'stages': instrumentation.tracker.summary()['stages']
+    }
+    if job.get('trace'):
+        result['trace_events'] = instrumentation.tracker.trace_events()
+    return result
+
+
+def prefer_headless_window():
+    # Without a display VTK would try X11 first and warn on every window;
+    # EGL renders offscreen directly. VTK still falls back on its own when
+    # EGL is missing, and an explicit user setting wins.
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        os.environ.setdefault('VTK_DEFAULT_OPENGL_WINDOW', 'vtkEGLRenderWindow')
+
+
+def init_worker(threads: int):
+    # Every worker runs its own VTK filters; splitting the cores between
+    # them avoids oversubscribing the SMP thread pools.
+    if threads:
+        configure_smp(threads=threads)
+
+
+def run_batch(jobs: list, workers: int = None, on_result=None) -> list:
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    results = []
+    if workers == 1:
+        for job in jobs:
+            results.append(run_job(job))
+            if on_result is not None:
+                on_result(results[-1])
+        return results
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if on_result is not None:
+                on_result(results[-1])
+
+    order = {job['name']: index for index, job in enumerate(jobs)}
+    return sorted(results, key=lambda result: order[result['name']])
+
+
+def format_result(result: dict) -> str:
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result['timings'].items())
+    if result['status'] != 'done':
+        return f"[failed] {result['name']}: {result['error']}"
+    counts = ", ".join(f"{value:,} {name}" for name, value in result['counts'].items())
+    return f"[done]   {result['name']}: {result['seconds']:.2f}s ({stages}) {counts}"
+
+
+def summarize(results: list, wall_seconds: float, workers: int) -> dict:
+    done = [result for result in results if result['status'] == 'done']
+    busy = sum(result['seconds'] for result in results)
+    stages = {}
+    for result in done:
+        for stage, seconds in result['timings'].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+    return {
+        'jobs': len(results),
+        'done': len(done),
+        'failed': len(results) - len(done),
+        'workers': workers,
+        'wall_seconds': wall_seconds,
+        'job_seconds': busy,
+        'jobs_per_minute': len(done) / wall_seconds * 60.0 if wall_seconds > 0 else 0.0,
+        'parallel_speedup': busy / wall_seconds if wall_seconds > 0 else 0.0,
+        'stage_seconds': stages
+    }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the tomography pipeline headless over a manifest of "
+                                                 "DICOM folders and mesh files",
+                                     epilog=MANIFEST_HELP, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest')
+    parser.add_argument('--output-dir', default=None, help="overrides the manifest's output_dir")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--no-render', action='store_true', help="skip the PNG snapshots")
+    parser.add_argument('--no-export', action='store_true', help="skip the mesh files")
+    parser.add_argument('--summary', default=None, help="JSON report path (default: <output_dir>/batch_summary.json)")
+    parser.add_argument('--trace', metavar='PATH', default=None,
+                        help="write a Chrome trace of every job's pipeline stages")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_manifest(args.manifest, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"Invalid manifest: {e}", file=sys.stderr)
+        return 2
+    for job in jobs:
+        job['render'] = job['render'] and not args.no_render
+        job['export'] = job['export'] and not args.no_export
+        job['trace'] = bool(args.trace)
+
+    prefer_headless_window()
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(jobs)))
+    print(f"{len(jobs)} jobs on {workers} worker process{'es' if workers > 1 else ''}")
+    start = time.perf_counter()
+    results = run_batch(jobs, workers, on_result=lambda result: print(format_result(result), flush=True))
+    summary = summarize(results, time.perf_counter() - start, workers)
+
+    print(f"{summary['done']}/{summary['jobs']} jobs done in {summary['wall_seconds']:.2f}s: "
+          f"{summary['jobs_per_minute']:.1f} jobs/min, {summary['parallel_speedup']:.2f}x job time per wall time")
+    if summary['stage_seconds']:
+        print("stage totals: " + ", ".join(f"{stage} {seconds:.2f}s"
+                                           for stage, seconds in summary['stage_seconds'].items()))
+
+    if args.trace:
+        events = [event for result in results for event in result.pop('trace_events', [])]
+        print(f"trace written to {instrumentation.write_chrome_trace(args.trace, events)}")
+
+    summary_path = args.summary or os.path.join(jobs[0]['output_dir'], 'batch_summary.json')
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, 'w') as f:
+        json.dump({'summary': summary, 'results': results}, f, indent=2)
+    print(f"report written to {summary_path}")
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import SimpleITK as sitk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_volume_lod import synthetic_volume
+from volume_processor import VolumeProcessor
+
+
+def noisy_volume(size: int) -> sitk.Image:
+    rng = np.random.default_rng(0)
+    volume = synthetic_volume(size).astype(np.int16) + rng.integers(-8, 8, (size,) * 3, dtype=np.int16)
+    return sitk.GetImageFromArray(np.clip(volume, 0, 255).astype(np.uint8))
+
+
+def time_clahe(processor: VolumeProcessor, image: sitk.Image, backend: str, repeats: int) -> float:
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        processor.apply_clahe(image, 2.0, preserve_dtype=True, backend=backend)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled CLAHE vs SimpleITK AdaptiveHistogramEqualization")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[128, 256, 512])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--sitk-max-size', type=int, default=128,
+                        help="skip the SimpleITK filter above this size (it takes minutes)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        image = noisy_volume(size)
+        voxels = size ** 3
+
+        for workers in sorted(set(args.workers)):
+            processor = VolumeProcessor(clahe_workers=workers)
+            seconds = time_clahe(processor, image, 'tiled', args.repeats)
+            print(f"{size:>4}^3  tiled, {workers:>2} workers  {seconds:8.3f} s  "
+                  f"({voxels / seconds / 1e6:7.1f} Mvox/s)")
+
+        if size <= args.sitk_max_size:
+            seconds = time_clahe(VolumeProcessor(), image, 'sitk', 1)
+            print(f"{size:>4}^3  sitk                {seconds:8.3f} s  "
+                  f"({voxels / seconds / 1e6:7.1f} Mvox/s)")
+        else:
+            print(f"{size:>4}^3  sitk                 skipped (--sitk-max-size)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import SimpleITK as sitk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from volume_processor import VolumeProcessor
+
+
+def write_synthetic_series(directory: str, slices: int, size: int,
+                           spacing: tuple = (0.7, 0.7, 1.25), series_uid: str = None):
+    z, y, x = np.mgrid[0:slices, 0:size, 0:size].astype(np.float32)
+    field = (x * x + (y - size / 2) ** 2 + z) / 100.0
+    volume = (1000.0 * field / field.max()).astype(np.int16)
+
+    series_uid = series_uid or "1.2.826.0.1.3680043.2.1125." + str(int(time.time() * 1000))
+    writer = sitk.ImageFileWriter()
+    writer.KeepOriginalImageUIDOn()
+
+    for index in range(slices):
+        image = sitk.GetImageFromArray(volume[index])
+        image.SetSpacing(spacing[:2])
+        position = (0.0, 0.0, index * spacing[2])
+        tags = {
+            "0008|0060": "CT",
+            "0020|000d": series_uid + ".0",
+            "0020|000e": series_uid,
+            "0020|0013": str(index + 1),
+            "0020|0032": "\\".join(str(v) for v in position),
+            "0020|0037": "1\\0\\0\\0\\1\\0",
+            "0028|0030": f"{spacing[0]}\\{spacing[1]}",
+            "0018|0050": str(spacing[2]),
+            "0008|0018": f"{series_uid}.{index + 1}",
+        }
+        for tag, value in tags.items():
+            image.SetMetaData(tag, value)
+        writer.SetFileName(os.path.join(directory, f"slice_{index:04d}.dcm"))
+        writer.Execute(image)
+
+    return volume
+
+
+def time_load(directory: str, **kwargs) -> tuple:
+    processor = VolumeProcessor()
+    start = time.perf_counter()
+    processor.load_dicom_series(directory, **kwargs)
+    return time.perf_counter() - start, processor.volume
+
+
+def same_volume(a: sitk.Image, b: sitk.Image) -> bool:
+    return (a.GetSize() == b.GetSize()
+            and a.GetPixelID() == b.GetPixelID()
+            and np.allclose(a.GetSpacing(), b.GetSpacing())
+            and np.allclose(a.GetOrigin(), b.GetOrigin())
+            and np.allclose(a.GetDirection(), b.GetDirection())
+            and np.array_equal(sitk.GetArrayViewFromImage(a), sitk.GetArrayViewFromImage(b)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel DICOM series loading")
+    parser.add_argument('directory', nargs='?', help="DICOM series folder (synthetic if omitted)")
+    parser.add_argument('--slices', type=int, default=200)
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    directory = args.directory
+    temporary = None
+    if directory is None:
+        temporary = tempfile.mkdtemp(prefix='dicom_bench_')
+        directory = temporary
+        print(f"writing {args.slices} synthetic {args.size}x{args.size} slices to {directory}")
+        write_synthetic_series(directory, args.slices, args.size)
+
+    try:
+        serial_time, serial = time_load(directory)
+        thread_time, threaded = time_load(directory, parallel=True, workers=args.workers)
+        process_time, processed = time_load(directory, parallel=True, workers=args.workers,
+                                            use_processes=True)
+
+        print(f"volume {serial.GetSize()} {serial.GetPixelIDTypeAsString()}")
+        print(f"serial ImageSeriesReader: {serial_time:.3f} s")
+        print(f"parallel (threads):       {thread_time:.3f} s  identical={same_volume(serial, threaded)}")
+        print(f"parallel (processes):     {process_time:.3f} s  identical={same_volume(serial, processed)}")
+    finally:
+        if temporary:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import vtk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import image_bridge
+from mesh_extractor import MeshExtractor
+from volume_renderer import VolumeRenderer
+
+
+def legacy_numpy_to_vtk_image(numpy_array: np.ndarray):
+    vtk_data_array = vtk.vtkUnsignedCharArray()
+    vtk_data_array.SetNumberOfComponents(1)
+    vtk_data_array.SetNumberOfTuples(numpy_array.size)
+
+    flat_array = numpy_array.ravel(order='C')
+    for i in range(len(flat_array)):
+        vtk_data_array.SetValue(i, int(flat_array[i]))
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(numpy_array.shape[::-1])
+    image.GetPointData().SetScalars(vtk_data_array)
+    return image
+
+
+def best_of(func, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, legacy_size: int, repeats: int):
+    legacy_volume = np.random.randint(0, 256, (legacy_size,) * 3, dtype=np.uint8)
+    legacy_seconds = best_of(lambda: legacy_numpy_to_vtk_image(legacy_volume), 1)
+    legacy_per_voxel = legacy_seconds / legacy_volume.size
+    print(f"legacy per-voxel loop @ {legacy_size}^3: {legacy_seconds:.3f} s "
+          f"({legacy_per_voxel * 1e9:.1f} ns/voxel)")
+
+    renderer = VolumeRenderer()
+    extractor = MeshExtractor()
+
+    header = f"{'size':>6} {'MB':>8} {'memcpy':>10} {'bridge C':>10} {'bridge F':>10} " \
+             f"{'renderer':>10} {'extractor':>10} {'legacy est.':>12}"
+    print(header)
+    for size in sizes:
+        volume = np.random.randint(0, 256, (size,) * 3, dtype=np.uint8)
+        fortran_volume = np.asfortranarray(volume.transpose(2, 1, 0))
+        target = np.empty_like(volume)
+
+        memcpy = best_of(lambda: np.copyto(target, volume), repeats)
+        bridge_c = best_of(lambda: image_bridge.numpy_to_vtk_image(volume), repeats)
+        bridge_f = best_of(lambda: image_bridge.numpy_to_vtk_image(fortran_volume, layout='xyz'),
+                           repeats)
+        via_renderer = best_of(lambda: renderer.numpy_to_vtk_image(volume), repeats)
+        via_extractor = best_of(lambda: extractor.numpy_to_vtk_image(volume), repeats)
+
+        print(f"{size:>6} {volume.nbytes / 2**20:>8.1f} {memcpy * 1e3:>8.2f}ms "
+              f"{bridge_c * 1e3:>8.3f}ms {bridge_f * 1e3:>8.3f}ms "
+              f"{via_renderer * 1e3:>8.3f}ms {via_extractor * 1e3:>8.3f}ms "
+              f"{legacy_per_voxel * volume.size:>11.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy to vtkImageData conversion benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256, 512])
+    parser.add_argument('--legacy-size', type=int, default=48)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_size, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import volume_stats
+from image_bridge import image_array_view
+from mesh_extractor import ISOSURFACE_ENGINES, MeshExtractor, configure_smp
+from volume_processor import VolumeProcessor
+
+
+def save3darray_field(size: int) -> np.ndarray:
+    # Same field as src/example_save3darray.cpp, kept as float like the original.
+    z, y, x = np.mgrid[0:size, 0:size, 0:size].astype(np.float32)
+    return (x * x + (y - size // 2) ** 2 + z) / 100.0
+
+
+def datasets(args) -> list:
+    result = []
+    for size in args.sizes:
+        field = save3darray_field(size)
+        result.append((f"save3darray {size}^3", field, float(field.max()) * 0.3))
+
+    if args.dicom and os.path.exists(args.dicom):
+        processor = VolumeProcessor()
+        processor.load_dicom_series(args.dicom)
+        array = image_array_view(processor.current_frame(processor.volume))
+        isovalue = volume_stats.otsu_threshold(processor.get_statistics())
+        result.append((f"CT {'x'.join(str(n) for n in array.shape[::-1])}", array, isovalue))
+    return result
+
+
+def time_engine(extractor: MeshExtractor, engine: str, isovalue: float, repeats: int) -> tuple:
+    best = None
+    triangles = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        mesh = extractor.extract_isosurface(isovalue, engine=engine)
+        elapsed = time.perf_counter() - start
+        triangles = mesh.GetNumberOfPolys()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, triangles
+
+
+def main():
+    default_dicom = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'real_dicom')
+    parser = argparse.ArgumentParser(description="Isosurface engine benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 128, 256])
+    parser.add_argument('--dicom', default=default_dicom)
+    parser.add_argument('--engines', nargs='+', default=list(ISOSURFACE_ENGINES), choices=ISOSURFACE_ENGINES)
+    parser.add_argument('--backend', default='STDThread',
+                        help="VTK SMP backend (Sequential, STDThread, TBB, OpenMP)")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"SMP backend: {configure_smp(args.backend)['backend']}")
+    for name, array, isovalue in datasets(args):
+        extractor = MeshExtractor()
+        extractor.numpy_to_vtk_image(array, preserve_dtype=True)
+        print(f"{name}, isovalue {isovalue:g}")
+
+        for engine in args.engines:
+            for threads in sorted(set(args.threads)):
+                configure_smp(threads=threads)
+                seconds, triangles = time_engine(extractor, engine, isovalue, args.repeats)
+                print(f"  {engine:<15} {threads:>2} threads  {seconds * 1e3:9.1f} ms  "
+                      f"{triangles:>9} tris  {triangles / seconds / 1e6:7.2f} Mtri/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_isosurface import save3darray_field
+from vtk.util import numpy_support
+
+from image_bridge import image_array_view
+from mesh_extractor import MeshExtractor, configure_smp
+from volume_processor import VolumeProcessor
+
+
+def datasets(args) -> list:
+    result = [(f"save3darray {size}^3", save3darray_field(size)) for size in args.sizes]
+    if args.dicom and os.path.exists(args.dicom):
+        processor = VolumeProcessor()
+        processor.load_dicom_series(args.dicom)
+        array = image_array_view(processor.current_frame(processor.volume))
+        result.append((f"CT {'x'.join(str(n) for n in array.shape[::-1])}", array))
+    return result
+
+
+def sweep(extractor: MeshExtractor, isovalues: np.ndarray, engine: str, use_index: bool) -> tuple:
+    meshes = []
+    start = time.perf_counter()
+    for isovalue in isovalues:
+        meshes.append(extractor.extract_isosurface(float(isovalue), engine=engine, use_index=use_index))
+    return time.perf_counter() - start, meshes
+
+
+def vertices(mesh) -> np.ndarray:
+    # Points with their normals, in an order that does not depend on how
+    # the mesh was assembled; seam points are merged within a tolerance, so
+    # positions are rounded before sorting.
+    if mesh.GetNumberOfPoints() == 0:
+        return np.zeros((0, 6))
+    points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()).astype(np.float64)
+    normals = numpy_support.vtk_to_numpy(mesh.GetPointData().GetNormals()).astype(np.float64)
+    order = np.lexsort(np.round(points, 3).T[::-1])
+    return np.hstack([points, normals])[order]
+
+
+def same_meshes(full: list, indexed: list) -> bool:
+    for a, b in zip(full, indexed):
+        if a.GetNumberOfPolys() != b.GetNumberOfPolys() or a.GetNumberOfPoints() != b.GetNumberOfPoints():
+            return False
+        if not np.allclose(vertices(a), vertices(b), atol=1e-4):
+            return False
+    return True
+
+
+def main():
+    default_dicom = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'real_dicom')
+    parser = argparse.ArgumentParser(description="Isovalue sweep with and without the brick index")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[128, 256])
+    parser.add_argument('--dicom', default=default_dicom)
+    parser.add_argument('--engines', nargs='+', default=['marching_cubes', 'flying_edges'],
+                        choices=['marching_cubes', 'flying_edges'])
+    parser.add_argument('--steps', type=int, default=20, help="isovalues across the data range")
+    parser.add_argument('--brick-size', type=int, default=16)
+    parser.add_argument('--backend', default='STDThread')
+    args = parser.parse_args()
+
+    print(f"SMP backend: {configure_smp(args.backend)['backend']}")
+    for name, array in datasets(args):
+        low, high = float(array.min()), float(array.max())
+        isovalues = np.linspace(low, high, args.steps + 2)[1:-1]
+
+        extractor = MeshExtractor()
+        extractor.numpy_to_vtk_image(array, preserve_dtype=True)
+        index = extractor.build_brick_index(args.brick_size)
+        active = np.mean([len(extractor.active_bricks(isovalue)) for isovalue in isovalues]) / index['bricks']
+        print(f"{name}: {index['bricks']} bricks indexed in {index['seconds'] * 1e3:.1f} ms, "
+              f"{active:.1%} active on average")
+
+        for engine in args.engines:
+            full_seconds, full_meshes = sweep(extractor, isovalues, engine, False)
+            index_seconds, index_meshes = sweep(extractor, isovalues, engine, True)
+            print(f"  {engine:<15} full {full_seconds / args.steps * 1e3:8.1f} ms/iso  "
+                  f"indexed {index_seconds / args.steps * 1e3:8.1f} ms/iso  "
+                  f"x{full_seconds / index_seconds:4.2f}  "
+                  f"{'same' if same_meshes(full_meshes, index_meshes) else 'DIFFERENT'} points and normals")
+
+
+if __name__ == '__main__':
+    main()
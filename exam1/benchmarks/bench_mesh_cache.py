@@ -0,0 +1,103 @@
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mesh_cache import MeshCache
+from mesh_extractor import MeshExtractor, read_obj
+from ply_io import read_ply
+
+
+READERS = {'.obj': read_obj, '.ply': read_ply}
+
+
+def best_time(function, repeats: int) -> tuple:
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def touch(mesh) -> vtk.vtkPolyData:
+    # Reading every point and cell pulls the mapped pages in, which is what
+    # the first render does anyway.
+    mesh.GetBounds()
+    numpy_support.vtk_to_numpy(mesh.GetPolys().GetConnectivityArray()).max()
+    return mesh
+
+
+def same_mesh(a, b) -> bool:
+    if not np.array_equal(numpy_support.vtk_to_numpy(a.GetPoints().GetData()),
+                          numpy_support.vtk_to_numpy(b.GetPoints().GetData())):
+        return False
+    for name in ('GetVerts', 'GetLines', 'GetPolys', 'GetStrips'):
+        ca, cb = getattr(a, name)(), getattr(b, name)()
+        if not (np.array_equal(numpy_support.vtk_to_numpy(ca.GetOffsetsArray()),
+                               numpy_support.vtk_to_numpy(cb.GetOffsetsArray())) and
+                np.array_equal(numpy_support.vtk_to_numpy(ca.GetConnectivityArray()),
+                               numpy_support.vtk_to_numpy(cb.GetConnectivityArray()))):
+            return False
+    for da, db in ((a.GetPointData(), b.GetPointData()), (a.GetCellData(), b.GetCellData())):
+        if da.GetNumberOfArrays() != db.GetNumberOfArrays():
+            return False
+        for index in range(da.GetNumberOfArrays()):
+            if not np.array_equal(numpy_support.vtk_to_numpy(da.GetArray(index)),
+                                  numpy_support.vtk_to_numpy(db.GetArray(index))):
+                return False
+    return (a.GetPointData().GetNormals() is None) == (b.GetPointData().GetNormals() is None)
+
+
+def main():
+    data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    parser = argparse.ArgumentParser(description="Parsing mesh files vs loading the memory-mapped binary cache")
+    parser.add_argument('files', nargs='*', help="OBJ/PLY files (everything under exam1/data if omitted)")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    files = args.files or sorted(path for path in glob.glob(os.path.join(data, '**', '*'), recursive=True)
+                                 if os.path.splitext(path)[1].lower() in READERS)
+    cache_dir = tempfile.mkdtemp(prefix='mesh_cache_bench_')
+    try:
+        cache = MeshCache(cache_dir)
+        total_parse = 0.0
+        total_cached = 0.0
+        for path in files:
+            read = READERS[os.path.splitext(path)[1].lower()]
+            parse_seconds, parsed = best_time(lambda: touch(MeshExtractor().read_mesh_file(path, read)),
+                                              args.repeats)
+
+            cache.remove(path)
+            extractor = MeshExtractor(mesh_cache=cache)
+            start = time.perf_counter()
+            extractor.read_mesh_file(path, read)
+            first_seconds = time.perf_counter() - start
+
+            cached_seconds, cached = best_time(lambda: touch(extractor.read_mesh_file(path, read)),
+                                               args.repeats)
+            total_parse += parse_seconds
+            total_cached += cached_seconds
+            print(f"{os.path.relpath(path, data):32s} {os.path.getsize(path) / 1024.0:8.0f} KB  "
+                  f"{parsed.GetNumberOfPoints():>8,} pts  parse {parse_seconds * 1e3:7.2f} ms  "
+                  f"first load {first_seconds * 1e3:7.2f} ms  cached {cached_seconds * 1e3:6.2f} ms  "
+                  f"({parse_seconds / cached_seconds:5.1f}x)  identical={same_mesh(parsed, cached)}")
+
+        print(f"total: parse {total_parse * 1e3:.1f} ms, cached {total_cached * 1e3:.1f} ms; "
+              f"cache {cache.stats()['size_mb']:.2f} MB for {cache.stats()['entries']} files")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_isosurface import save3darray_field
+from bench_volume_lod import report
+from gui_interface import VTKWidget
+from mesh_extractor import MESH_LOD_FRACTIONS, MeshExtractor
+
+
+def load_mesh(args) -> tuple:
+    extractor = MeshExtractor()
+    if args.obj:
+        extractor.load_obj_file(args.obj)
+        return extractor, os.path.basename(args.obj)
+
+    field = save3darray_field(args.size)
+    extractor.numpy_to_vtk_image(field, preserve_dtype=True)
+    extractor.extract_isosurface(float(field.max()) * 0.3)
+    return extractor, f"save3darray {args.size}^3 isosurface"
+
+
+def measure(widget: VTKWidget, frames: int, update_rate: float) -> tuple:
+    widget.render_window.SetDesiredUpdateRate(update_rate)
+    times = []
+    levels = []
+    for _ in range(frames):
+        widget.renderer.GetActiveCamera().Azimuth(5)
+        start = time.perf_counter()
+        widget.render_window.Render()
+        times.append(time.perf_counter() - start)
+        levels.append(widget.mesh_lod['level'])
+    return times[1:], levels[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesh decimation pyramid and interaction-time LOD benchmark")
+    parser.add_argument('--size', type=int, default=384, help="synthetic volume size when no --obj is given")
+    parser.add_argument('--obj', default=None)
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--target-fps', type=float, default=10.0)
+    args = parser.parse_args()
+
+    extractor, name = load_mesh(args)
+    print(f"{name}: {extractor.mesh_data.GetNumberOfPolys():,} triangles")
+
+    start = time.perf_counter()
+    pyramid = extractor.build_mesh_pyramid()
+    print(f"pyramid {MESH_LOD_FRACTIONS} built in {time.perf_counter() - start:.2f} s: "
+          f"{', '.join(f'{level.GetNumberOfPolys():,}' for level in pyramid) or 'skipped (small mesh)'}")
+
+    widget = VTKWidget()
+    widget.render_window.SetOffScreenRendering(1)
+    widget.render_window.SetSize(512, 512)
+    actor = extractor.create_mesh_actor()
+    widget.add_actor(actor)
+
+    widget.set_mesh_lods(actor, [])
+    report("full mesh, still", measure(widget, args.frames, 0.001)[0])
+    report(f"full mesh, {args.target_fps:g} fps", measure(widget, args.frames, args.target_fps)[0])
+
+    widget.set_mesh_lods(actor, pyramid)
+    times, levels = measure(widget, args.frames, args.target_fps)
+    report(f"LOD, {args.target_fps:g} fps", times)
+    print(f"  levels used: {sorted(set(levels))}")
+    report("LOD, still", measure(widget, args.frames, 0.001)[0])
+
+
+if __name__ == '__main__':
+    main()
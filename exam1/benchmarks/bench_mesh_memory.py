@@ -0,0 +1,102 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+import vtk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_isosurface import save3darray_field
+from memory_usage import PeakMemory
+from mesh_extractor import MeshExtractor
+
+
+def deep_copy_apply(original, iterations: int):
+    # What load_obj_data and the old obj_smooth stage did on every Apply.
+    copy = vtk.vtkPolyData()
+    copy.DeepCopy(original)
+    smoother = vtk.vtkSmoothPolyDataFilter()
+    smoother.SetInputData(copy)
+    smoother.SetNumberOfIterations(iterations)
+    smoother.SetRelaxationFactor(0.1)
+    smoother.Update()
+    return smoother.GetOutput()
+
+
+def mesh_files(args, directory: str) -> list:
+    data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    files = [os.path.join(data, 'dragon_recon', 'dragon_vrip_res3.ply')]
+    for size in args.sizes:
+        extractor = MeshExtractor()
+        field = save3darray_field(size)
+        extractor.numpy_to_vtk_image(field, preserve_dtype=True)
+        path = os.path.join(directory, f'save3darray_{size}.ply')
+        extractor.save_ply_file(path, extractor.extract_isosurface(float(field.max()) * 0.3))
+        files.append(path)
+    return files
+
+
+def run_apply_sequence(path: str, copy_on_write: bool, steps: list, queue):
+    extractor = MeshExtractor()
+    peaks = []
+    with PeakMemory() as peak:
+        original = extractor.load_mesh_file(path)
+        if not copy_on_write:
+            kept = vtk.vtkPolyData()
+            kept.DeepCopy(original)
+            original = kept
+    peaks.append(peak.peak_mb)
+
+    shared = own = 0.0
+    for iterations in steps:
+        with PeakMemory() as peak:
+            if copy_on_write:
+                result = extractor.smooth_mesh(iterations, 0.1, mesh=original)
+            else:
+                result = deep_copy_apply(original, iterations)
+        peaks.append(peak.peak_mb)
+        sharing = extractor.get_sharing_info(result)
+        shared, own = sharing['shared_mb'], sharing['unique_mb']
+    queue.put((peaks, peak.exact, shared, own, extractor.original_intact()))
+
+
+def measure(*args) -> tuple:
+    # A fresh process per variant, so neither profits from heap pages the
+    # other already grew.
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=run_apply_sequence, args=args + (queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory per Apply: deep copies vs copy-on-write meshes")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[384])
+    parser.add_argument('--steps', type=int, nargs='+', default=[10, 15, 20, 15])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='mesh_memory_bench_')
+    try:
+        for path in mesh_files(args, directory):
+            extractor = MeshExtractor()
+            extractor.load_mesh_file(path)
+            print(f"{os.path.basename(path)}: mesh arrays {extractor.get_sharing_info()['original_mb']:.1f} MB")
+            for name, copy_on_write in (('deep copies', False), ('copy-on-write', True)):
+                peaks, exact, shared, own, intact = measure(path, copy_on_write, args.steps)
+                applies = "  ".join(f"{steps}:+{peak:.1f}" for steps, peak in zip(args.steps, peaks[1:]))
+                print(f"  {name:14s} load +{peaks[0]:6.1f} MB   Apply peaks (MB) {applies}   "
+                      f"result {shared:.1f} MB shared / {own:.1f} MB own"
+                      f"{'' if exact else '   [process peak growth only]'}"
+                      f"{'' if intact else '   ORIGINAL MODIFIED'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_isosurface import save3darray_field
+from mesh_extractor import MeshExtractor
+
+
+def meshes(args) -> list:
+    result = []
+    for path in args.obj:
+        result.append((os.path.basename(path), MeshExtractor().load_obj_file(path)))
+    for size in args.sizes:
+        extractor = MeshExtractor()
+        field = save3darray_field(size)
+        extractor.numpy_to_vtk_image(field, preserve_dtype=True)
+        result.append((f"save3darray {size}^3 isosurface", extractor.extract_isosurface(float(field.max()) * 0.3)))
+    return result
+
+
+def vtk_smooth(mesh, iterations: int):
+    # What the GUI used to do on every Apply.
+    copy = vtk.vtkPolyData()
+    copy.DeepCopy(mesh)
+    smoother = vtk.vtkSmoothPolyDataFilter()
+    smoother.SetInputData(copy)
+    smoother.SetNumberOfIterations(iterations)
+    smoother.SetRelaxationFactor(0.1)
+    smoother.Update()
+    return smoother.GetOutput()
+
+
+def main():
+    data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    parser = argparse.ArgumentParser(description="Cached incremental smoothing vs rerunning vtkSmoothPolyDataFilter")
+    parser.add_argument('--obj', nargs='*', default=[os.path.join(data, 'dragon.obj')])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[256])
+    parser.add_argument('--steps', type=int, nargs='+', default=[10, 15, 20, 25, 30, 25, 20],
+                        help="iteration counts in the order a user would pick them")
+    args = parser.parse_args()
+
+    for name, mesh in meshes(args):
+        print(f"{name}: {mesh.GetNumberOfPoints():,} points")
+        extractor = MeshExtractor()
+        vtk_total = 0.0
+        cached_total = 0.0
+        worst = 0.0
+        for iterations in args.steps:
+            start = time.perf_counter()
+            reference = vtk_smooth(mesh, iterations)
+            vtk_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            smoothed = extractor.smooth_mesh(iterations, 0.1, mesh=mesh)
+            cached_seconds = time.perf_counter() - start
+
+            vtk_total += vtk_seconds
+            cached_total += cached_seconds
+            difference = np.abs(numpy_support.vtk_to_numpy(reference.GetPoints().GetData()) -
+                                numpy_support.vtk_to_numpy(smoothed.GetPoints().GetData())).max()
+            worst = max(worst, difference)
+            print(f"  {iterations:>3} iterations  vtk rerun {vtk_seconds * 1e3:8.1f} ms  "
+                  f"cached {cached_seconds * 1e3:8.1f} ms")
+
+        size = max(mesh.GetLength(), 1e-12)
+        print(f"  total: vtk {vtk_total * 1e3:.1f} ms, cached {cached_total * 1e3:.1f} ms, "
+              f"max difference {worst / size:.1e} of the mesh size")
+
+
+if __name__ == '__main__':
+    main()
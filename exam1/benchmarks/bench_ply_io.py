@@ -0,0 +1,121 @@
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_isosurface import save3darray_field
+from bench_mesh_cache import best_time, same_mesh
+from mesh_extractor import MeshExtractor
+from ply_io import read_ply, write_ply_mesh
+
+
+def vtk_read(path: str) -> vtk.vtkPolyData:
+    reader = vtk.vtkPLYReader()
+    reader.SetFileName(path)
+    reader.Update()
+    return reader.GetOutput()
+
+
+def vtk_write(path: str, mesh, file_format: str):
+    writer = vtk.vtkPLYWriter()
+    writer.SetInputData(mesh)
+    writer.SetFileName(path)
+    if file_format == 'ascii':
+        writer.SetFileTypeToASCII()
+    else:
+        writer.SetFileTypeToBinary()
+        if file_format == 'binary_big_endian':
+            writer.SetDataByteOrderToBigEndian()
+        else:
+            writer.SetDataByteOrderToLittleEndian()
+    writer.Write()
+
+
+def shipped_files(data: str) -> list:
+    return sorted(glob.glob(os.path.join(data, '**', '*.ply'), recursive=True))
+
+
+def mixed_mesh(faces: int) -> vtk.vtkPolyData:
+    # Alternating triangles and quads: every face record has a different
+    # size from its neighbour, the worst case for the binary scan.
+    rng = np.random.default_rng(0)
+    sizes = np.where(np.arange(faces) % 2 == 0, 3, 4)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    connectivity = rng.integers(0, 2 * faces, size=offsets[-1])
+    cells = vtk.vtkCellArray()
+    cells.SetData(numpy_support.numpy_to_vtk(offsets, deep=1, array_type=vtk.VTK_ID_TYPE),
+                  numpy_support.numpy_to_vtk(connectivity, deep=1, array_type=vtk.VTK_ID_TYPE))
+    points = vtk.vtkPoints()
+    points.SetData(numpy_support.numpy_to_vtk(rng.random((2 * faces, 3)).astype(np.float32), deep=1))
+    mesh = vtk.vtkPolyData()
+    mesh.SetPoints(points)
+    mesh.SetPolys(cells)
+    return mesh
+
+
+def meshes(args, data: str) -> list:
+    result = [(os.path.relpath(path, data), vtk_read(path)) for path in shipped_files(data)]
+    for size in args.sizes:
+        extractor = MeshExtractor()
+        field = save3darray_field(size)
+        extractor.numpy_to_vtk_image(field, preserve_dtype=True)
+        result.append((f"save3darray {size}^3 isosurface", extractor.extract_isosurface(float(field.max()) * 0.3)))
+    for faces in args.mixed:
+        result.append((f"{faces:,} alternating triangles/quads", mixed_mesh(faces)))
+    return result
+
+
+def main():
+    data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    parser = argparse.ArgumentParser(description="Vectorized PLY reading/writing vs vtkPLYReader/vtkPLYWriter")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[256])
+    parser.add_argument('--mixed', type=int, nargs='*', default=[40000],
+                        help="face counts of alternating triangle/quad meshes")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ply_bench_')
+    try:
+        for path in shipped_files(data):
+            vtk_seconds, expected = best_time(lambda: vtk_read(path), args.repeats)
+            ply_seconds, loaded = best_time(lambda: read_ply(path), args.repeats)
+            print(f"{os.path.relpath(path, data)} as shipped: vtkPLYReader {vtk_seconds * 1e3:.2f} ms, "
+                  f"read_ply {ply_seconds * 1e3:.2f} ms ({vtk_seconds / ply_seconds:.1f}x)  "
+                  f"identical={same_mesh(expected, loaded)}")
+
+        # VTK writes ASCII floats with 17 significant digits, which makes its
+        # rewritten files much slower to parse than the shipped ones.
+        path = os.path.join(directory, 'mesh.ply')
+        for name, mesh in meshes(args, data):
+            points = mesh.GetNumberOfPoints()
+            print(f"{name}: {points:,} points, {mesh.GetNumberOfPolys():,} faces")
+            for file_format in ('ascii', 'binary_little_endian', 'binary_big_endian'):
+                vtk_write(path, mesh, file_format)
+                vtk_seconds, expected = best_time(lambda: vtk_read(path), args.repeats)
+                ply_seconds, loaded = best_time(lambda: read_ply(path), args.repeats)
+                print(f"  read  {file_format:22s} {os.path.getsize(path) / 1024.0 ** 2:7.2f} MB  "
+                      f"vtkPLYReader {vtk_seconds * 1e3:8.2f} ms  read_ply {ply_seconds * 1e3:8.2f} ms  "
+                      f"({vtk_seconds / ply_seconds:4.1f}x, {points / ply_seconds / 1e6:5.1f} M points/s)  "
+                      f"identical={same_mesh(expected, loaded)}")
+
+            vtk_seconds, _ = best_time(lambda: vtk_write(path, mesh, 'binary_little_endian'), args.repeats)
+            ply_seconds, _ = best_time(lambda: write_ply_mesh(path, mesh), args.repeats)
+            written = vtk_read(path)
+            same = np.array_equal(numpy_support.vtk_to_numpy(written.GetPolys().GetConnectivityArray()),
+                                  numpy_support.vtk_to_numpy(mesh.GetPolys().GetConnectivityArray()))
+            print(f"  write binary_little_endian          vtkPLYWriter {vtk_seconds * 1e3:8.2f} ms  "
+                  f"write_ply {ply_seconds * 1e3:8.2f} ms  ({vtk_seconds / ply_seconds:4.1f}x)  readable={same}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import vtk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mesh_extractor import MeshExtractor
+
+
+def write_field(path: str, size: int) -> float:
+    # The save3darray field, written plane by plane so the benchmark itself
+    # never holds the volume.
+    volume = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(size,) * 3)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    plane = x * x + (y - size // 2) ** 2
+    for z in range(size):
+        volume[z] = (plane + z) / 100.0
+    volume.flush()
+    del volume
+    return float((size - 1) ** 2 + (size // 2) ** 2 + size - 1) / 100.0 * 0.3
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux and bytes on macOS.
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_in_memory(path: str, output: str, isovalue: float, queue):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    extractor = MeshExtractor()
+    extractor.numpy_to_vtk_image(np.load(path), preserve_dtype=True)
+    mesh = extractor.extract_isosurface(isovalue)
+    writer = vtk.vtkPLYWriter()
+    writer.SetInputData(mesh)
+    writer.SetFileName(output)
+    writer.SetFileTypeToBinary()
+    writer.Write()
+    queue.put((time.perf_counter() - start, peak_rss_mb() - baseline, mesh.GetNumberOfPolys()))
+
+
+def run_streaming(path: str, output: str, isovalue: float, budget: float, queue):
+    baseline = peak_rss_mb()
+    info = MeshExtractor().extract_isosurface_out_of_core(np.load(path, mmap_mode='r'), output, isovalue,
+                                                          memory_budget_mb=budget)
+    queue.put((info['seconds'], peak_rss_mb() - baseline, info['triangles']))
+
+
+def measure(target, *args) -> tuple:
+    # Each run gets a fresh process so its peak RSS is its own.
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=target, args=args + (queue,))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slab-streamed vs in-memory isosurface extraction")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[256, 384])
+    parser.add_argument('--budgets', type=float, nargs='+', default=[16.0, 64.0])
+    parser.add_argument('--skip-in-memory', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f'field_{size}.npy')
+            output = os.path.join(directory, 'mesh.ply')
+            isovalue = write_field(path, size)
+            print(f"{size}^3 float32 ({size ** 3 * 4 / 1024.0 ** 2:.0f} MB), isovalue {isovalue:g}")
+
+            if not args.skip_in_memory:
+                seconds, peak, triangles = measure(run_in_memory, path, output, isovalue)
+                print(f"  in memory            {seconds:7.2f} s  peak +{peak:7.1f} MB  {triangles} tris")
+            for budget in args.budgets:
+                seconds, peak, triangles = measure(run_streaming, path, output, isovalue, budget)
+                print(f"  streamed, {budget:5.0f} MB   {seconds:7.2f} s  peak +{peak:7.1f} MB  {triangles} tris")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import vtk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gui_interface import VTKWidget
+from volume_renderer import VolumeRenderer
+
+
+def synthetic_volume(size: int) -> np.ndarray:
+    z, y, x = np.mgrid[0:size, 0:size, 0:size].astype(np.float32)
+    field = (x * x + (y - size / 2) ** 2 + z) / 100.0
+    field = 255.0 * field / field.max()
+    return field.astype(np.uint8)
+
+
+def measure(prop, frames: int, update_rate: float) -> list:
+    render_window = vtk.vtkRenderWindow()
+    render_window.SetOffScreenRendering(1)
+    render_window.SetSize(512, 512)
+    renderer = vtk.vtkRenderer()
+    render_window.AddRenderer(renderer)
+    renderer.AddViewProp(prop)
+    renderer.ResetCamera()
+    render_window.SetDesiredUpdateRate(update_rate)
+
+    times = []
+    for _ in range(frames):
+        renderer.GetActiveCamera().Azimuth(5)
+        start = time.perf_counter()
+        render_window.Render()
+        times.append(time.perf_counter() - start)
+    return times[1:]
+
+
+def measure_lod(widget: VTKWidget, frames: int, update_rate: float) -> tuple:
+    widget.render_window.SetDesiredUpdateRate(update_rate)
+    times = []
+    levels = []
+    for _ in range(frames):
+        widget.renderer.GetActiveCamera().Azimuth(5)
+        start = time.perf_counter()
+        widget.render_window.Render()
+        times.append(time.perf_counter() - start)
+        levels.append(widget.volume_lod['level'])
+    return times[1:], levels[1:]
+
+
+def report(label: str, times: list):
+    mean = sum(times) / len(times)
+    print(f"{label:<28} mean {mean * 1e3:8.1f} ms  max {max(times) * 1e3:8.1f} ms  "
+          f"({1.0 / mean:6.1f} fps)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU ray-cast level-of-detail benchmark")
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--frames', type=int, default=20)
+    parser.add_argument('--target-fps', type=float, default=10.0)
+    parser.add_argument('--levels', type=int, default=3)
+    args = parser.parse_args()
+
+    renderer = VolumeRenderer()
+    renderer.use_gpu = False
+    renderer.numpy_to_vtk_image(synthetic_volume(args.size))
+    renderer.create_volume_mapper()
+    renderer.create_volume_property()
+    full_volume = renderer.create_volume()
+
+    start = time.perf_counter()
+    renderer.build_volume_pyramid(args.levels)
+    print(f"pyramid ({args.levels} levels) built in {time.perf_counter() - start:.3f} s")
+    lod_volume = renderer.create_lod_volume(args.levels)
+
+    report("full resolution, still", measure(full_volume, args.frames, 0.001))
+    report(f"full resolution, {args.target_fps:g} fps", measure(full_volume, args.frames, args.target_fps))
+
+    widget = VTKWidget()
+    widget.render_window.SetOffScreenRendering(1)
+    widget.render_window.SetSize(512, 512)
+    widget.add_volume(lod_volume)
+    widget.set_volume_lods(lod_volume, renderer.lod_ids)
+    times, levels = measure_lod(widget, args.frames, args.target_fps)
+    report(f"LOD prop, {args.target_fps:g} fps", times)
+    print(f"  levels used: {sorted(set(levels))}")
+    times, levels = measure_lod(widget, args.frames, 0.001)
+    report("LOD prop, still", times)
+    print(f"  levels used: {sorted(set(levels))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import SimpleITK as sitk
+import vtk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import prefer_headless_window
+from bench_dicom_load import write_synthetic_series
+from bench_isosurface import save3darray_field
+from mesh_cache import MeshCache
+from mesh_extractor import MeshExtractor
+from volume_processor import VolumeProcessor
+from volume_renderer import VolumeRenderer
+
+
+EXAM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = (64, 128, 256, 512)
+
+QUICK_SIZES = (64, 128)
+
+# A stage counts as regressed when it is this much slower than the
+# baseline and also slower by at least MIN_DELTA_MS, so sub-millisecond
+# noise on tiny inputs does not fail a run.
+REGRESSION_THRESHOLD = 0.25
+MIN_DELTA_MS = 2.0
+
+
+def measure(function, repeats: int, setup=None) -> dict:
+    # setup runs outside the timed region and hands its result to function.
+    times = []
+    result = None
+    for _ in range(repeats):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        result = function(argument) if setup is not None else function()
+        times.append(time.perf_counter() - start)
+    return {'seconds': min(times), 'median': statistics.median(times), 'repeats': repeats, 'result': result}
+
+
+def render_frames(props: list, frames: int, size: tuple = (512, 512)) -> dict:
+    renderer = vtk.vtkRenderer()
+    for prop in props:
+        renderer.AddViewProp(prop)
+    render_window = vtk.vtkRenderWindow()
+    render_window.SetOffScreenRendering(1)
+    render_window.SetSize(*size)
+    render_window.AddRenderer(renderer)
+    renderer.ResetCamera()
+
+    try:
+        start = time.perf_counter()
+        render_window.Render()
+        first = time.perf_counter() - start
+
+        times = []
+        for _ in range(frames):
+            renderer.GetActiveCamera().Azimuth(360.0 / max(frames, 1))
+            renderer.ResetCameraClippingRange()
+            start = time.perf_counter()
+            render_window.Render()
+            times.append(time.perf_counter() - start)
+    finally:
+        render_window.Finalize()
+    return {'seconds': statistics.mean(times), 'median': statistics.median(times), 'repeats': frames,
+            'first_frame': first, 'fps': 1.0 / max(statistics.mean(times), 1e-9)}
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+
+    def record(self, key: str, entry: dict, **extra):
+        entry = {name: value for name, value in entry.items() if name != 'result'}
+        entry.update(extra)
+        self.results[key] = entry
+        details = "".join(f"  {name}={value:,}" if isinstance(value, int) else
+                          f"  {name}={value:.3g}" for name, value in extra.items()
+                          if isinstance(value, (int, float)))
+        print(f"  {key:52s} {entry['seconds'] * 1e3:10.2f} ms  (median {entry['median'] * 1e3:.2f}){details}",
+              flush=True)
+
+    def wanted(self, stage: str) -> bool:
+        return not self.args.stages or any(stage.startswith(prefix) for prefix in self.args.stages)
+
+    def run_volume(self, size: int, directory: str):
+        args = self.args
+        name = f"save3darray_{size}"
+        field = save3darray_field(size)
+        print(f"{name}: {field.nbytes / 1024.0 ** 2:.0f} MB float32", flush=True)
+
+        if self.wanted('numpy_to_vtk_image'):
+            extractor = MeshExtractor()
+            renderer = VolumeRenderer()
+            self.record(f"numpy_to_vtk_image.extractor/{name}",
+                        measure(lambda: extractor.numpy_to_vtk_image(field, preserve_dtype=True), args.repeats))
+            self.record(f"numpy_to_vtk_image.extractor_uint8/{name}",
+                        measure(lambda: extractor.numpy_to_vtk_image(field), args.repeats))
+            self.record(f"numpy_to_vtk_image.renderer/{name}",
+                        measure(lambda: renderer.numpy_to_vtk_image(field, preserve_dtype=True), args.repeats))
+            del extractor, renderer
+
+        if self.wanted('load_dicom_series') and size <= args.dicom_max_size:
+            series = os.path.join(directory, name)
+            os.makedirs(series, exist_ok=True)
+            write_synthetic_series(series, size, size)
+            self.record(f"load_dicom_series/{name}",
+                        measure(lambda: VolumeProcessor().load_dicom_series(series), args.repeats),
+                        slices=size)
+            shutil.rmtree(series, ignore_errors=True)
+
+        processor = VolumeProcessor()
+        processor.volume = sitk.GetImageFromArray(field)
+        backends = [backend for backend in ('sitk', 'tiled') if self.wanted(f'apply_clahe.{backend}')
+                    and (backend != 'sitk' or size <= args.sitk_clahe_max_size)]
+        smoothed = None
+        if self.wanted('apply_gaussian_smoothing') or backends:
+            entry = measure(lambda: processor.apply_gaussian_smoothing(1.0), args.repeats)
+            smoothed = entry['result']
+            if self.wanted('apply_gaussian_smoothing'):
+                self.record(f"apply_gaussian_smoothing/{name}", entry, voxels=field.size)
+
+        for backend in backends:
+            self.record(f"apply_clahe.{backend}/{name}",
+                        measure(lambda: processor.apply_clahe(smoothed, 2.0, backend=backend), args.repeats))
+        del processor, smoothed
+        gc.collect()
+
+        isovalue = float(field.max()) * 0.3
+        mesh = None
+        needs_mesh = self.wanted('smooth_mesh') or self.wanted('render.mesh')
+        for engine in ('marching_cubes', 'flying_edges'):
+            if not self.wanted('extract_isosurface') and (mesh is not None or not needs_mesh):
+                break
+            extractor = MeshExtractor(engine=engine)
+            extractor.numpy_to_vtk_image(field, preserve_dtype=True)
+            entry = measure(lambda: extractor.extract_isosurface(isovalue), args.repeats)
+            mesh = entry['result']
+            if self.wanted('extract_isosurface'):
+                self.record(f"extract_isosurface.{engine}/{name}", entry, triangles=mesh.GetNumberOfPolys())
+            del extractor
+
+        if self.wanted('smooth_mesh') and mesh is not None:
+            # A fresh extractor per run, so the smoothing cache never answers.
+            self.record(f"smooth_mesh/{name}",
+                        measure(lambda extractor: extractor.smooth_mesh(15, 0.1, mesh=mesh), args.repeats,
+                                setup=MeshExtractor),
+                        points=mesh.GetNumberOfPoints())
+
+        if self.wanted('render.mesh') and mesh is not None:
+            extractor = MeshExtractor()
+            extractor.mesh_data = mesh
+            self.record(f"render.mesh/{name}", render_frames([extractor.create_mesh_actor()], args.frames),
+                        triangles=mesh.GetNumberOfPolys())
+
+        if self.wanted('render.volume') and size <= args.volume_render_max_size:
+            renderer = VolumeRenderer()
+            renderer.numpy_to_vtk_image(field, preserve_dtype=True)
+            renderer.create_volume_mapper()
+            renderer.create_volume_property(opacity=0.3)
+            self.record(f"render.volume/{name}", render_frames([renderer.create_volume()], args.frames))
+        del field, mesh
+        gc.collect()
+
+    def run_assets(self):
+        args = self.args
+        data = os.path.join(EXAM_DIR, 'data')
+        meshes = sorted(path for path in glob.glob(os.path.join(data, '**', '*'), recursive=True)
+                        if os.path.splitext(path)[1].lower() in ('.obj', '.ply'))
+        print(f"bundled assets: {len(meshes)} meshes", flush=True)
+
+        cache_dir = tempfile.mkdtemp(prefix='bench_mesh_cache_')
+        try:
+            for path in meshes:
+                name = os.path.relpath(path, data).replace(os.sep, '_')
+                loader = 'load_ply_file' if path.lower().endswith('.ply') else 'load_obj_file'
+                if self.wanted(loader):
+                    entry = measure(lambda: getattr(MeshExtractor(), loader)(path), args.repeats)
+                    self.record(f"{loader}/{name}", entry, points=entry['result'].GetNumberOfPoints())
+
+                if self.wanted('load_mesh_cached'):
+                    cached = MeshExtractor(mesh_cache=MeshCache(cache_dir))
+                    cached.load_mesh_file(path)
+                    self.record(f"load_mesh_cached/{name}",
+                                measure(lambda: cached.load_mesh_file(path), args.repeats))
+
+                if self.wanted('smooth_mesh') or self.wanted('render.mesh'):
+                    extractor = MeshExtractor()
+                    mesh = extractor.load_mesh_file(path)
+                    if self.wanted('smooth_mesh'):
+                        self.record(f"smooth_mesh/{name}",
+                                    measure(lambda extractor: extractor.smooth_mesh(15, 0.1, mesh=mesh),
+                                            args.repeats, setup=MeshExtractor))
+                    if self.wanted('render.mesh'):
+                        self.record(f"render.mesh/{name}", render_frames([extractor.create_mesh_actor()],
+                                                                         args.frames),
+                                    triangles=mesh.GetNumberOfPolys())
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        dicom = os.path.join(EXAM_DIR, 'real_dicom')
+        if self.wanted('load_dicom_series') and os.path.isdir(dicom):
+            self.record("load_dicom_series/real_dicom",
+                        measure(lambda: VolumeProcessor().load_dicom_series(dicom), args.repeats))
+
+    def run(self) -> dict:
+        sizes = QUICK_SIZES if self.args.quick else self.args.sizes
+        directory = tempfile.mkdtemp(prefix='bench_suite_')
+        try:
+            for size in sizes:
+                self.run_volume(size, directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        if not self.args.no_assets:
+            self.run_assets()
+        return self.results
+
+
+def environment() -> dict:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'vtk': vtk.vtkVersion.GetVTKVersion(),
+        'simpleitk': sitk.Version_VersionString(),
+        'cpu_count': os.cpu_count(),
+        'vtk_smp_backend': vtk.vtkSMPTools.GetBackend()
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> dict:
+    regressions = []
+    improvements = []
+    for key, entry in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]['seconds']
+        after = entry['seconds']
+        ratio = after / before if before > 0 else float('inf')
+        delta_ms = (after - before) * 1e3
+        row = {'key': key, 'baseline': before, 'current': after, 'ratio': ratio}
+        if ratio > 1.0 + threshold and delta_ms > min_delta_ms:
+            regressions.append(row)
+        elif ratio < 1.0 / (1.0 + threshold) and -delta_ms > min_delta_ms:
+            improvements.append(row)
+    return {
+        'regressions': regressions,
+        'improvements': improvements,
+        'missing': sorted(set(baseline) - set(results)),
+        'new': sorted(set(results) - set(baseline)),
+        'threshold': threshold,
+        'min_delta_ms': min_delta_ms
+    }
+
+
+def print_comparison(comparison: dict):
+    for title, rows in (('regressions', comparison['regressions']), ('improvements', comparison['improvements'])):
+        print(f"{len(rows)} {title} (>{comparison['threshold']:.0%} and >{comparison['min_delta_ms']:g} ms)")
+        for row in sorted(rows, key=lambda row: row['ratio'], reverse=True):
+            print(f"  {row['key']:48s} {row['baseline'] * 1e3:10.2f} -> {row['current'] * 1e3:10.2f} ms "
+                  f"({row['ratio']:.2f}x)")
+    if comparison['missing']:
+        print(f"{len(comparison['missing'])} baseline measurements not run this time")
+
+
+def write_json(path: str, document: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(document, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times every pipeline stage on synthetic save3darray volumes "
+                                                 "and the bundled assets, with baseline comparison")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--quick', action='store_true', help=f"only sizes {QUICK_SIZES}")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--frames', type=int, default=10, help="frames per rendering measurement")
+    parser.add_argument('--stages', nargs='*', default=None,
+                        help="only stages starting with these names (e.g. apply_clahe render)")
+    parser.add_argument('--no-assets', action='store_true', help="skip the bundled OBJ/PLY/DICOM files")
+    parser.add_argument('--dicom-max-size', type=int, default=256,
+                        help="largest synthetic DICOM series to write and load")
+    parser.add_argument('--sitk-clahe-max-size', type=int, default=128,
+                        help="skip the SimpleITK CLAHE above this size (it takes minutes)")
+    parser.add_argument('--volume-render-max-size', type=int, default=256,
+                        help="skip volume rendering above this size (ray casting is slow on software GL)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--save-baseline', metavar='PATH', default=None,
+                        help="also store these results as the baseline")
+    parser.add_argument('--baseline', metavar='PATH', default=None,
+                        help="compare against a stored baseline; exits with 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--min-delta-ms', type=float, default=MIN_DELTA_MS)
+    args = parser.parse_args()
+
+    prefer_headless_window()
+    started = time.perf_counter()
+    results = Suite(args).run()
+    document = {
+        'environment': environment(),
+        'arguments': vars(args),
+        'seconds': time.perf_counter() - started,
+        'results': results
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline['results'], args.threshold, args.min_delta_ms)
+        document['comparison'] = dict(comparison, baseline=args.baseline,
+                                      baseline_environment=baseline.get('environment'))
+        print_comparison(comparison)
+        status = 1 if comparison['regressions'] else 0
+
+    write_json(args.output, document)
+    print(f"{len(results)} measurements in {document['seconds']:.1f} s written to {args.output}")
+    if args.save_baseline:
+        write_json(args.save_baseline, document)
+        print(f"baseline saved to {args.save_baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import threading
+
+
+class CopyTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+
+    def record(self, stage: str, nbytes: int):
+        with self._lock:
+            self.records.append((stage, int(nbytes)))
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+
+    @property
+    def count(self) -> int:
+        return len(self.records)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(nbytes for _, nbytes in self.records)
+
+    def summary(self) -> dict:
+        with self._lock:
+            records = list(self.records)
+
+        by_stage = {}
+        for stage, nbytes in records:
+            copies, total = by_stage.get(stage, (0, 0))
+            by_stage[stage] = (copies + 1, total + nbytes)
+
+        return {
+            'copies': len(records),
+            'total_mb': sum(nbytes for _, nbytes in records) / (1024.0 * 1024.0),
+            'by_stage': by_stage
+        }
+
+
+tracker = CopyTracker()
+
+
+def record(stage: str, nbytes: int):
+    tracker.record(stage, nbytes)
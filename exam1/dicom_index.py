@@ -0,0 +1,239 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import SimpleITK as sitk
+
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'vtk_tutorial', 'dicom_index.sqlite')
+
+HEADER_TAGS = {
+    'series_uid': '0020|000e',
+    'instance_number': '0020|0013',
+    'position': '0020|0032',
+    'orientation': '0020|0037',
+    'pixel_spacing': '0028|0030',
+    'rows': '0028|0010',
+    'columns': '0028|0011',
+    'modality': '0008|0060',
+    'description': '0008|103e',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    series_uid TEXT,
+    instance_number INTEGER,
+    position_x REAL,
+    position_y REAL,
+    position_z REAL,
+    orientation TEXT,
+    pixel_spacing TEXT,
+    rows INTEGER,
+    columns INTEGER,
+    modality TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS files_series ON files (series_uid);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+"""
+
+
+def _parse_numbers(text: str) -> list:
+    try:
+        return [float(value) for value in text.strip().split('\\') if value.strip()]
+    except ValueError:
+        return []
+
+
+def subtree_clause(directory: str, recursive: bool = True) -> tuple:
+    if not recursive:
+        return "directory = ?", (directory,)
+    # A plain prefix comparison: LIKE would treat '_' and '%' in real paths
+    # as wildcards and match sibling directories.
+    prefix = os.path.join(directory, '')
+    return "(directory = ? OR substr(directory, 1, ?) = ?)", (directory, len(prefix), prefix)
+
+
+def read_header(path: str) -> dict:
+    reader = sitk.ImageFileReader()
+    reader.SetImageIO('GDCMImageIO')
+    reader.SetFileName(path)
+    reader.LoadPrivateTagsOff()
+    reader.ReadImageInformation()
+
+    header = {}
+    for name, tag in HEADER_TAGS.items():
+        header[name] = reader.GetMetaData(tag).strip() if reader.HasMetaDataKey(tag) else None
+    return header
+
+
+class DicomIndex:
+    def __init__(self, db_path: str = None):
+        self.db_path = os.path.abspath(db_path or DEFAULT_INDEX_PATH)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, directory: str, recursive: bool = True) -> dict:
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Directory {directory} not found")
+
+        directory = os.path.abspath(directory)
+        clause, args = subtree_clause(directory)
+        with self._lock:
+            known = {
+                path: (mtime_ns, size)
+                for path, mtime_ns, size in self.connection.execute(
+                    "SELECT path, mtime_ns, size FROM files WHERE " + clause, args)
+            }
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        rows = []
+        seen = set()
+
+        for root, dirs, files in os.walk(directory):
+            if not recursive:
+                dirs[:] = []
+            for name in files:
+                path = os.path.join(root, name)
+                if path.startswith(self.db_path):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(path)
+
+                # Only new or modified files get their header parsed again.
+                previous = known.get(path)
+                if previous == (stat.st_mtime_ns, stat.st_size):
+                    counts['unchanged'] += 1
+                    continue
+                counts['updated' if previous else 'added'] += 1
+                rows.append(self._file_row(path, root, stat))
+
+        removed = [path for path in known if path not in seen]
+        counts['removed'] = len(removed)
+
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.executemany("DELETE FROM files WHERE path = ?",
+                                        [(path,) for path in removed])
+        return counts
+
+    def forget(self, directory: str) -> int:
+        clause, args = subtree_clause(os.path.abspath(directory))
+        with self._lock, self.connection:
+            return self.connection.execute("DELETE FROM files WHERE " + clause, args).rowcount
+
+    def prune(self) -> int:
+        # Drops directories that no longer exist, such as temporary copies.
+        with self._lock:
+            directories = [row[0] for row in self.connection.execute("SELECT DISTINCT directory FROM files")]
+        missing = [(directory,) for directory in directories if not os.path.isdir(directory)]
+        with self._lock, self.connection:
+            self.connection.executemany("DELETE FROM files WHERE directory = ?", missing)
+        return len(missing)
+
+    def _file_row(self, path: str, directory: str, stat) -> tuple:
+        try:
+            header = read_header(path)
+        except Exception:
+            # Non-DICOM files are remembered too, so they are not re-parsed.
+            return (path, directory, stat.st_mtime_ns, stat.st_size) + (None,) * 11
+
+        position = _parse_numbers(header['position'] or '')
+        if len(position) != 3:
+            position = [None, None, None]
+        try:
+            instance_number = int(float(header['instance_number']))
+        except (TypeError, ValueError):
+            instance_number = None
+
+        return (path, directory, stat.st_mtime_ns, stat.st_size,
+                header['series_uid'], instance_number,
+                position[0], position[1], position[2],
+                header['orientation'], header['pixel_spacing'],
+                int(header['rows']) if header['rows'] else None,
+                int(header['columns']) if header['columns'] else None,
+                header['modality'], header['description'])
+
+    def series(self, directory: str = None, recursive: bool = True) -> list:
+        query = ("SELECT series_uid, COUNT(*), MIN(directory), MAX(modality), MAX(description), "
+                 "MAX(rows), MAX(columns) FROM files WHERE series_uid IS NOT NULL")
+        args = ()
+        if directory is not None:
+            clause, args = subtree_clause(os.path.abspath(directory), recursive)
+            query += " AND " + clause
+        query += " GROUP BY series_uid ORDER BY MIN(directory), series_uid"
+
+        with self._lock:
+            rows = self.connection.execute(query, args).fetchall()
+
+        return [{
+            'series_uid': uid,
+            'files': count,
+            'directory': series_directory,
+            'modality': modality,
+            'description': description,
+            'rows': rows_,
+            'columns': columns
+        } for uid, count, series_directory, modality, description, rows_, columns in rows]
+
+    def series_files(self, series_uid: str, directory: str = None, recursive: bool = True) -> list:
+        # Copies of a study share its series UID, so a load restricted to one
+        # directory must not pick up the slices of another copy.
+        query = ("SELECT path, instance_number, position_x, position_y, position_z, orientation "
+                 "FROM files WHERE series_uid = ?")
+        args = (series_uid,)
+        if directory is not None:
+            clause, directory_args = subtree_clause(os.path.abspath(directory), recursive)
+            query += " AND " + clause
+            args += directory_args
+        with self._lock:
+            rows = self.connection.execute(query, args).fetchall()
+
+        if not rows:
+            raise ValueError(f"Series {series_uid} is not in the index")
+
+        # Same ordering rule as GDCM: position projected on the slice normal,
+        # falling back to the instance number when geometry is missing.
+        orientation = _parse_numbers(rows[0][5] or '')
+        positions = [row[2:5] for row in rows]
+        if len(orientation) == 6 and all(None not in position for position in positions):
+            normal = np.cross(orientation[:3], orientation[3:])
+            keys = [float(np.dot(position, normal)) for position in positions]
+        else:
+            keys = [row[1] if row[1] is not None else 0 for row in rows]
+
+        order = sorted(range(len(rows)), key=lambda i: (keys[i], rows[i][0]))
+        return [rows[i][0] for i in order]
+
+    def series_geometry(self, series_uid: str, directory: str = None, recursive: bool = True) -> dict:
+        files = self.series_files(series_uid, directory, recursive)
+        with self._lock:
+            first = self.connection.execute(
+                "SELECT position_x, position_y, position_z, orientation, pixel_spacing, rows, columns "
+                "FROM files WHERE path = ?", (files[0],)).fetchone()
+
+        return {
+            'slices': len(files),
+            'origin': tuple(first[:3]),
+            'orientation': tuple(_parse_numbers(first[3] or '')),
+            'pixel_spacing': tuple(_parse_numbers(first[4] or '')),
+            'rows': first[5],
+            'columns': first[6]
+        }
@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import SimpleITK as sitk
+
+from image_bridge import image_array_view
+
+
+def _slice_array(image: sitk.Image) -> np.ndarray:
+    return sitk.GetArrayViewFromImage(image)[0]
+
+
+def _decode_slice(file_name: str, pixel_id: int) -> np.ndarray:
+    image = sitk.ReadImage(file_name, pixel_id)
+    return np.array(_slice_array(image))
+
+
+def _slice_origin(file_name: str) -> tuple:
+    reader = sitk.ImageFileReader()
+    reader.SetFileName(file_name)
+    reader.ReadImageInformation()
+    return reader.GetOrigin()
+
+
+def read_series_parallel(file_names: list, workers: int = None,
+                         use_processes: bool = False) -> sitk.Image:
+    if not file_names:
+        raise ValueError("No DICOM files given")
+
+    first = sitk.ReadImage(file_names[0])
+    if first.GetDimension() != 3 or first.GetSize()[2] != 1:
+        raise ValueError("Parallel loading needs single-frame slices")
+
+    pixel_id = first.GetPixelID()
+    first_slice = _slice_array(first)
+    components = first.GetNumberOfComponentsPerPixel()
+    rows, columns = first_slice.shape[:2]
+
+    if components > 1:
+        image = sitk.Image([columns, rows, len(file_names)], pixel_id, components)
+    else:
+        image = sitk.Image([columns, rows, len(file_names)], pixel_id)
+    volume = image_array_view(image, writable=True)
+    volume[0] = first_slice
+
+    if workers is None:
+        workers = min(32, os.cpu_count() or 1)
+
+    # Threads decode each slice straight into its slot of the preallocated
+    # image buffer; processes have to ship the decoded slice back instead.
+    if use_processes:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk = max(1, len(file_names) // (workers * 4))
+            slices = executor.map(_decode_slice, file_names[1:],
+                                  [pixel_id] * (len(file_names) - 1), chunksize=chunk)
+            for index, slice_array in enumerate(slices, start=1):
+                volume[index] = slice_array
+    else:
+        def decode_into(index):
+            slice_image = sitk.ReadImage(file_names[index], pixel_id)
+            volume[index] = _slice_array(slice_image)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(decode_into, range(1, len(file_names))))
+
+    origin = first.GetOrigin()
+    direction = first.GetDirection()
+    spacing = list(first.GetSpacing()[:2]) + [1.0]
+
+    if len(file_names) > 1:
+        normal = np.array(direction).reshape(3, 3)[:, 2]
+        distance = float(np.dot(np.subtract(_slice_origin(file_names[-1]), origin), normal))
+        if distance != 0.0:
+            spacing[2] = abs(distance) / (len(file_names) - 1)
+
+    image.SetOrigin(origin)
+    image.SetSpacing(spacing)
+    image.SetDirection(direction)
+    return image
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import SimpleITK as sitk
+
+import copy_tracker
+
+
+def frame_shape(image: sitk.Image) -> tuple:
+    return tuple(image.GetSize()[3:])
+
+
+def frame_count(image: sitk.Image) -> int:
+    return int(np.prod(frame_shape(image), dtype=np.int64)) if image.GetDimension() > 3 else 1
+
+
+def extract_frame(image: sitk.Image, frame: int = 0) -> sitk.Image:
+    # Axes beyond z (time, echo, ...) are flattened into one frame index.
+    # Extract copies just that frame and keeps its spacing, origin and the
+    # spatial part of the direction matrix.
+    if image.GetDimension() <= 3:
+        if frame != 0:
+            raise ValueError(f"Frame {frame} out of range (image has 1 frame)")
+        return image
+
+    count = frame_count(image)
+    if not 0 <= frame < count:
+        raise ValueError(f"Frame {frame} out of range (image has {count} frames)")
+
+    size = list(image.GetSize()[:3]) + [0] * (image.GetDimension() - 3)
+    index = [0, 0, 0] + [int(i) for i in np.unravel_index(frame, frame_shape(image), order='F')]
+
+    extractor = sitk.ExtractImageFilter()
+    extractor.SetSize(size)
+    extractor.SetIndex(index)
+    extractor.SetDirectionCollapseToStrategy(sitk.ExtractImageFilter.DIRECTIONCOLLAPSETOSUBMATRIX)
+    try:
+        extracted = extractor.Execute(image)
+    except RuntimeError:
+        # A 4D direction whose spatial block is singular cannot be collapsed.
+        extractor.SetDirectionCollapseToStrategy(sitk.ExtractImageFilter.DIRECTIONCOLLAPSETOIDENTITY)
+        extracted = extractor.Execute(image)
+
+    copy_tracker.record('frame.extract', extracted.GetNumberOfPixels() *
+                        extracted.GetNumberOfComponentsPerPixel() * extracted.GetSizeOfPixelComponent())
+    return extracted
+
+
+class FrameSequence:
+    def __init__(self, image: sitk.Image, prefetch: int = 2):
+        self.image = image
+        self.prefetch = prefetch
+        self.stepping = False
+        self._last = None
+        self._frames = {}
+        self._executor = None
+
+    def __len__(self) -> int:
+        return frame_count(self.image)
+
+    def __iter__(self):
+        for frame in range(len(self)):
+            yield self[frame]
+
+    def __getitem__(self, frame: int) -> sitk.Image:
+        if frame < 0:
+            frame += len(self)
+        if not 0 <= frame < len(self):
+            raise IndexError(f"Frame {frame} out of range")
+
+        # Prefetching starts once the index has moved: each frame is a full
+        # 3D copy, and a viewer that stays on one frame only needs that one.
+        if self._last is not None and frame != self._last:
+            self.stepping = True
+        self._last = frame
+        if self.stepping and self.prefetch > 0 and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        # Keep the current frame plus a small window ahead of it; anything
+        # else is dropped so memory stays at a few frames.
+        ahead = self.prefetch if self.stepping else 0
+        window = range(frame, min(len(self), frame + ahead + 1))
+        for stale in [f for f in self._frames if f not in window]:
+            del self._frames[stale]
+
+        for upcoming in window:
+            if upcoming not in self._frames:
+                if self._executor is not None and upcoming != frame:
+                    self._frames[upcoming] = self._executor.submit(extract_frame, self.image, upcoming)
+                elif upcoming == frame:
+                    self._frames[upcoming] = extract_frame(self.image, upcoming)
+
+        result = self._frames[frame]
+        if not isinstance(result, sitk.Image):
+            result = result.result()
+            self._frames[frame] = result
+        return result
+
+    def close(self):
+        self._frames.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
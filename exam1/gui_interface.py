@@ -1,10 +1,20 @@
 import PySimpleGUI as sg
 import vtk
 import os
+import time
+from collections import deque
 
+import copy_tracker
+import instrumentation
+from memory_usage import PeakMemory
 from volume_processor import VolumeProcessor
-from mesh_extractor import MeshExtractor
+from mesh_extractor import MeshExtractor, ISOSURFACE_ENGINES
 from volume_renderer import VolumeRenderer
+from stage_graph import StageGraph
+from processing_worker import ProcessingWorker
+from dicom_index import DicomIndex
+from mesh_cache import MeshCache
+from volume_cache import VolumeCache
 
 
 class VTKWidget:
@@ -27,6 +37,149 @@ class VTKWidget:
         
         self.renderer.SetBackground(0.1, 0.1, 0.2)
         
+        self.interactive_frame_times = deque(maxlen=200)
+        self.still_frame_times = deque(maxlen=200)
+        self.renderer.AddObserver('EndEvent', self.record_frame_time)
+        self.set_target_frame_rate(10.0)
+        
+        self.mesh_lod = None
+        self.volume_lod = None
+        self.frame_start = None
+        self.render_window.AddObserver('StartEvent', self.select_lod)
+        self.render_window.AddObserver('EndEvent', self.record_lod_time)
+    
+    def set_target_frame_rate(self, frames_per_second: float):
+        # The interactor asks for this rate while the trackball is moving and
+        # for the still rate (effectively unlimited time) once it stops.
+        self.target_frame_rate = frames_per_second
+        self.interactor.SetDesiredUpdateRate(frames_per_second)
+        self.interactor.SetStillUpdateRate(0.001)
+    
+    def record_frame_time(self, caller, event):
+        seconds = self.renderer.GetLastRenderTimeInSeconds()
+        if self.render_window.GetDesiredUpdateRate() > self.interactor.GetStillUpdateRate():
+            self.interactive_frame_times.append(seconds)
+        else:
+            self.still_frame_times.append(seconds)
+    
+    def get_frame_stats(self) -> dict:
+        stats = {'target_fps': self.target_frame_rate}
+        if self.mesh_lod is not None and self.mesh_lod['prop'] is self.current_actor:
+            stats['mesh_lod'] = {
+                'level': self.mesh_lod['level'],
+                'triangles': list(self.mesh_lod['sizes'])
+            }
+        if self.volume_lod is not None and self.volume_lod['prop'] is self.current_volume:
+            stats['volume_lod'] = {
+                'level': self.volume_lod['level'],
+                'voxels': list(self.volume_lod['sizes'])
+            }
+        for name, times in (('interactive', self.interactive_frame_times),
+                            ('still', self.still_frame_times)):
+            if times:
+                mean = sum(times) / len(times)
+                stats[name] = {
+                    'frames': len(times),
+                    'mean_ms': mean * 1000.0,
+                    'max_ms': max(times) * 1000.0,
+                    'fps': 1.0 / mean if mean > 0 else float('inf')
+                }
+        return stats
+        
+    def set_mesh_lods(self, actor, pyramid: list):
+        # Level 0 is the actor's own full-resolution mapper. Every level keeps
+        # a mapper of its own, so switching never re-uploads geometry.
+        if self.mesh_lod is not None:
+            self.mesh_lod['prop'].SetMapper(self.mesh_lod['mappers'][0])
+        full_mapper = actor.GetMapper()
+        
+        mappers = [full_mapper]
+        for level in pyramid:
+            mapper = vtk.vtkPolyDataMapper()
+            mapper.SetInputData(level)
+            mapper.SetScalarVisibility(full_mapper.GetScalarVisibility())
+            mappers.append(mapper)
+        
+        self.mesh_lod = {
+            'prop': actor,
+            'mappers': mappers,
+            'sizes': [max(1, mapper.GetInput().GetNumberOfPolys()) for mapper in mappers],
+            'frame_times': {},
+            'level': 0
+        }
+    
+    def set_volume_lods(self, volume, lod_ids: list):
+        # vtkLODProp3D's own selection works from render time estimates that
+        # stay at zero here and picked coarse levels even for still frames,
+        # so its level is chosen per frame from measured times like a mesh's.
+        volume.AutomaticLODSelectionOff()
+        volume.SetSelectedLODID(lod_ids[0])
+        self.volume_lod = {
+            'prop': volume,
+            'ids': list(lod_ids),
+            'sizes': [max(1, volume.GetLODMapper(lod_id).GetInput().GetNumberOfPoints())
+                      for lod_id in lod_ids],
+            'frame_times': {},
+            'level': 0
+        }
+    
+    def mesh_mapper(self, actor):
+        if self.mesh_lod is not None and self.mesh_lod['prop'] is actor:
+            return self.mesh_lod['mappers'][0]
+        return actor.GetMapper()
+    
+    def active_lod(self):
+        if self.mesh_lod is not None and self.mesh_lod['prop'] is self.current_actor:
+            return self.mesh_lod
+        if self.volume_lod is not None and self.volume_lod['prop'] is self.current_volume:
+            return self.volume_lod
+        return None
+    
+    def estimate_frame_time(self, lod: dict, level: int) -> float:
+        # Unmeasured levels are scaled from the nearest measured one by their
+        # triangle or voxel count; a level nobody has drawn yet estimates as
+        # free so it gets measured.
+        if level in lod['frame_times']:
+            return lod['frame_times'][level]
+        if not lod['frame_times']:
+            return 0.0
+        nearest = min(lod['frame_times'], key=lambda known: abs(known - level))
+        return lod['frame_times'][nearest] * lod['sizes'][level] / lod['sizes'][nearest]
+    
+    def select_lod(self, caller, event):
+        self.frame_start = time.perf_counter()
+        lod = self.active_lod()
+        if lod is None or len(lod['sizes']) == 1:
+            return
+        
+        # The interactor raises the desired update rate while the trackball
+        # moves and drops it to the still rate afterwards, so a still frame
+        # always gets full resolution and a moving one the finest level that
+        # fits the frame-time target.
+        level = 0
+        if self.render_window.GetDesiredUpdateRate() > self.interactor.GetStillUpdateRate():
+            budget = 1.0 / self.render_window.GetDesiredUpdateRate()
+            level = len(lod['sizes']) - 1
+            for candidate in range(len(lod['sizes'])):
+                if self.estimate_frame_time(lod, candidate) <= budget:
+                    level = candidate
+                    break
+        
+        if level != lod['level']:
+            if lod is self.mesh_lod:
+                lod['prop'].SetMapper(lod['mappers'][level])
+            else:
+                lod['prop'].SetSelectedLODID(lod['ids'][level])
+            lod['level'] = level
+    
+    def record_lod_time(self, caller, event):
+        lod = self.active_lod()
+        if self.frame_start is None or lod is None:
+            return
+        seconds = time.perf_counter() - self.frame_start
+        previous = lod['frame_times'].get(lod['level'])
+        lod['frame_times'][lod['level']] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+    
     def add_actor(self, actor):
         if self.current_actor:
             self.renderer.RemoveActor(self.current_actor)
@@ -49,12 +202,18 @@ class VTKWidget:
         self.renderer.AddVolume(volume)
         self.renderer.ResetCamera()
         
-    def render(self):
-        self.renderer.ResetCamera()
+    @instrumentation.timed('render.frame')
+    def render(self, reset_camera: bool = True):
+        if reset_camera:
+            self.renderer.ResetCamera()
         self.render_window.Render()
         
         if not self.render_window.GetNeverRendered():
             self.render_window.Render()
+    
+    def refresh(self):
+        if self.window_shown:
+            self.render_window.Render()
         
     def show_window(self):
         if not self.window_shown:
@@ -73,15 +232,62 @@ class VTKWidget:
         return self.render_window
 
 
+class Debouncer:
+    def __init__(self, delay: float = 0.15):
+        self.delay = delay
+        self.deadline = None
+    
+    def trigger(self):
+        self.deadline = time.monotonic() + self.delay
+    
+    def due(self) -> bool:
+        if self.deadline is None or time.monotonic() < self.deadline:
+            return False
+        self.deadline = None
+        return True
+    
+    def timeout_ms(self, idle_ms: int = 100) -> int:
+        if self.deadline is None:
+            return idle_ms
+        return max(0, min(idle_ms, int((self.deadline - time.monotonic()) * 1000)))
+
+
+LIVE_EDIT_KEYS = ('-ISOVALUE-', '-OPACITY-', '-LOW_R-', '-LOW_G-', '-LOW_B-',
+                  '-HIGH_R-', '-HIGH_G-', '-HIGH_B-')
+
+
 class TomographyGUI:
-    def __init__(self):
+    def __init__(self, trace_path: str = None):
         self.volume_processor = VolumeProcessor()
-        self.mesh_extractor = MeshExtractor()
+        try:
+            self.volume_processor.volume_cache = VolumeCache()
+        except Exception:
+            pass
+        try:
+            self.mesh_extractor = MeshExtractor(smp_backend='STDThread')
+        except ValueError:
+            self.mesh_extractor = MeshExtractor()
+        try:
+            self.mesh_extractor.mesh_cache = MeshCache()
+        except Exception:
+            pass
         self.volume_renderer = VolumeRenderer()
         self.vtk_widget = VTKWidget()
+        self.pipeline = self.build_pipeline()
+        self.worker = ProcessingWorker()
+        self.last_progress = None
+        self.live_debouncer = Debouncer()
+        self.live_values = None
+        self.live_job_id = None
+        self.dicom_index = None
+        self.volume_source = None
+        self.mesh_actor = None
+        self.obj_actor = None
         
         self.current_data = None
         self.current_obj_file = None
+        self.last_apply_memory = None
+        self.trace_path = trace_path
         self.render_mode = "Volume"
         
         self.gaussian_sigma = 1.0
@@ -90,6 +296,10 @@ class TomographyGUI:
         self.low_color = (0.0, 0.2, 0.4)
         self.high_color = (1.0, 0.8, 0.6)
         self.opacity = 0.3
+        self.preserve_dtype = False
+        self.cpu_lod = False
+        self.isosurface_engine = 'marching_cubes'
+        self.target_fps = 10.0
         
         sg.theme('DarkGrey11')
         
@@ -121,11 +331,12 @@ class TomographyGUI:
                 [sg.Text('DICOM Folder:', size=(12, 1)), 
                  sg.Input(default_text='real_dicom', key='-DICOM_DIR-', size=(25, 1)), 
                  sg.FolderBrowse('Browse', size=(8, 1))],
-                [sg.Text('OBJ File:', size=(12, 1)), 
+                [sg.Text('Mesh File:', size=(12, 1)), 
                  sg.Input(default_text='data/bunny.obj', key='-OBJ_FILE-', size=(25, 1)), 
-                 sg.FileBrowse('Browse', file_types=(("OBJ Files", "*.obj"),), size=(8, 1))],
+                 sg.FileBrowse('Browse', file_types=(("Mesh Files", "*.obj *.ply"), ("OBJ Files", "*.obj"),
+                                                     ("PLY Files", "*.ply")), size=(8, 1))],
                 [sg.Button('Load DICOM', key='-LOAD_DICOM-', size=(18, 1)),
-                 sg.Button('Load OBJ', key='-LOAD_OBJ-', size=(18, 1))]
+                 sg.Button('Load Mesh', key='-LOAD_OBJ-', size=(18, 1))]
             ], expand_x=True)],
             
             [sg.Frame('Processing Parameters', [
@@ -139,7 +350,9 @@ class TomographyGUI:
                 
                 [sg.Text('Isovalue:'), sg.Text('128', key='-ISO_VAL-', size=(8, 1), justification='right')],
                 [sg.Slider(range=(1, 255), default_value=128, resolution=1, 
-                          orientation='h', key='-ISOVALUE-', size=(35, 15), enable_events=True)]
+                          orientation='h', key='-ISOVALUE-', size=(35, 15), enable_events=True)],
+                
+                [sg.Checkbox('Keep native pixel type', default=False, key='-NATIVE_DTYPE-')]
             ], expand_x=True)]
         ]
         
@@ -153,23 +366,33 @@ class TomographyGUI:
                 
                 [sg.Text('Low Color (R,G,B):')],
                 [sg.Text('R:'), sg.Slider(range=(0, 1), default_value=0.0, resolution=0.01, 
-                         orientation='h', key='-LOW_R-', size=(10, 15)),
+                         orientation='h', key='-LOW_R-', size=(10, 15), enable_events=True),
                  sg.Text('G:'), sg.Slider(range=(0, 1), default_value=0.2, resolution=0.01, 
-                         orientation='h', key='-LOW_G-', size=(10, 15)),
+                         orientation='h', key='-LOW_G-', size=(10, 15), enable_events=True),
                  sg.Text('B:'), sg.Slider(range=(0, 1), default_value=0.4, resolution=0.01, 
-                         orientation='h', key='-LOW_B-', size=(10, 15))],
+                         orientation='h', key='-LOW_B-', size=(10, 15), enable_events=True)],
                 
                 [sg.Text('High Color (R,G,B):')],
                 [sg.Text('R:'), sg.Slider(range=(0, 1), default_value=1.0, resolution=0.01, 
-                         orientation='h', key='-HIGH_R-', size=(10, 15)),
+                         orientation='h', key='-HIGH_R-', size=(10, 15), enable_events=True),
                  sg.Text('G:'), sg.Slider(range=(0, 1), default_value=0.8, resolution=0.01, 
-                         orientation='h', key='-HIGH_G-', size=(10, 15)),
+                         orientation='h', key='-HIGH_G-', size=(10, 15), enable_events=True),
                  sg.Text('B:'), sg.Slider(range=(0, 1), default_value=0.6, resolution=0.01, 
-                         orientation='h', key='-HIGH_B-', size=(10, 15))],
+                         orientation='h', key='-HIGH_B-', size=(10, 15), enable_events=True)],
                 
                 [sg.Text('Opacity:'), sg.Text('0.30', key='-OPACITY_VAL-', size=(8, 1), justification='right')],
                 [sg.Slider(range=(0.0, 1.0), default_value=0.3, resolution=0.01, 
-                          orientation='h', key='-OPACITY-', size=(35, 15), enable_events=True)]
+                          orientation='h', key='-OPACITY-', size=(35, 15), enable_events=True)],
+                
+                [sg.Checkbox('Live preview (colors, opacity, isovalue)', default=False, key='-LIVE_EDIT-')],
+                
+                [sg.Checkbox('CPU level-of-detail volume', default=False, key='-CPU_LOD-'),
+                 sg.Text('Target FPS:'),
+                 sg.Spin(values=[2, 5, 10, 15, 20, 30], initial_value=10, key='-TARGET_FPS-', size=(4, 1))],
+                
+                [sg.Text('Isosurface engine:'),
+                 sg.Combo(list(ISOSURFACE_ENGINES), default_value='marching_cubes',
+                          key='-ISO_ENGINE-', readonly=True, size=(16, 1))]
             ], expand_x=True)]
         ]
         
@@ -196,127 +419,415 @@ class TomographyGUI:
         return layout
     
     def load_dicom_data(self, dicom_dir: str):
+        self.worker.cancel(wait=True)
+        if self.dicom_index is None:
+            try:
+                self.dicom_index = DicomIndex()
+                self.dicom_index.prune()
+            except Exception:
+                self.dicom_index = None
+        instrumentation.tracker.mark()
         try:
-            self.volume_processor.load_dicom_series(dicom_dir)
+            self.volume_processor.load_dicom_series(dicom_dir, parallel=(os.cpu_count() or 1) > 1,
+                                                    index=self.dicom_index)
+            self.pipeline.invalidate('dicom')
             info = self.volume_processor.get_volume_info()
-            self.update_info_display(f"DICOM loaded:\n{self.format_volume_info(info)}")
+            self.update_info_display(f"DICOM loaded:\n{self.format_volume_info(info)}\n\n"
+                                     f"{self.format_timing_info()}")
+            self.write_trace()
             return True
         except Exception:
             sg.popup_error("DICOM loading error")
             return False
     
     def load_obj_data(self, obj_file: str):
+        self.worker.cancel(wait=True)
+        instrumentation.tracker.mark()
         try:
-            self.mesh_extractor.load_obj_file(obj_file)
+            # The extractor keeps the loaded mesh as its untouched original;
+            # every Apply derives from it without copying its arrays.
+            self.mesh_extractor.load_mesh_file(obj_file)
             
-            if self.mesh_extractor.mesh_data:
-                original_mesh = vtk.vtkPolyData()
-                original_mesh.DeepCopy(self.mesh_extractor.mesh_data)
-                self.mesh_extractor.original_mesh_data = original_mesh
+            if self.mesh_extractor.original_mesh_data:
                 self.current_obj_file = obj_file
+                self.pipeline.invalidate('obj')
             
             info = self.mesh_extractor.get_mesh_info()
-            model_name = os.path.basename(obj_file).replace('.obj', '').upper()
-            self.update_info_display(f"Model '{model_name}' loaded!\n\n{self.format_mesh_info(info)}")
+            model_name = os.path.splitext(os.path.basename(obj_file))[0].upper()
+            self.update_info_display(f"Model '{model_name}' loaded!\n\n{self.format_mesh_info(info)}\n"
+                                     f"{self.format_timing_info()}")
+            self.write_trace()
             return True
         except Exception:
-            sg.popup_error("OBJ loading error")
+            sg.popup_error("Mesh loading error")
             return False
     
-    def process_and_render(self):
-        if self.volume_processor.volume is None and self.mesh_extractor.mesh_data is None:
+    def build_pipeline(self) -> StageGraph:
+        graph = StageGraph()
+        
+        graph.add_stage('dicom', self.volume_processor.volume_source)
+        graph.add_stage('process', self.stage_process, inputs=('dicom',),
+                        params=('gaussian_sigma', 'clahe_clip_limit', 'preserve_dtype'))
+        
+        graph.add_stage('volume_image', self.stage_volume_image, inputs=('process',),
+                        params=('preserve_dtype',))
+        graph.add_stage('volume_data', self.stage_volume_data, inputs=('volume_image',),
+                        params=('cpu_lod',))
+        
+        graph.add_stage('mesh_image', self.stage_mesh_image, inputs=('process',),
+                        params=('preserve_dtype',))
+        graph.add_stage('isosurface', self.stage_isosurface, inputs=('mesh_image',),
+                        params=('isovalue', 'isosurface_engine'))
+        graph.add_stage('smooth', self.stage_smooth, inputs=('isosurface',),
+                        params=('isosurface_engine',))
+        
+        graph.add_stage('obj', lambda: self.mesh_extractor.original_mesh_data)
+        graph.add_stage('obj_smooth', self.stage_obj_smooth, inputs=('obj',),
+                        params=('gaussian_sigma',))
+        
+        return graph
+    
+    def stage_process(self, volume, gaussian_sigma, clahe_clip_limit, preserve_dtype):
+        return self.volume_processor.process_volume(
+            gaussian_sigma=gaussian_sigma,
+            clahe_clip_limit=clahe_clip_limit,
+            preserve_dtype=preserve_dtype
+        )
+    
+    def stage_volume_image(self, processed_data, preserve_dtype):
+        self.volume_renderer.numpy_to_vtk_image(processed_data, preserve_dtype=preserve_dtype,
+                                                statistics=self.volume_processor.get_processed_statistics())
+        return self.volume_renderer.vtk_image
+    
+    def stage_volume_data(self, vtk_image, cpu_lod):
+        # The downsampled levels are data, so they are built here; the LOD
+        # prop that renders them is not.
+        if cpu_lod:
+            self.volume_renderer.build_volume_pyramid()
+        return vtk_image
+    
+    def stage_mesh_image(self, processed_data, preserve_dtype):
+        return self.mesh_extractor.numpy_to_vtk_image(processed_data, preserve_dtype=preserve_dtype)
+    
+    def stage_isosurface(self, vtk_image, isovalue, isosurface_engine):
+        isovalue = self.effective_isovalue(self.processed_range(), isovalue)
+        # The brick index is built once per volume, so scrubbing the isovalue
+        # only contours the bricks the new surface can pass through; where
+        # that is measured not to pay off, the extractor does a full pass.
+        return self.mesh_extractor.extract_isosurface(isovalue, engine=isosurface_engine, use_index=True)
+    
+    def stage_smooth(self, mesh, isosurface_engine):
+        self.mesh_extractor.mesh_data = mesh
+        if not self.mesh_extractor.needs_smoothing(isosurface_engine):
+            return mesh
+        return self.mesh_extractor.smooth_mesh()
+    
+    def stage_obj_smooth(self, original_mesh, gaussian_sigma):
+        # The smoothing engine caches its states per iteration count, so
+        # raising sigma only runs the extra iterations.
+        num_iterations = int(gaussian_sigma * 10) if gaussian_sigma > 0.1 else 0
+        return self.mesh_extractor.smooth_mesh(num_iterations, 0.1, mesh=original_mesh)
+    
+    def attach_volume(self, vtk_image):
+        # Mappers, properties and volumes are rendered and live-edited on the
+        # GUI thread, so they are built here rather than in the pipeline. A
+        # rerun on the same image only edits the transfer functions.
+        renderer = self.volume_renderer
+        isovalue = self.effective_isovalue(renderer.data_range(), self.isovalue)
+        if renderer.volume is not None and self.volume_source == (vtk_image, self.cpu_lod):
+            renderer.update_volume_properties(self.low_color, self.high_color, self.opacity, isovalue)
+            return renderer.volume
+        
+        renderer.create_volume_property(low_color=self.low_color, high_color=self.high_color,
+                                        opacity=self.opacity, isovalue=isovalue)
+        if self.cpu_lod:
+            volume = renderer.create_lod_volume()
+        else:
+            renderer.create_volume_mapper()
+            volume = renderer.create_volume()
+        self.volume_source = (vtk_image, self.cpu_lod)
+        return volume
+    
+    def attach_mesh(self, actor, mesh):
+        # The GUI thread draws the actors, so only it creates them or swaps
+        # their input; the worker stops at the mesh.
+        if actor is None:
+            self.mesh_extractor.mesh_data = mesh
+            actor = self.mesh_extractor.create_mesh_actor()
+        else:
+            self.vtk_widget.mesh_mapper(actor).SetInputData(mesh)
+        
+        actor.GetProperty().SetColor(self.high_color)
+        actor.GetProperty().SetOpacity(self.opacity)
+        return actor
+    
+    def pipeline_parameters(self) -> dict:
+        return {
+            'gaussian_sigma': self.gaussian_sigma,
+            'clahe_clip_limit': self.clahe_clip_limit,
+            'preserve_dtype': self.preserve_dtype,
+            'isovalue': self.isovalue,
+            'low_color': self.low_color,
+            'high_color': self.high_color,
+            'opacity': self.opacity,
+            'cpu_lod': self.cpu_lod,
+            'isosurface_engine': self.isosurface_engine
+        }
+    
+    def select_pipeline_target(self):
+        if self.render_mode == "Volume" and self.volume_processor.has_volume():
+            return 'volume_data'
+        if self.render_mode == "Mesh":
+            if self.mesh_extractor.original_mesh_data is not None:
+                return 'obj_smooth'
+            if self.volume_processor.has_volume():
+                return 'smooth'
+        return None
+    
+    def run_pipeline(self, target: str, params: dict, monitor=None):
+        self.volume_processor.progress = monitor
+        self.mesh_extractor.progress = monitor
+        try:
+            with PeakMemory() as peak:
+                self.pipeline.set_params(**params)
+                result = self.pipeline.run(target)
+            self.last_apply_memory = peak.info()
+            return target, result
+        finally:
+            self.volume_processor.progress = None
+            self.mesh_extractor.progress = None
+    
+    def process_and_render(self, background: bool = True):
+        if not self.volume_processor.has_volume() and self.mesh_extractor.original_mesh_data is None:
             sg.popup_error("Load data first!")
             return
+        
+        target = self.select_pipeline_target()
+        if target is None:
+            return
             
-        try:
-            if self.render_mode == "Volume" and self.volume_processor.volume is not None:
-                self.render_volume()
-            elif self.render_mode == "Mesh":
-                if self.mesh_extractor.mesh_data is not None:
-                    self.render_existing_mesh()
-                elif self.volume_processor.volume is not None:
-                    self.render_mesh_from_volume()
-        except Exception:
-            sg.popup_error("Rendering error")
-    
-    def render_volume(self):
-        processed_data = self.volume_processor.process_volume(
-            gaussian_sigma=self.gaussian_sigma,
-            clahe_clip_limit=self.clahe_clip_limit
-        )
+        copy_tracker.tracker.reset()
+        instrumentation.tracker.mark()
+        params = self.pipeline_parameters()
         
-        self.volume_renderer.numpy_to_vtk_image(processed_data)
+        if not background:
+            try:
+                self.present_result(*self.run_pipeline(target, params))
+            except Exception:
+                sg.popup_error("Rendering error")
+            return
         
-        self.volume_renderer.create_volume_mapper()
-        self.volume_renderer.create_volume_property(
-            low_color=self.low_color,
-            high_color=self.high_color,
-            opacity=self.opacity,
-            isovalue=self.isovalue
+        self.last_progress = None
+        self.worker.submit(
+            lambda monitor: self.run_pipeline(target, params, monitor),
+            on_progress=self.post_progress,
+            on_done=lambda job_id, result: self.window.write_event_value('-JOB_DONE-', (job_id, result)),
+            on_error=lambda job_id, error: self.window.write_event_value('-JOB_ERROR-', (job_id, str(error)))
         )
-        volume = self.volume_renderer.create_volume()
+        self.update_info_display(f"Processing (job {self.worker.job_id})...")
+    
+    def post_progress(self, job_id: int, stage: str, fraction: float):
+        percent = int(fraction * 100)
+        if self.last_progress == (job_id, stage, percent):
+            return
+        
+        self.last_progress = (job_id, stage, percent)
+        self.window.write_event_value('-JOB_PROGRESS-', (job_id, stage, percent))
+    
+    def present_result(self, target: str, result, reset_camera: bool = True):
+        if target == 'volume_data':
+            self.render_volume(self.attach_volume(result), reset_camera)
+        elif target == 'smooth':
+            self.mesh_actor = self.attach_mesh(self.mesh_actor, result)
+            self.render_mesh_from_volume(self.mesh_actor, result, reset_camera)
+        else:
+            self.obj_actor = self.attach_mesh(self.obj_actor, result)
+            self.render_existing_mesh(self.obj_actor, result, reset_camera)
+        self.write_trace()
+    
+    def apply_live_edit(self, values):
+        if self.worker.is_busy() and self.worker.job_id != self.live_job_id:
+            # The edit stays pending until the full run is done, or the last
+            # slider position would never be shown.
+            self.live_debouncer.trigger()
+            return
+        
+        self.live_values = None
+        previous_isovalue = self.pipeline.params.get('isovalue')
+        self.update_live_parameters(values)
+        
+        current_volume = self.vtk_widget.current_volume
+        current_actor = self.vtk_widget.current_actor
+        
+        if current_volume is not None and current_volume is self.volume_renderer.volume:
+            isovalue = self.effective_isovalue(self.volume_renderer.data_range(), self.isovalue)
+            self.volume_renderer.update_volume_properties(self.low_color, self.high_color,
+                                                          self.opacity, isovalue)
+            self.vtk_widget.refresh()
+        elif current_actor is not None:
+            current_actor.GetProperty().SetColor(self.high_color)
+            current_actor.GetProperty().SetOpacity(self.opacity)
+            self.vtk_widget.refresh()
+            
+            if current_actor is self.mesh_actor and \
+                    self.isovalue != previous_isovalue:
+                self.render_mode = "Mesh"
+                self.process_and_render()
+                self.live_job_id = self.worker.job_id
+    
+    def processed_range(self) -> tuple:
+        stats = self.volume_processor.get_processed_statistics()
+        return stats['min'], stats['max']
+    
+    def effective_isovalue(self, scalar_range, isovalue: float = None,
+                           preserve_dtype: bool = None) -> float:
+        if isovalue is None:
+            isovalue = self.pipeline.params.get('isovalue', self.isovalue)
+        if preserve_dtype is None:
+            preserve_dtype = self.pipeline.params.get('preserve_dtype', self.preserve_dtype)
+        if not preserve_dtype:
+            return isovalue
+        
+        low, high = scalar_range
+        return low + (high - low) * isovalue / 255.0
+    
+    def format_copy_info(self) -> str:
+        summary = copy_tracker.tracker.summary()
+        cache = self.volume_processor.result_cache.stats()
+        return f"Full-volume copies: {summary['copies']} ({summary['total_mb']:.1f} MB)\n" \
+               f"Cache: {cache['hits']} hits, {cache['misses']} misses, " \
+               f"{cache['evictions']} evictions ({cache['used_mb']:.1f}/{cache['budget_mb']:.0f} MB)"
+    
+    def format_memory_info(self, mesh=None) -> str:
+        memory = self.last_apply_memory
+        if memory is None or memory['peak_mb'] is None:
+            text = "Apply peak memory: unavailable"
+        else:
+            bound = "" if memory['exact'] else " (growth of process peak)"
+            text = f"Apply peak memory: +{memory['peak_mb']:.1f} MB{bound}"
+        
+        if mesh is not None and self.mesh_extractor.original_mesh_data is not None:
+            sharing = self.mesh_extractor.get_sharing_info(mesh)
+            text += f"\nMesh arrays: {sharing['shared_mb']:.1f} MB shared with original, " \
+                    f"{sharing['unique_mb']:.1f} MB own"
+            if not sharing['original_intact']:
+                text += " (original was modified!)"
+        return text
+    
+    def format_timing_info(self) -> str:
+        stages = instrumentation.tracker.summary()['stages']
+        if not stages:
+            return "Stage timings: none recorded"
+        
+        lines = ["Stage timings (wall / CPU, peak RSS):"]
+        for name, entry in stages.items():
+            text = f"  • {name}: {entry['wall_s'] * 1e3:.1f} / {entry['cpu_s'] * 1e3:.1f} ms"
+            if entry['peak_mb'] is not None:
+                text += f", +{entry['peak_mb']:.1f} MB"
+            if entry['calls'] > 1:
+                text += f", {entry['calls']} calls"
+            for count in ('voxels', 'triangles'):
+                if count in entry['counts']:
+                    text += f", {entry['counts'][count]:,} {count}"
+            lines.append(text)
+        return "\n".join(lines)
+    
+    def write_trace(self):
+        if not self.trace_path:
+            return
+        try:
+            instrumentation.write_chrome_trace(self.trace_path)
+        except OSError:
+            pass
+    
+    def format_stage_info(self) -> str:
+        if not self.pipeline.last_run:
+            return "Stages run: none (up to date)"
+        
+        stages = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.pipeline.last_run)
+        return f"Stages run: {stages}"
+    
+    def show_prop(self, prop, is_volume: bool, reset_camera: bool = True):
+        if is_volume and self.vtk_widget.current_volume is not prop:
+            self.vtk_widget.add_volume(prop)
+        elif not is_volume and self.vtk_widget.current_actor is not prop:
+            self.vtk_widget.add_actor(prop)
         
-        self.vtk_widget.add_volume(volume)
-        self.vtk_widget.render()
+        self.vtk_widget.render(reset_camera)
         self.vtk_widget.show_window()
+    
+    def format_frame_info(self) -> str:
+        stats = self.vtk_widget.get_frame_stats()
+        parts = [f"target {stats['target_fps']:g} fps"]
+        for name in ('interactive', 'still'):
+            if name in stats:
+                parts.append(f"{name} {stats[name]['mean_ms']:.1f} ms ({stats[name]['frames']} frames)")
+        if 'mesh_lod' in stats and len(stats['mesh_lod']['triangles']) > 1:
+            levels = " / ".join(f"{n:,}" for n in stats['mesh_lod']['triangles'])
+            parts.append(f"mesh LOD {levels} triangles")
+        if 'volume_lod' in stats and len(stats['volume_lod']['voxels']) > 1:
+            levels = " / ".join(f"{n:,}" for n in stats['volume_lod']['voxels'])
+            parts.append(f"volume LOD {levels} voxels")
+        return "Frames: " + ", ".join(parts)
+    
+    def render_volume(self, volume, reset_camera: bool = True):
+        self.vtk_widget.set_target_frame_rate(self.target_fps)
+        lod = self.vtk_widget.volume_lod
+        if isinstance(volume, vtk.vtkLODProp3D) and (lod is None or lod['prop'] is not volume):
+            self.vtk_widget.set_volume_lods(volume, self.volume_renderer.lod_ids)
+        self.show_prop(volume, is_volume=True, reset_camera=reset_camera)
         
+        isovalue = self.effective_isovalue(self.volume_renderer.data_range())
         self.update_info_display(f"Volume rendering complete\n\n"
                                f"Parameters:\n"
                                f"• Sigma: {self.gaussian_sigma}\n"
                                f"• CLAHE: {self.clahe_clip_limit}\n"
-                               f"• Isovalue: {self.isovalue}\n"
-                               f"• Opacity: {self.opacity}")
+                               f"• Isovalue: {isovalue:g}\n"
+                               f"• Opacity: {self.opacity}\n"
+                               f"{self.format_copy_info()}\n"
+                               f"{self.format_stage_info()}\n"
+                               f"{self.format_memory_info()}\n"
+                               f"{self.format_timing_info()}\n"
+                               f"{self.format_frame_info()}")
     
-    def render_mesh_from_volume(self):
-        processed_data = self.volume_processor.process_volume(
-            gaussian_sigma=self.gaussian_sigma,
-            clahe_clip_limit=self.clahe_clip_limit
-        )
-        
-        self.mesh_extractor.numpy_to_vtk_image(processed_data)
-        self.mesh_extractor.extract_isosurface(self.isovalue)
-        self.mesh_extractor.smooth_mesh()
-        
-        actor = self.mesh_extractor.create_mesh_actor(
-            color=self.high_color,
-            opacity=self.opacity
-        )
-        
-        self.vtk_widget.add_actor(actor)
-        self.vtk_widget.render()
-        self.vtk_widget.show_window()
+    def start_mesh_lods(self, actor, mesh):
+        # The full mesh is shown right away; the decimated levels replace the
+        # placeholder once the background build finishes.
+        self.vtk_widget.set_mesh_lods(actor, [])
+        self.mesh_extractor.start_mesh_pyramid(
+            mesh,
+            on_done=lambda mesh, pyramid: self.window.write_event_value('-MESH_LOD-', (actor, mesh, pyramid)),
+            on_error=lambda mesh, error: self.window.write_event_value('-MESH_LOD_ERROR-',
+                                                                      (actor, mesh, str(error))))
+    
+    def render_mesh_from_volume(self, actor, mesh, reset_camera: bool = True):
+        self.mesh_extractor.mesh_data = mesh
+        self.vtk_widget.set_target_frame_rate(self.target_fps)
+        self.start_mesh_lods(actor, self.mesh_extractor.mesh_data)
+        self.show_prop(actor, is_volume=False, reset_camera=reset_camera)
         
+        isovalue = self.effective_isovalue(self.processed_range())
         mesh_info = self.mesh_extractor.get_mesh_info()
         self.update_info_display(f"Mesh rendering complete\n"
-                               f"Isovalue: {self.isovalue}\n"
+                               f"Isovalue: {isovalue:g}\n"
+                               f"{self.format_copy_info()}\n"
+                               f"{self.format_stage_info()}\n"
+                               f"{self.format_memory_info()}\n"
+                               f"{self.format_timing_info()}\n"
                                f"{self.format_mesh_info(mesh_info)}")
     
-    def render_existing_mesh(self):
-        if hasattr(self.mesh_extractor, 'original_mesh_data') and self.mesh_extractor.original_mesh_data:
-            self.mesh_extractor.mesh_data = vtk.vtkPolyData()
-            self.mesh_extractor.mesh_data.DeepCopy(self.mesh_extractor.original_mesh_data)
-        
-        if self.gaussian_sigma > 0.1:
-            num_iterations = int(self.gaussian_sigma * 10)
-            smoothing_filter = vtk.vtkSmoothPolyDataFilter()
-            smoothing_filter.SetInputData(self.mesh_extractor.mesh_data)
-            smoothing_filter.SetNumberOfIterations(num_iterations)
-            smoothing_filter.SetRelaxationFactor(0.1)
-            smoothing_filter.Update()
-            self.mesh_extractor.mesh_data = smoothing_filter.GetOutput()
-        
-        actor = self.mesh_extractor.create_mesh_actor(
-            color=self.high_color,
-            opacity=self.opacity
-        )
-        
-        self.vtk_widget.add_actor(actor)
-        self.vtk_widget.render()
-        self.vtk_widget.show_window()
+    def render_existing_mesh(self, actor, mesh, reset_camera: bool = True):
+        self.mesh_extractor.mesh_data = mesh
+        self.vtk_widget.set_target_frame_rate(self.target_fps)
+        self.start_mesh_lods(actor, self.mesh_extractor.mesh_data)
+        self.show_prop(actor, is_volume=False, reset_camera=reset_camera)
         
         mesh_info = self.mesh_extractor.get_mesh_info()
         self.update_info_display(f"Existing mesh rendered\n"
                                f"Smoothing: {self.gaussian_sigma}\n"
+                               f"{self.format_stage_info()}\n"
+                               f"{self.format_memory_info(self.mesh_extractor.mesh_data)}\n"
+                               f"{self.format_timing_info()}\n"
                                f"{self.format_mesh_info(mesh_info)}")
     
     def update_parameters_from_gui(self, values):
@@ -327,6 +838,18 @@ class TomographyGUI:
         self.high_color = (values['-HIGH_R-'], values['-HIGH_G-'], values['-HIGH_B-'])
         self.opacity = values['-OPACITY-']
         self.render_mode = "Volume" if values['-VOLUME_MODE-'] else "Mesh"
+        self.preserve_dtype = values['-NATIVE_DTYPE-']
+        self.cpu_lod = values['-CPU_LOD-']
+        self.target_fps = float(values['-TARGET_FPS-'])
+        self.isosurface_engine = values['-ISO_ENGINE-']
+    
+    def update_live_parameters(self, values):
+        # Sigma, CLAHE and the engine only change on Apply; a live edit must
+        # not pick up their unapplied slider positions.
+        self.isovalue = values['-ISOVALUE-']
+        self.low_color = (values['-LOW_R-'], values['-LOW_G-'], values['-LOW_B-'])
+        self.high_color = (values['-HIGH_R-'], values['-HIGH_G-'], values['-HIGH_B-'])
+        self.opacity = values['-OPACITY-']
     
     def update_info_display(self, text: str):
         if hasattr(self, 'window'):
@@ -340,11 +863,15 @@ class TomographyGUI:
         spacing = info.get('spacing', 'Unknown')
         pixel_type = info.get('pixel_type', 'Unknown')
         dimensions = info.get('dimensions', 'Unknown')
+        frames = info.get('frames', 1)
         
-        return f"Size: {size}\n" \
+        text = f"Size: {size}\n" \
                f"Spacing: {spacing}\n" \
                f"Pixel Type: {pixel_type}\n" \
                f"Dimensions: {dimensions}D"
+        if frames > 1:
+            text += f"\nFrame: {info.get('frame_index', 0) + 1} of {frames}"
+        return text
     
     def format_mesh_info(self, info: dict) -> str:
         if not info:
@@ -368,7 +895,7 @@ class TomographyGUI:
                f"  • Points: {points:,}\n" \
                f"  • Triangles: {cells:,}\n" \
                f"  • Complexity: {complexity}\n" \
-               f"  • Memory: {memory} KB\n" \
+               f"  • Memory: {memory:.2f} MB\n" \
                f"Status: Ready"
     
     def load_specific_dicom(self, dicom_file, recommended_settings):
@@ -415,6 +942,11 @@ class TomographyGUI:
                                        f"Press 'Apply' to visualize")
         finally:
             shutil.rmtree(temp_dir, ignore_errors=True)
+            if self.dicom_index is not None:
+                try:
+                    self.dicom_index.forget(temp_dir)
+                except Exception:
+                    pass
     
     def load_preset_model(self, model_name):
         model_paths = {
@@ -481,7 +1013,7 @@ class TomographyGUI:
         self.update_slider_values()
         
         while True:
-            event, values = self.window.read(timeout=100)
+            event, values = self.window.read(timeout=self.live_debouncer.timeout_ms())
             
             if event == sg.WIN_CLOSED:
                 break
@@ -514,7 +1046,7 @@ class TomographyGUI:
                 if obj_file and os.path.exists(obj_file):
                     self.load_obj_data(obj_file)
                 else:
-                    sg.popup_error("Select valid OBJ file")
+                    sg.popup_error("Select valid OBJ or PLY file")
                     
             elif event == '-APPLY-':
                 self.update_parameters_from_gui(values)
@@ -533,11 +1065,54 @@ class TomographyGUI:
                 self.window['-OPACITY-'].update(0.3)
                 self.window['-VOLUME_MODE-'].update(True)
                 self.window['-MESH_MODE-'].update(False)
+                self.window['-NATIVE_DTYPE-'].update(False)
+                self.window['-CPU_LOD-'].update(False)
+                self.window['-TARGET_FPS-'].update(10)
+                self.window['-ISO_ENGINE-'].update('marching_cubes')
                 self.update_slider_values()
                 
-            elif event in ['-GAUSSIAN_SIGMA-', '-CLAHE_CLIP-', '-ISOVALUE-', '-OPACITY-']:
+            elif event in ['-GAUSSIAN_SIGMA-', '-CLAHE_CLIP-', '-ISOVALUE-', '-OPACITY-'] + list(LIVE_EDIT_KEYS):
                 self.update_slider_values(values)
                 
+                if event in LIVE_EDIT_KEYS and values['-LIVE_EDIT-']:
+                    self.live_values = values
+                    self.live_debouncer.trigger()
+            
+            elif event == '-JOB_PROGRESS-':
+                job_id, stage, percent = values[event]
+                if job_id == self.worker.job_id:
+                    self.update_info_display(f"Processing (job {job_id})...\n"
+                                           f"Stage: {stage} {percent}%")
+            
+            elif event == '-JOB_DONE-':
+                job_id, result = values[event]
+                if job_id == self.worker.job_id:
+                    try:
+                        self.present_result(*result, reset_camera=job_id != self.live_job_id)
+                    except Exception:
+                        sg.popup_error("Rendering error")
+            
+            elif event == '-MESH_LOD-':
+                actor, mesh, pyramid = values[event]
+                if actor is self.vtk_widget.current_actor and \
+                        self.vtk_widget.mesh_mapper(actor).GetInput() is mesh:
+                    self.vtk_widget.set_mesh_lods(actor, pyramid)
+            
+            elif event == '-MESH_LOD_ERROR-':
+                actor, mesh, message = values[event]
+                if actor is self.vtk_widget.current_actor and \
+                        self.vtk_widget.mesh_mapper(actor).GetInput() is mesh:
+                    sg.popup_error(f"Mesh LOD error: {message}\nThe full mesh stays in use.")
+            
+            elif event == '-JOB_ERROR-':
+                job_id, message = values[event]
+                if job_id == self.worker.job_id:
+                    sg.popup_error(f"Rendering error: {message}")
+            
+            if self.live_debouncer.due() and self.live_values is not None:
+                self.apply_live_edit(self.live_values)
+                
+        self.worker.shutdown()
         self.window.close()
 
 
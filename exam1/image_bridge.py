@@ -0,0 +1,106 @@
+import numpy as np
+import SimpleITK as sitk
+import vtk
+from vtk.util import numpy_support
+
+import copy_tracker
+
+
+LAYOUTS = ('zyx', 'xyz')
+
+
+def _check_layout(layout: str):
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}', expected one of {LAYOUTS}")
+
+
+def _vtk_compatible(numpy_array: np.ndarray) -> np.ndarray:
+    if numpy_array.dtype == np.bool_:
+        return numpy_array.view(np.uint8)
+    if not numpy_array.dtype.isnative:
+        copy_tracker.record('bridge.byteswap', numpy_array.nbytes)
+        return numpy_array.astype(numpy_array.dtype.newbyteorder('='))
+    return numpy_array
+
+
+def vtk_dimensions(numpy_array: np.ndarray, layout: str = 'zyx') -> tuple:
+    _check_layout(layout)
+    shape = tuple(int(n) for n in numpy_array.shape)
+    return shape[::-1] if layout == 'zyx' else shape
+
+
+def is_zero_copy(numpy_array: np.ndarray, layout: str = 'zyx') -> bool:
+    _check_layout(layout)
+    if numpy_array.dtype != np.bool_ and not numpy_array.dtype.isnative:
+        return False
+    if layout == 'zyx':
+        return numpy_array.flags.c_contiguous
+    return numpy_array.flags.f_contiguous
+
+
+def flat_point_view(numpy_array: np.ndarray, layout: str = 'zyx') -> np.ndarray:
+    # VTK stores points with x varying fastest. A C-ordered (z, y, x) array or
+    # an F-ordered (x, y, z) array already has that layout, so reshape returns
+    # a view. Anything else (e.g. sliced or transposed views) needs exactly one
+    # vectorized copy into the right order.
+    _check_layout(layout)
+    numpy_array = _vtk_compatible(numpy_array)
+    order = 'C' if layout == 'zyx' else 'F'
+    if not is_zero_copy(numpy_array, layout):
+        copy_tracker.record('bridge.reorder', numpy_array.nbytes)
+        numpy_array = np.array(numpy_array, order=order, copy=True)
+    return numpy_array.reshape(-1, order=order)
+
+
+def numpy_to_vtk_image(numpy_array: np.ndarray,
+                       spacing: tuple = (1.0, 1.0, 1.0),
+                       origin: tuple = (0.0, 0.0, 0.0),
+                       layout: str = 'zyx',
+                       deep: bool = False) -> vtk.vtkImageData:
+    if numpy_array.ndim != 3:
+        raise ValueError("Array must be 3D")
+
+    flat = flat_point_view(numpy_array, layout)
+    # With deep=False the VTK array points at the NumPy buffer and holds a
+    # reference to it, so the data stays alive as long as the image does.
+    vtk_array = numpy_support.numpy_to_vtk(flat, deep=deep)
+
+    image_data = vtk.vtkImageData()
+    image_data.SetDimensions(vtk_dimensions(numpy_array, layout))
+    image_data.SetSpacing(spacing)
+    image_data.SetOrigin(origin)
+    image_data.GetPointData().SetScalars(vtk_array)
+
+    return image_data
+
+
+class _ImageArrayInterface:
+    def __init__(self, image: sitk.Image, writable: bool):
+        self.image = image
+        interface = dict(sitk.GetArrayViewFromImage(image).__array_interface__)
+        interface['data'] = (interface['data'][0], not writable)
+        self.__array_interface__ = interface
+
+
+def image_array_view(image: sitk.Image, writable: bool = False) -> np.ndarray:
+    # Unlike GetArrayViewFromImage, the returned array keeps the image alive,
+    # so it can be handed to VTK without copying. A writable view lets callers
+    # fill an image in place.
+    return np.asarray(_ImageArrayInterface(image, writable))
+
+
+def vtk_image_to_numpy(image_data: vtk.vtkImageData, layout: str = 'zyx') -> np.ndarray:
+    _check_layout(layout)
+    scalars = image_data.GetPointData().GetScalars()
+    if scalars is None:
+        raise ValueError("Image has no point scalars")
+
+    if scalars.GetNumberOfComponents() > 1:
+        raise ValueError("Only single-component images are supported")
+
+    nx, ny, nz = image_data.GetDimensions()
+    flat = numpy_support.vtk_to_numpy(scalars)
+
+    if layout == 'zyx':
+        return flat.reshape((nz, ny, nx))
+    return flat.reshape((nx, ny, nz), order='F')
@@ -0,0 +1,150 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from memory_usage import PeakMemory
+
+# Records kept for the trace; the oldest are dropped after a long session.
+MAX_RECORDS = 20000
+
+
+def result_counts(result) -> dict:
+    # Meshes report triangles, sitk and VTK images their voxels.
+    try:
+        if hasattr(result, 'GetNumberOfPolys'):
+            return {'triangles': result.GetNumberOfPolys(), 'points': result.GetNumberOfPoints()}
+        if hasattr(result, 'GetNumberOfPixels'):
+            return {'voxels': result.GetNumberOfPixels()}
+        if hasattr(result, 'GetDimensions') and hasattr(result, 'GetNumberOfPoints'):
+            return {'voxels': result.GetNumberOfPoints()}
+    except Exception:
+        pass
+    return {}
+
+
+class Stage:
+    def __init__(self, timer, name: str, counts: dict):
+        self.timer = timer
+        self.name = name
+        self.counts = dict(counts)
+        self.memory = PeakMemory()
+
+    def __enter__(self):
+        self.started = time.time()
+        self.memory.__enter__()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # process_time covers every thread, so VTK's SMP workers count too,
+        # and so does anything the GUI thread does in the meantime.
+        cpu = time.process_time() - self.cpu_start
+        wall = time.perf_counter() - self.wall_start
+        self.memory.__exit__(exc_type, exc_value, traceback)
+        self.timer.add({
+            'stage': self.name,
+            'start': self.started,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'peak_mb': self.memory.peak_mb,
+            'counts': self.counts,
+            'failed': exc_type is not None,
+            'pid': os.getpid(),
+            'tid': threading.get_ident()
+        })
+        return False
+
+
+class StageTimer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = deque(maxlen=MAX_RECORDS)
+        self.sequence = 0
+        self.marked = 0
+
+    def add(self, record: dict):
+        with self._lock:
+            self.sequence += 1
+            record['sequence'] = self.sequence
+            self.records.append(record)
+
+    def stage(self, name: str, **counts) -> Stage:
+        return Stage(self, name, counts)
+
+    def mark(self):
+        # Summaries only cover what ran after the last mark; the trace keeps
+        # everything.
+        with self._lock:
+            self.marked = self.sequence
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self.marked = self.sequence
+
+    def recent(self) -> list:
+        with self._lock:
+            return [record for record in self.records if record['sequence'] > self.marked]
+
+    def summary(self) -> dict:
+        stages = {}
+        for record in self.recent():
+            entry = stages.setdefault(record['stage'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                        'peak_mb': None, 'counts': {}})
+            entry['calls'] += 1
+            entry['wall_s'] += record['wall_s']
+            entry['cpu_s'] += record['cpu_s']
+            if record['peak_mb'] is not None:
+                entry['peak_mb'] = max(entry['peak_mb'] or 0.0, record['peak_mb'])
+            entry['counts'].update(record['counts'])
+        return {
+            'stages': stages,
+            'wall_s': sum(entry['wall_s'] for entry in stages.values())
+        }
+
+    def trace_events(self) -> list:
+        with self._lock:
+            records = list(self.records)
+        return [{
+            'name': record['stage'],
+            'cat': record['stage'].split('.')[0],
+            'ph': 'X',
+            'ts': record['start'] * 1e6,
+            'dur': record['wall_s'] * 1e6,
+            'pid': record['pid'],
+            'tid': record['tid'],
+            'args': dict(record['counts'], cpu_ms=record['cpu_s'] * 1e3, peak_mb=record['peak_mb'],
+                         failed=record['failed'])
+        } for record in records]
+
+
+tracker = StageTimer()
+
+
+def timed(name: str, counts=None):
+    # counts, given the instance, replaces counting the return value for
+    # methods that store their result. It must not touch lazy state, or the
+    # measurement changes what it measures.
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracker.stage(name) as stage:
+                result = function(*args, **kwargs)
+                stage.counts.update(counts(args[0]) if counts is not None else result_counts(result))
+            return result
+        return wrapper
+    return decorate
+
+
+def write_chrome_trace(path: str, events: list = None) -> str:
+    # Loadable in chrome://tracing and Perfetto.
+    events = tracker.trace_events() if events is None else events
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    os.replace(path + '.tmp', path)
+    return path
@@ -1,10 +1,6 @@
+import argparse
 import sys
 
-try:
-    from gui_interface import TomographyGUI
-except ImportError:
-    sys.exit(1)
-
 def check_dependencies():
     required_packages = [
         ('SimpleITK', 'SimpleITK'),
@@ -27,12 +23,30 @@ def check_dependencies():
     return True
 
 
-def main():
+def main(argv: list = None):
+    argv = sys.argv[1:] if argv is None else argv
+    
+    # Batch runs need neither a display nor PySimpleGUI, so the GUI module
+    # is only imported when the app is actually started.
+    if argv and argv[0] == '--batch':
+        from batch import main as batch_main
+        return batch_main(argv[1:])
+    
+    parser = argparse.ArgumentParser(description="Tomography viewer (use --batch for headless runs)")
+    parser.add_argument('--trace', metavar='PATH', default=None,
+                        help="write a Chrome trace of the pipeline stages after every load and Apply")
+    args = parser.parse_args(argv)
+    
     if not check_dependencies():
         return 1
     
     try:
-        app = TomographyGUI()
+        from gui_interface import TomographyGUI
+    except ImportError:
+        return 1
+    
+    try:
+        app = TomographyGUI(trace_path=args.trace)
         app.run()
         return 0
         
@@ -44,4 +58,4 @@ def main():
 
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
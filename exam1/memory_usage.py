@@ -0,0 +1,76 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# PeakMemory blocks still running. Resetting the high-water mark for an
+# inner block must not lose the peak an enclosing block already reached.
+_open_blocks = []
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux and bytes on macOS.
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def current_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024.0 * 1024.0)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def reset_peak_rss() -> bool:
+    # Linux can drop the high-water mark back to the current RSS, which makes
+    # the next ru_maxrss reading the peak of just what runs in between.
+    peak = peak_rss_mb()
+    for block in list(_open_blocks):
+        block.carried_mb = max(block.carried_mb or 0.0, peak or 0.0)
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class PeakMemory:
+    # Peak RSS while the block runs, above the RSS it started with. Without
+    # a resettable high-water mark this is only how far the process-wide
+    # peak grew, so it reads 0 for work that stays under an earlier peak.
+    def __init__(self):
+        self.exact = False
+        self.start_mb = None
+        self.peak_mb = None
+        self.carried_mb = None
+
+    def __enter__(self):
+        self.exact = reset_peak_rss() and current_rss_mb() is not None
+        self.start_mb = current_rss_mb() if self.exact else peak_rss_mb()
+        _open_blocks.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self in _open_blocks:
+            _open_blocks.remove(self)
+        peak = peak_rss_mb()
+        if peak is not None and self.carried_mb is not None:
+            peak = max(peak, self.carried_mb)
+        if peak is not None and self.start_mb is not None:
+            self.peak_mb = max(0.0, peak - self.start_mb)
+        return False
+
+    def info(self) -> dict:
+        return {
+            'peak_mb': self.peak_mb,
+            'start_mb': self.start_mb,
+            'exact': self.exact
+        }
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'vtk_tutorial', 'meshes')
+
+CELL_TYPES = ('verts', 'lines', 'polys', 'strips')
+
+# Active attributes that are restored by role, not just by array name.
+ATTRIBUTES = {'normals': 'Normals', 'tcoords': 'TCoords', 'scalars': 'Scalars'}
+
+# Bumped whenever the on-disk layout changes, so old entries are rebuilt.
+CACHE_FORMAT = 1
+
+
+def source_stamp(path: str) -> dict:
+    stat = os.stat(path)
+    return {
+        'path': os.path.realpath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'format': CACHE_FORMAT
+    }
+
+
+def cell_arrays(mesh: vtk.vtkPolyData) -> dict:
+    arrays = {}
+    for cell_type in CELL_TYPES:
+        cells = getattr(mesh, 'Get' + cell_type.capitalize())()
+        if cells is None or cells.GetNumberOfCells() == 0:
+            continue
+        # int64 is what vtkCellArray keeps natively, so loading needs no cast.
+        arrays[cell_type + '.offsets'] = numpy_support.vtk_to_numpy(cells.GetOffsetsArray()).astype(np.int64, copy=False)
+        arrays[cell_type + '.connectivity'] = numpy_support.vtk_to_numpy(cells.GetConnectivityArray()).astype(np.int64, copy=False)
+    return arrays
+
+
+def attribute_arrays(data, prefix: str) -> tuple:
+    arrays = {}
+    entries = []
+    active = {role: getattr(data, 'Get' + method)() for role, method in ATTRIBUTES.items()}
+    for index in range(data.GetNumberOfArrays()):
+        array = data.GetArray(index)
+        if array is None:
+            # String and other non-numeric arrays have no NumPy form.
+            continue
+        key = f"{prefix}.{index}"
+        arrays[key] = numpy_support.vtk_to_numpy(array)
+        roles = [role for role, value in active.items() if value is not None and value is array]
+        entries.append({'key': key, 'name': array.GetName(), 'attribute': roles[0] if roles else None})
+    return arrays, entries
+
+
+def vtk_array(array: np.ndarray, array_type: int = None):
+    # deep=False keeps the mapped pages in place; the VTK array holds a
+    # reference to the NumPy array so the mapping lives as long as it does.
+    return numpy_support.numpy_to_vtk(array, deep=False, array_type=array_type)
+
+
+class MeshCache:
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, path: str) -> str:
+        # One entry per source path; size and mtime are checked on load, so an
+        # edited file replaces its entry instead of piling up new ones.
+        return hashlib.blake2b(os.path.realpath(path).encode(), digest_size=16).hexdigest()
+
+    def base(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def array_path(self, key: str, name: str) -> str:
+        return f"{self.base(key)}.{name}.npy"
+
+    def manifest_path(self, key: str) -> str:
+        return self.base(key) + '.json'
+
+    def __contains__(self, path: str) -> bool:
+        return self.manifest(path) is not None
+
+    def manifest(self, path: str) -> dict:
+        manifest_path = self.manifest_path(self.key_for(path))
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('source') != source_stamp(path):
+            return None
+        return manifest
+
+    def load(self, path: str) -> vtk.vtkPolyData:
+        manifest = self.manifest(path)
+        if manifest is None:
+            return None
+
+        key = self.key_for(path)
+        arrays = {}
+        for name, (shape, dtype) in manifest['arrays'].items():
+            # Copy-on-write mapping: pages are read from disk on first touch,
+            # and a filter writing in place gets private pages instead of
+            # changing the cache file.
+            array = np.load(self.array_path(key, name), mmap_mode='c')
+            if list(array.shape) != shape or str(array.dtype) != dtype:
+                return None
+            arrays[name] = array
+
+        mesh = vtk.vtkPolyData()
+        points = vtk.vtkPoints()
+        points.SetData(vtk_array(arrays['points']))
+        mesh.SetPoints(points)
+
+        for cell_type in CELL_TYPES:
+            if cell_type + '.offsets' not in arrays:
+                continue
+            cells = vtk.vtkCellArray()
+            cells.SetData(vtk_array(arrays[cell_type + '.offsets'], vtk.VTK_ID_TYPE),
+                          vtk_array(arrays[cell_type + '.connectivity'], vtk.VTK_ID_TYPE))
+            getattr(mesh, 'Set' + cell_type.capitalize())(cells)
+
+        for data, entries in ((mesh.GetPointData(), manifest['point_data']),
+                              (mesh.GetCellData(), manifest['cell_data'])):
+            for entry in entries:
+                array = vtk_array(arrays[entry['key']])
+                if entry['name'] is not None:
+                    array.SetName(entry['name'])
+                if entry['attribute'] is not None:
+                    getattr(data, 'Set' + ATTRIBUTES[entry['attribute']])(array)
+                else:
+                    data.AddArray(array)
+        return mesh
+
+    def store(self, path: str, mesh: vtk.vtkPolyData) -> str:
+        if mesh.GetPoints() is None:
+            raise ValueError("Cannot cache a mesh without points")
+
+        key = self.key_for(path)
+        arrays = {'points': numpy_support.vtk_to_numpy(mesh.GetPoints().GetData())}
+        arrays.update(cell_arrays(mesh))
+        point_arrays, point_entries = attribute_arrays(mesh.GetPointData(), 'point')
+        cell_data_arrays, cell_entries = attribute_arrays(mesh.GetCellData(), 'cell')
+        arrays.update(point_arrays)
+        arrays.update(cell_data_arrays)
+
+        manifest = {
+            'source': source_stamp(path),
+            'arrays': {name: [list(array.shape), str(array.dtype)] for name, array in arrays.items()},
+            'point_data': point_entries,
+            'cell_data': cell_entries
+        }
+
+        # Dropping the manifest first means a reader never pairs it with a
+        # half-replaced array; the new one is renamed into place last.
+        self.remove(path)
+        for name, array in arrays.items():
+            array_path = self.array_path(key, name)
+            with open(array_path + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(array_path + '.tmp', array_path)
+
+        manifest_path = self.manifest_path(key)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        return manifest_path
+
+    def remove(self, path: str):
+        self.remove_key(self.key_for(path))
+
+    def remove_key(self, key: str):
+        manifest_path = self.manifest_path(key)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        prefix = key + '.'
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.npy'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                self.remove_key(name[:-len('.json')])
+
+    def stats(self) -> dict:
+        entries = 0
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                entries += 1
+            if name.endswith('.npy') or name.endswith('.json'):
+                total += os.path.getsize(os.path.join(self.cache_dir, name))
+        return {
+            'entries': entries,
+            'size_mb': total / (1024.0 * 1024.0),
+            'cache_dir': self.cache_dir
+        }
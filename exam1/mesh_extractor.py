@@ -1,69 +1,543 @@
 import vtk
 import numpy as np
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import copy_tracker
+import image_bridge
+import mesh_smoothing
+import slab_processing
+from instrumentation import timed
+from ply_io import StreamingPLYWriter, read_ply, write_ply_mesh
+from result_cache import ResultCache
+from vtk.util import numpy_support
+
+
+ISOSURFACE_ENGINES = ('marching_cubes', 'flying_edges', 'surface_nets')
+
+
+# Layers of active bricks are merged into one region while the merged box has
+# at most this many times the cells of the two boxes it replaces.
+REGION_MERGE_GROWTH = 1.25
+
+# Above this fraction of the volume's cells a single full pass is cheaper than
+# contouring the active regions separately (measured with bench_isovalue_sweep).
+FULL_PASS_FRACTION = 0.3
+
+# Engines whose full pass is slow enough for the regions to win. Flying edges
+# was slower through the index at every size and active fraction measured.
+INDEXED_ENGINES = ('marching_cubes',)
+
+# Below this many cells the per-region padding and cropping costs more than
+# the skipped cells save.
+INDEX_MIN_CELLS = 1 << 20
+
+# Triangle fractions kept by the mesh LOD levels, finest first.
+MESH_LOD_FRACTIONS = (0.5, 0.25, 0.1)
+
+# Meshes below this many triangles render fast enough without LOD levels.
+MESH_LOD_MIN_TRIANGLES = 100000
+
+# Smoothing keeps a checkpoint every this many iterations besides the
+# requested count, so lowering the count resumes from close by as well.
+SMOOTHING_CHECKPOINT_INTERVAL = 5
+
+
+def brick_reduce(array: np.ndarray, brick_size: int, axis: int, ufunc) -> np.ndarray:
+    # Reduces whole blocks of brick_size planes through a reshape, then folds
+    # in the first plane of the following block, which the brick shares.
+    length = array.shape[axis]
+    bricks = max(1, -(-(length - 1) // brick_size))
+    moved = np.moveaxis(array, axis, 0)
+    whole = length // brick_size
+    
+    parts = []
+    if whole:
+        blocks = moved[:whole * brick_size].reshape((whole, brick_size) + moved.shape[1:])
+        parts.append(ufunc.reduce(blocks, axis=1))
+    if whole * brick_size < length:
+        parts.append(ufunc.reduce(moved[whole * brick_size:], axis=0, keepdims=True))
+    reduced = np.concatenate(parts)
+    
+    boundaries = np.arange(1, bricks) * brick_size
+    reduced = reduced[:bricks]
+    reduced[:bricks - 1] = ufunc(reduced[:bricks - 1], moved[boundaries])
+    if bricks * brick_size < length:
+        reduced[-1] = ufunc(reduced[-1], ufunc.reduce(moved[bricks * brick_size:], axis=0))
+    return np.moveaxis(reduced, 0, axis)
+
+
+def region_cells(region: tuple) -> int:
+    z0, z1, y0, y1, x0, x1 = region
+    return (z1 - z0) * (y1 - y0) * (x1 - x0)
+
+
+def read_obj(path: str) -> vtk.vtkPolyData:
+    reader = vtk.vtkOBJReader()
+    reader.SetFileName(path)
+    reader.Update()
+    return reader.GetOutput()
+
+
+def mesh_arrays(mesh) -> list:
+    arrays = []
+    if mesh.GetPoints() is not None:
+        arrays.append(mesh.GetPoints().GetData())
+    for cells in (mesh.GetVerts(), mesh.GetLines(), mesh.GetPolys(), mesh.GetStrips()):
+        if cells is not None and cells.GetNumberOfCells():
+            arrays.extend((cells.GetOffsetsArray(), cells.GetConnectivityArray()))
+    for data in (mesh.GetPointData(), mesh.GetCellData()):
+        for index in range(data.GetNumberOfArrays()):
+            if data.GetArray(index) is not None:
+                arrays.append(data.GetArray(index))
+    return arrays
+
+
+def array_buffers(mesh) -> dict:
+    # Keyed by the address of the values, so separate vtkDataArray objects
+    # over the same memory (shallow copies) count once.
+    buffers = {}
+    for array in mesh_arrays(mesh):
+        values = numpy_support.vtk_to_numpy(array)
+        if values.nbytes:
+            buffers[values.ctypes.data] = values.nbytes
+    return buffers
+
+
+def configure_smp(backend: str = None, threads: int = None) -> dict:
+    # Applies process-wide to every SMP-parallel VTK filter (flying edges,
+    # surface nets, ...). An unknown backend raises ValueError and leaves the
+    # previous backend in place; a failed SetBackend would otherwise have
+    # switched the process to Sequential.
+    if backend is not None:
+        previous = vtk.vtkSMPTools.GetBackend()
+        if not vtk.vtkSMPTools.SetBackend(backend):
+            vtk.vtkSMPTools.SetBackend(previous)
+            raise ValueError(f"VTK SMP backend '{backend}' is not available "
+                             f"(using {vtk.vtkSMPTools.GetBackend()})")
+    if threads is not None:
+        vtk.vtkSMPTools.Initialize(int(threads))
+    
+    return {
+        'backend': vtk.vtkSMPTools.GetBackend(),
+        'threads': vtk.vtkSMPTools.GetEstimatedNumberOfThreads()
+    }
 
 
 class MeshExtractor:
-    def __init__(self):
+    def __init__(self, engine: str = 'marching_cubes', smp_backend: str = None,
+                 smp_threads: int = None, smoothing_cache_mb: float = 256.0, mesh_cache=None):
+        if engine not in ISOSURFACE_ENGINES:
+            raise ValueError(f"Unknown isosurface engine '{engine}', expected one of {ISOSURFACE_ENGINES}")
+        if smp_backend is not None or smp_threads is not None:
+            configure_smp(smp_backend, smp_threads)
+        
+        self.engine = engine
         self.vtk_image_data = None
+        self.volume_array = None
+        self.volume_spacing = (1.0, 1.0, 1.0)
+        self.volume_origin = (0.0, 0.0, 0.0)
+        self.brick_index = None
         self.mesh_data = None
         self.original_mesh_data = None
+        self.original_stamp = []
         self.renderer = None
         self.render_window = None
         self.interactor = None
+        self.progress = None
+        self.lod_executor = None
+        self.lod_future = None
+        self.smoothing_cache = ResultCache(smoothing_cache_mb)
+        self.mesh_cache = mesh_cache
+    
+    def check_cancelled(self):
+        if self.progress is not None:
+            self.progress.check()
         
+    @timed('mesh.vtk_image')
     def numpy_to_vtk_image(self, numpy_array: np.ndarray, 
                           spacing: tuple = (1.0, 1.0, 1.0),
-                          origin: tuple = (0.0, 0.0, 0.0)):
+                          origin: tuple = (0.0, 0.0, 0.0),
+                          preserve_dtype: bool = False):
         if numpy_array.ndim != 3:
             raise ValueError("Array must be 3D")
         
-        if numpy_array.dtype != np.uint8:
+        if not preserve_dtype and numpy_array.dtype != np.uint8:
+            copy_tracker.record('extractor.to_uint8', numpy_array.nbytes)
             numpy_array = numpy_array.astype(np.uint8)
         
-        numpy_array = np.transpose(numpy_array, (2, 1, 0))
-        
-        flat_array = numpy_array.ravel(order='F')
-        vtk_array = vtk.vtkUnsignedCharArray()
-        vtk_array.SetNumberOfTuples(len(flat_array))
-        for i, val in enumerate(flat_array):
-            vtk_array.SetValue(i, val)
-        
-        image_data = vtk.vtkImageData()
-        image_data.SetDimensions(numpy_array.shape)
-        image_data.SetSpacing(spacing)
-        image_data.SetOrigin(origin)
-        image_data.GetPointData().SetScalars(vtk_array)
+        image_data = image_bridge.numpy_to_vtk_image(numpy_array, spacing, origin)
         
         self.vtk_image_data = image_data
+        self.volume_array = numpy_array
+        self.volume_spacing = tuple(spacing)
+        self.volume_origin = tuple(origin)
+        self.brick_index = None
         return image_data
     
-    def extract_isosurface(self, isovalue: float = 128.0):
+    @timed('mesh.isosurface')
+    def extract_isosurface(self, isovalue: float = 128.0, engine: str = None,
+                           use_index: bool = False):
         if self.vtk_image_data is None:
             raise ValueError("No VTK image data available")
         
-        marching_cubes = vtk.vtkMarchingCubes()
-        marching_cubes.SetInputData(self.vtk_image_data)
-        marching_cubes.SetValue(0, isovalue)
-        marching_cubes.Update()
+        if engine is None:
+            engine = self.engine
+        if engine not in ISOSURFACE_ENGINES:
+            raise ValueError(f"Unknown isosurface engine '{engine}', expected one of {ISOSURFACE_ENGINES}")
         
-        self.mesh_data = marching_cubes.GetOutput()
+        if engine == 'surface_nets':
+            self.mesh_data = self.extract_surface_nets(isovalue)
+        elif use_index and self.volume_array is not None:
+            self.mesh_data = self.extract_active_regions(isovalue, engine)
+        else:
+            self.mesh_data = self.contour(self.vtk_image_data, isovalue, engine)
         return self.mesh_data
     
-    def smooth_mesh(self, iterations: int = 15, relaxation_factor: float = 0.1):
-        if self.mesh_data is None:
+    def contour(self, image_data, isovalue: float, engine: str, normals: bool = True):
+        if engine == 'flying_edges':
+            contour = vtk.vtkFlyingEdges3D()
+        else:
+            contour = vtk.vtkMarchingCubes()
+        contour.SetComputeNormals(normals)
+        contour.SetInputData(image_data)
+        contour.SetValue(0, isovalue)
+        if self.progress is not None:
+            self.progress.watch_vtk_filter(contour, 'isosurface')
+        contour.Update()
+        self.check_cancelled()
+        
+        return contour.GetOutput()
+    
+    def build_brick_index(self, brick_size: int = 16) -> dict:
+        if self.volume_array is None:
+            raise ValueError("No volume data available")
+        
+        start = time.perf_counter()
+        
+        # Brick k owns the cells [k*B, (k+1)*B) along each axis, which touch
+        # the points [k*B, (k+1)*B]. Min/max are separable, so they are reduced
+        # one axis at a time, starting with z where the blocks are contiguous.
+        minimum = self.volume_array
+        maximum = self.volume_array
+        for axis in range(3):
+            minimum = brick_reduce(minimum, brick_size, axis, np.minimum)
+            maximum = brick_reduce(maximum, brick_size, axis, np.maximum)
+        
+        # Span space: bricks sorted by their minimum, so the candidates for an
+        # isovalue are a prefix found by binary search.
+        order = np.argsort(minimum, axis=None, kind='stable')
+        self.brick_index = {
+            'brick_size': brick_size,
+            'shape': minimum.shape,
+            'min': minimum.ravel()[order],
+            'max': maximum.ravel()[order],
+            'order': order
+        }
+        return {
+            'bricks': int(minimum.size),
+            'brick_size': brick_size,
+            'seconds': time.perf_counter() - start
+        }
+    
+    def active_bricks(self, isovalue: float) -> np.ndarray:
+        if self.brick_index is None:
+            self.build_brick_index()
+        
+        index = self.brick_index
+        candidates = np.searchsorted(index['min'], isovalue, side='right')
+        active = index['order'][:candidates][index['max'][:candidates] >= isovalue]
+        return np.stack(np.unravel_index(active, index['shape']), axis=-1)
+    
+    def active_regions(self, isovalue: float) -> list:
+        # One y/x bounding box per layer of bricks, with neighbouring layers
+        # merged while that adds little work. Regions are (z0, z1, y0, y1, x0, x1)
+        # point ranges with inclusive stops.
+        bricks = self.active_bricks(isovalue)
+        brick_size = self.brick_index['brick_size']
+        shape = self.volume_array.shape
+        
+        boxes = []
+        for layer in np.unique(bricks[:, 0]):
+            members = bricks[bricks[:, 0] == layer]
+            box = (layer, layer + 1, members[:, 1].min(), members[:, 1].max() + 1,
+                   members[:, 2].min(), members[:, 2].max() + 1)
+            if boxes and boxes[-1][1] == layer:
+                previous = boxes[-1]
+                merged = (previous[0], box[1], min(previous[2], box[2]), max(previous[3], box[3]),
+                          min(previous[4], box[4]), max(previous[5], box[5]))
+                if region_cells(merged) <= REGION_MERGE_GROWTH * (region_cells(previous) + region_cells(box)):
+                    boxes[-1] = merged
+                    continue
+            boxes.append(box)
+        
+        limits = (shape[0] - 1, shape[1] - 1, shape[2] - 1)
+        return [tuple(min(int(value) * brick_size, limits[axis // 2]) for axis, value in enumerate(box))
+                for box in boxes]
+    
+    def extract_active_regions(self, isovalue: float, engine: str = None):
+        if engine is None:
+            engine = self.engine
+        
+        shape = self.volume_array.shape
+        volume_cells = (shape[0] - 1) * (shape[1] - 1) * (shape[2] - 1)
+        if engine not in INDEXED_ENGINES or volume_cells < INDEX_MIN_CELLS:
+            return self.contour(self.vtk_image_data, isovalue, engine)
+        
+        regions = self.active_regions(isovalue)
+        if not regions:
+            return vtk.vtkPolyData()
+        
+        if sum(region_cells(region) for region in regions) > FULL_PASS_FRACTION * volume_cells:
+            # Regions only pay off while they skip most of the volume; past
+            # that, one pass over everything is faster than several smaller ones.
+            return self.contour(self.vtk_image_data, isovalue, engine)
+        
+        spacing = self.volume_spacing
+        meshes = []
+        for z0, z1, y0, y1, x0, x1 in regions:
+            # One voxel of padding gives the gradient normals on the region
+            # faces the same central differences as a full pass; the
+            # triangles of the padding cells are cropped again afterwards.
+            low = (max(z0 - 1, 0), max(y0 - 1, 0), max(x0 - 1, 0))
+            high = (min(z1 + 1, shape[0] - 1), min(y1 + 1, shape[1] - 1), min(x1 + 1, shape[2] - 1))
+            block = np.ascontiguousarray(self.volume_array[low[0]:high[0] + 1, low[1]:high[1] + 1,
+                                                           low[2]:high[2] + 1])
+            # The block keeps the volume's origin and is placed by its extent,
+            # so its points get bit-identical coordinates to a full pass and
+            # vertices hit exactly by the isovalue merge the same way.
+            image = image_bridge.numpy_to_vtk_image(block, spacing, self.volume_origin)
+            image.SetExtent(low[2], high[2], low[1], high[1], low[0], high[0])
+            mesh = self.contour(image, isovalue, engine)
+            mesh = self.crop_cells(mesh, (x0, y0, z0), (x1, y1, z1))
+            if mesh.GetNumberOfPolys() > 0:
+                # An empty contour carries no normals, and appending it would
+                # drop them from the whole merge.
+                meshes.append(mesh)
+        
+        if not meshes:
+            return vtk.vtkPolyData()
+        if len(meshes) == 1:
+            return meshes[0]
+        
+        append = vtk.vtkAppendPolyData()
+        for mesh in meshes:
+            append.AddInputData(mesh)
+        
+        # Seam points come from the same edge of both regions with identical
+        # coordinates, so they merge exactly, as within a single pass.
+        clean = vtk.vtkStaticCleanPolyData()
+        clean.SetInputConnection(append.GetOutputPort())
+        clean.ToleranceIsAbsoluteOn()
+        clean.SetAbsoluteTolerance(0.0)
+        clean.ConvertPolysToLinesOff()
+        clean.Update()
+        return clean.GetOutput()
+    
+    def crop_cells(self, mesh, lower: tuple, upper: tuple):
+        # Keeps the triangles of cells lower..upper-1 (x, y, z voxel
+        # indices); a triangle lies inside the cell that contains its
+        # centroid.
+        if mesh.GetNumberOfPolys() == 0:
+            return mesh
+        points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData())
+        triangles = numpy_support.vtk_to_numpy(mesh.GetPolys().GetConnectivityArray()).reshape(-1, 3)
+        centroids = points[triangles].astype(np.float64).mean(axis=1)
+        cells = np.floor((centroids - self.volume_origin) / self.volume_spacing)
+        # Triangles flat on the far faces of the volume belong to its last cells.
+        cells = np.minimum(cells, np.array(self.volume_array.shape[::-1]) - 2)
+        keep = np.all((cells >= lower) & (cells < upper), axis=1)
+        if keep.all():
+            return mesh
+        
+        # Points of the padding cells go as well; left in, the seam merge
+        # could keep their one-sided normals.
+        used, kept = np.unique(triangles[keep].reshape(-1), return_inverse=True)
+        polys = vtk.vtkCellArray()
+        polys.SetData(numpy_support.numpy_to_vtk(np.arange(0, len(kept) + 1, 3), deep=1,
+                                                 array_type=vtk.VTK_ID_TYPE),
+                      numpy_support.numpy_to_vtk(kept, deep=1, array_type=vtk.VTK_ID_TYPE))
+        cropped = vtk.vtkPolyData()
+        cropped_points = vtk.vtkPoints()
+        cropped_points.SetData(numpy_support.numpy_to_vtk(points[used], deep=1))
+        cropped.SetPoints(cropped_points)
+        # Marching cubes leaves its scalars and normals unnamed, so the
+        # attributes are matched by array rather than by name.
+        point_data = mesh.GetPointData()
+        for index in range(point_data.GetNumberOfArrays()):
+            source = point_data.GetArray(index)
+            array = numpy_support.numpy_to_vtk(numpy_support.vtk_to_numpy(source)[used], deep=1)
+            array.SetName(source.GetName())
+            attribute = point_data.IsArrayAnAttribute(index)
+            if attribute >= 0:
+                cropped.GetPointData().SetAttribute(array, attribute)
+            else:
+                cropped.GetPointData().AddArray(array)
+        cropped.SetPolys(polys)
+        return cropped
+    
+    def extract_isosurface_out_of_core(self, source: np.ndarray, output_path: str,
+                                       isovalue: float = 128.0,
+                                       spacing: tuple = (1.0, 1.0, 1.0),
+                                       origin: tuple = (0.0, 0.0, 0.0),
+                                       engine: str = None,
+                                       memory_budget_mb: float = 256.0) -> dict:
+        if engine is None:
+            engine = self.engine
+        if engine not in ('marching_cubes', 'flying_edges'):
+            # Surface nets smooths across the whole label image, so slabs
+            # would not line up at their seams.
+            raise ValueError(f"Streaming extraction supports marching_cubes and flying_edges, not '{engine}'")
+        if source.ndim != 3:
+            raise ValueError("Array must be 3D")
+        
+        start_time = time.perf_counter()
+        depth = source.shape[0]
+        slab_depth = slab_processing.slab_depth_for_budget(source.shape, source.dtype.itemsize, 0,
+                                                           memory_budget_mb)
+        slabs = [(z0, min(z0 + slab_depth, depth - 1)) for z0 in range(0, max(1, depth - 1), slab_depth)]
+        
+        seam_keys = np.empty(0, dtype='V12')
+        seam_ids = np.empty(0, dtype=np.int64)
+        merged = 0
+        with StreamingPLYWriter(output_path) as writer:
+            for index, (z0, z1) in enumerate(slabs):
+                # Slabs share their boundary plane. Giving each slab its true
+                # z extent under the volume origin makes VTK compute every
+                # vertex from the same global indices, so seam vertices of
+                # neighbouring slabs are bit-identical.
+                image = image_bridge.numpy_to_vtk_image(source[z0:z1 + 1], spacing, origin)
+                columns, rows = image.GetDimensions()[:2]
+                image.SetExtent(0, columns - 1, 0, rows - 1, z0, z1)
+                mesh = self.contour(image, isovalue, engine, normals=False)
+                del image
+                
+                points = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()) \
+                    if mesh.GetNumberOfPoints() else np.empty((0, 3), dtype=np.float32)
+                triangles = numpy_support.vtk_to_numpy(mesh.GetPolys().GetConnectivityArray()).reshape(-1, 3)
+                keys = np.ascontiguousarray(points, dtype=np.float32).view('V12').ravel()
+                
+                # Vertices already written by the previous slab keep their id;
+                # the rest are appended and numbered after everything so far.
+                ids = np.full(len(points), -1, dtype=np.int64)
+                if len(seam_keys) and len(keys):
+                    position = np.minimum(np.searchsorted(seam_keys, keys), len(seam_keys) - 1)
+                    shared = seam_keys[position] == keys
+                    ids[shared] = seam_ids[position[shared]]
+                    merged += int(shared.sum())
+                fresh = ids < 0
+                ids[fresh] = writer.add_vertices(points[fresh]) + np.arange(int(fresh.sum()))
+                writer.add_triangles(ids[triangles])
+                
+                # Only vertices on the far plane can be shared with the next
+                # slab; carrying the last half cell is enough to catch them.
+                on_seam = points[:, 2] >= origin[2] + (z1 - 0.5) * spacing[2]
+                order = np.argsort(keys[on_seam])
+                seam_keys = keys[on_seam][order]
+                seam_ids = ids[on_seam][order]
+                
+                del mesh, points, triangles, keys, ids
+                slab_processing.release_planes(source, 0, z1)
+                if self.progress is not None:
+                    self.progress.report('isosurface slabs', (index + 1) / len(slabs))
+                self.check_cancelled()
+            
+            info = {
+                'path': output_path,
+                'points': writer.vertices,
+                'triangles': writer.faces,
+                'slabs': len(slabs),
+                'slab_depth': slab_depth,
+                'merged_seam_points': merged
+            }
+        
+        info['seconds'] = time.perf_counter() - start_time
+        return info
+    
+    def extract_surface_nets(self, isovalue: float):
+        # Surface nets works on labels, so the volume is first split into
+        # inside/outside of the isovalue; its built-in smoothing replaces the
+        # separate smoothing pass the other engines need.
+        threshold = vtk.vtkImageThreshold()
+        threshold.SetInputData(self.vtk_image_data)
+        threshold.ThresholdByUpper(isovalue)
+        threshold.SetInValue(1)
+        threshold.SetOutValue(0)
+        threshold.SetOutputScalarTypeToUnsignedChar()
+        
+        surface_nets = vtk.vtkSurfaceNets3D()
+        surface_nets.SetInputConnection(threshold.GetOutputPort())
+        surface_nets.SetValue(0, 1)
+        surface_nets.SetBackgroundLabel(0)
+        surface_nets.SetOutputMeshTypeToTriangles()
+        
+        normals = vtk.vtkPolyDataNormals()
+        normals.SetInputConnection(surface_nets.GetOutputPort())
+        normals.SplittingOff()
+        normals.ConsistencyOff()
+        if self.progress is not None:
+            self.progress.watch_vtk_filter(surface_nets, 'isosurface')
+        normals.Update()
+        self.check_cancelled()
+        
+        mesh = normals.GetOutput()
+        # The boundary-label cell data would otherwise drive the mapper colours.
+        mesh.GetCellData().Initialize()
+        return mesh
+    
+    def needs_smoothing(self, engine: str = None) -> bool:
+        return (engine or self.engine) != 'surface_nets'
+    
+    @timed('mesh.smooth')
+    def smooth_mesh(self, iterations: int = 15, relaxation_factor: float = 0.1,
+                    method: str = 'laplacian', mesh=None):
+        mesh = mesh if mesh is not None else self.mesh_data
+        if mesh is None:
             raise ValueError("No mesh data available")
+        if method not in mesh_smoothing.SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing method '{method}', expected one of "
+                             f"{mesh_smoothing.SMOOTHING_METHODS}")
         
-        smoother = vtk.vtkSmoothPolyDataFilter()
-        smoother.SetInputData(self.mesh_data)
-        smoother.SetNumberOfIterations(iterations)
-        smoother.SetRelaxationFactor(relaxation_factor)
-        smoother.FeatureEdgeSmoothingOff()
-        smoother.BoundarySmoothingOn()
-        smoother.Update()
+        smoothed = vtk.vtkPolyData()
+        smoothed.ShallowCopy(mesh)
+        if iterations <= 0 or mesh.GetNumberOfPoints() == 0:
+            self.mesh_data = smoothed
+            return smoothed
         
-        self.mesh_data = smoother.GetOutput()
-        return self.mesh_data
+        # Results are cached per source mesh and iteration count. Asking for
+        # more iterations resumes from the nearest cached state below, so
+        # going from 20 to 25 only runs the last 5.
+        source = (id(mesh), mesh.GetMTime(), method, relaxation_factor)
+        done = iterations
+        while done > 0 and (source, done) not in self.smoothing_cache:
+            done -= 1
+        points = self.smoothing_cache.get((source, done)) if done else None
+        
+        if done < iterations:
+            topology = self.smoothing_cache.get((source, 'topology'))
+            if topology is None:
+                topology = mesh_smoothing.mesh_topology(mesh)
+                self.smoothing_cache.put((source, 'topology'), topology,
+                                         sum(v.nbytes for v in topology.values() if isinstance(v, np.ndarray)))
+            if points is None:
+                points = mesh_smoothing.mesh_points(mesh)
+            
+            for step in range(done + 1, iterations + 1):
+                points = mesh_smoothing.smoothing_step(points, topology, method, relaxation_factor)
+                if step == iterations or step % SMOOTHING_CHECKPOINT_INTERVAL == 0:
+                    self.smoothing_cache.put((source, step), points, points.nbytes)
+                if self.progress is not None:
+                    self.progress.report('smoothing', (step - done) / (iterations - done))
+                self.check_cancelled()
+        
+        point_type = numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()).dtype
+        vtk_points = vtk.vtkPoints()
+        vtk_points.SetData(numpy_support.numpy_to_vtk(points.astype(point_type)))
+        smoothed.SetPoints(vtk_points)
+        
+        self.mesh_data = smoothed
+        return smoothed
     
     def create_mesh_actor(self, color: tuple = (1.0, 0.8, 0.6), 
                          opacity: float = 1.0):
@@ -80,20 +554,154 @@ class MeshExtractor:
         
         return actor
     
+    @timed('mesh.lod_pyramid')
+    def build_mesh_pyramid(self, mesh=None, fractions: tuple = MESH_LOD_FRACTIONS) -> list:
+        mesh = mesh if mesh is not None else self.mesh_data
+        if mesh is None:
+            raise ValueError("No mesh data available")
+        if mesh.GetNumberOfPolys() < MESH_LOD_MIN_TRIANGLES:
+            return []
+        
+        source = mesh
+        if mesh.GetPolys().IsHomogeneous() != 3:
+            triangles = vtk.vtkTriangleFilter()
+            triangles.SetInputData(mesh)
+            triangles.Update()
+            source = triangles.GetOutput()
+        
+        # Each level is decimated from the previous one, so the coarse levels
+        # cost a fraction of the first.
+        pyramid = []
+        kept = 1.0
+        for fraction in fractions:
+            decimate = vtk.vtkQuadricDecimation()
+            decimate.SetInputData(source)
+            decimate.SetTargetReduction(1.0 - fraction / kept)
+            
+            normals = vtk.vtkPolyDataNormals()
+            normals.SetInputConnection(decimate.GetOutputPort())
+            normals.SplittingOff()
+            normals.Update()
+            
+            source = normals.GetOutput()
+            kept = fraction
+            pyramid.append(source)
+        
+        return pyramid
+    
+    def start_mesh_pyramid(self, mesh=None, on_done=None, on_error=None,
+                           fractions: tuple = MESH_LOD_FRACTIONS):
+        # Decimation releases the GIL, so the pyramid is built on its own
+        # thread while the full mesh is already on screen. A build that has
+        # not started yet is dropped in favour of the newer mesh.
+        mesh = mesh if mesh is not None else self.mesh_data
+        if self.lod_executor is None:
+            self.lod_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mesh-lod')
+        if self.lod_future is not None:
+            self.lod_future.cancel()
+        
+        # Nobody waits on the future, so a failure has to be reported here
+        # or it would vanish with it.
+        def job():
+            try:
+                pyramid = self.build_mesh_pyramid(mesh, fractions)
+                if on_done is not None:
+                    on_done(mesh, pyramid)
+                return pyramid
+            except Exception as e:
+                if on_error is not None:
+                    on_error(mesh, e)
+                return []
+        
+        self.lod_future = self.lod_executor.submit(job)
+        return self.lod_future
+    
+    def read_mesh_file(self, path: str, read):
+        # Parsed once per file version; later loads map the cached arrays.
+        if self.mesh_cache is not None:
+            try:
+                mesh = self.mesh_cache.load(path)
+                if mesh is not None:
+                    return mesh
+            except Exception:
+                pass
+        
+        mesh = read(path)
+        
+        if self.mesh_cache is not None and mesh.GetNumberOfPoints() > 0:
+            try:
+                self.mesh_cache.store(path, mesh)
+            except Exception:
+                pass
+        return mesh
+    
+    @timed('mesh.load_obj')
     def load_obj_file(self, obj_file_path: str):
         if not os.path.exists(obj_file_path):
             raise FileNotFoundError(f"OBJ file not found: {obj_file_path}")
         
-        reader = vtk.vtkOBJReader()
-        reader.SetFileName(obj_file_path)
-        reader.Update()
+        mesh = self.read_mesh_file(obj_file_path, read_obj)
         
-        self.mesh_data = reader.GetOutput()
-        
-        if self.mesh_data.GetNumberOfPoints() == 0:
+        if mesh.GetNumberOfPoints() == 0:
             raise ValueError(f"OBJ file contains no geometry: {obj_file_path}")
         
-        return self.mesh_data
+        return self.set_original_mesh(mesh)
+    
+    @timed('mesh.load_ply')
+    def load_ply_file(self, ply_file_path: str):
+        if not os.path.exists(ply_file_path):
+            raise FileNotFoundError(f"PLY file not found: {ply_file_path}")
+        
+        mesh = self.read_mesh_file(ply_file_path, read_ply)
+        
+        if mesh.GetNumberOfPoints() == 0:
+            raise ValueError(f"PLY file contains no geometry: {ply_file_path}")
+        
+        return self.set_original_mesh(mesh)
+    
+    def set_original_mesh(self, mesh):
+        # The loaded mesh is never modified: smoothing shares its topology and
+        # attributes through shallow copies and only allocates new points,
+        # and the LOD levels and normals come out of filters. Its array
+        # timestamps are kept so an accidental in-place edit shows up.
+        self.original_mesh_data = mesh
+        self.original_stamp = [array.GetMTime() for array in mesh_arrays(mesh)]
+        self.mesh_data = mesh
+        return mesh
+    
+    def original_intact(self) -> bool:
+        if self.original_mesh_data is None:
+            return True
+        return [array.GetMTime() for array in mesh_arrays(self.original_mesh_data)] == self.original_stamp
+    
+    def get_sharing_info(self, mesh=None) -> dict:
+        mesh = mesh if mesh is not None else self.mesh_data
+        if mesh is None:
+            return {}
+        
+        buffers = array_buffers(mesh)
+        original = array_buffers(self.original_mesh_data) if self.original_mesh_data is not None else {}
+        shared = sum(nbytes for address, nbytes in buffers.items() if address in original)
+        return {
+            'shared_mb': shared / (1024.0 * 1024.0),
+            'unique_mb': (sum(buffers.values()) - shared) / (1024.0 * 1024.0),
+            'original_mb': sum(original.values()) / (1024.0 * 1024.0),
+            'original_intact': self.original_intact()
+        }
+    
+    def load_mesh_file(self, mesh_file_path: str):
+        extension = os.path.splitext(mesh_file_path)[1].lower()
+        if extension == '.ply':
+            return self.load_ply_file(mesh_file_path)
+        if extension == '.obj':
+            return self.load_obj_file(mesh_file_path)
+        raise ValueError(f"Unsupported mesh file type '{extension}', expected .obj or .ply")
+    
+    def save_ply_file(self, ply_file_path: str, mesh=None) -> str:
+        mesh = mesh if mesh is not None else self.mesh_data
+        if mesh is None:
+            raise ValueError("No mesh to save")
+        return write_ply_mesh(ply_file_path, mesh)
     
     def get_mesh_info(self) -> dict:
         if self.mesh_data is None:
@@ -0,0 +1,108 @@
+import numpy as np
+from vtk.util import numpy_support
+
+
+SMOOTHING_METHODS = ('laplacian', 'taubin')
+
+# Boundary vertices whose two boundary edges bend by more than this many
+# degrees are corners and stay fixed (vtkSmoothPolyDataFilter's EdgeAngle).
+EDGE_ANGLE = 15.0
+
+# Taubin's pass-band frequency; the inflating step follows from it and the
+# shrinking factor as 1 / (pass_band - 1 / factor).
+TAUBIN_PASS_BAND = 0.1
+
+
+def mesh_points(mesh) -> np.ndarray:
+    return numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()).astype(np.float64)
+
+
+def mesh_topology(mesh, boundary_smoothing: bool = True, edge_angle: float = EDGE_ANGLE) -> dict:
+    # Same vertex rules as vtkSmoothPolyDataFilter without feature edges:
+    # interior vertices move towards all their edge neighbours, vertices on
+    # exactly two boundary (or non-manifold) edges slide along them unless
+    # the boundary turns a corner there, and any other vertex stays put.
+    points = mesh.GetNumberOfPoints()
+    polys = mesh.GetPolys()
+    # Indices fit in int32 for any mesh this is used on, which halves the
+    # temporaries; only the packed edge keys need 64 bits.
+    index_type = np.int32 if points < 2 ** 31 else np.int64
+    offsets = numpy_support.vtk_to_numpy(polys.GetOffsetsArray())
+    connectivity = numpy_support.vtk_to_numpy(polys.GetConnectivityArray()).astype(index_type)
+
+    following = np.arange(1, len(connectivity) + 1, dtype=index_type)
+    filled = np.diff(offsets) > 0
+    following[offsets[1:][filled] - 1] = offsets[:-1][filled]
+    second = connectivity[following] if len(connectivity) else connectivity
+    del following
+
+    keys = np.minimum(connectivity, second).astype(np.int64)
+    keys *= points
+    keys += np.maximum(connectivity, second)
+    del connectivity, second
+    keys, uses = np.unique(keys, return_counts=True)
+    low = (keys // points).astype(index_type)
+    high = (keys % points).astype(index_type)
+    edges = len(keys)
+    del keys
+    boundary = uses != 2
+
+    boundary_edges = np.bincount(low[boundary], minlength=points) + \
+        np.bincount(high[boundary], minlength=points)
+    interior = (boundary_edges == 0) & (np.bincount(np.concatenate([low, high]), minlength=points) > 0)
+    sliding = boundary_edges == 2 if boundary_smoothing else np.zeros(points, dtype=bool)
+    if sliding.any():
+        ends = np.concatenate([np.stack([low[boundary], high[boundary]], axis=1),
+                               np.stack([high[boundary], low[boundary]], axis=1)])
+        ends = ends[sliding[ends[:, 0]]]
+        ends = ends[np.argsort(ends[:, 0], kind='stable')].reshape(-1, 2, 2)
+        vertex = ends[:, 0, 0]
+        coordinates = mesh_points(mesh)
+        incoming = coordinates[vertex] - coordinates[ends[:, 0, 1]]
+        outgoing = coordinates[ends[:, 1, 1]] - coordinates[vertex]
+        lengths = np.linalg.norm(incoming, axis=1) * np.linalg.norm(outgoing, axis=1)
+        cosine = np.einsum('ij,ij->i', incoming, outgoing) / np.where(lengths > 0, lengths, 1.0)
+        sliding[vertex[(lengths > 0) & (cosine < np.cos(np.radians(edge_angle)))]] = False
+
+    keep_low = interior[low] | (sliding[low] & boundary)
+    keep_high = interior[high] | (sliding[high] & boundary)
+    source = np.concatenate([low[keep_low], high[keep_high]])
+    target = np.concatenate([high[keep_low], low[keep_high]])
+    del low, high, keep_low, keep_high
+
+    # Neighbours grouped by vertex, so one reduceat sums them all.
+    order = np.argsort(source, kind='stable')
+    source = source[order]
+    target = target[order]
+    del order
+    degree = np.bincount(source, minlength=points)
+    moving = np.flatnonzero(degree)
+    return {
+        'points': points,
+        'target': target,
+        'starts': np.searchsorted(source, moving),
+        'degree': degree[moving, None].astype(np.float64),
+        'moving': moving,
+        'edges': edges
+    }
+
+
+def laplacian_step(points: np.ndarray, topology: dict, factor: float) -> np.ndarray:
+    # One Jacobi sweep: every moving vertex is pulled `factor` of the way to
+    # the mean of its neighbours, all from the previous positions.
+    moving = topology['moving']
+    result = points.copy()
+    if len(moving) == 0:
+        return result
+    neighbour_sum = np.add.reduceat(np.take(points, topology['target'], axis=0), topology['starts'], axis=0)
+    result[moving] += factor * (neighbour_sum / topology['degree'] - points[moving])
+    return result
+
+
+def smoothing_step(points: np.ndarray, topology: dict, method: str, factor: float) -> np.ndarray:
+    if method == 'taubin':
+        # A shrinking step followed by a slightly stronger inflating one
+        # keeps the volume that plain Laplacian smoothing eats away.
+        inflate = 1.0 / (TAUBIN_PASS_BAND - 1.0 / factor)
+        return laplacian_step(laplacian_step(points, topology, factor), topology, inflate)
+    return laplacian_step(points, topology, factor)
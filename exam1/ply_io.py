@@ -0,0 +1,458 @@
+import os
+import shutil
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+
+FACE_DTYPE = np.dtype([('count', 'u1'), ('indices', '<i4', (3,))])
+
+PLY_FORMATS = {'ascii': None, 'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'
+}
+
+# Faces per block when writing, so a large mesh never needs a second full
+# copy of its connectivity in PLY layout.
+PLY_WRITE_CHUNK = 1 << 20
+
+# Variable-size records are located in blocks of this many; a power of two.
+RECORD_STRIDE = 64
+
+
+def ply_header(vertices: int, faces: int, normals: bool = False) -> bytes:
+    normal_properties = "property float nx\nproperty float ny\nproperty float nz\n" if normals else ""
+    return (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {vertices}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"{normal_properties}"
+        f"element face {faces}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    ).encode('ascii')
+
+
+def read_ply_header(path: str) -> dict:
+    elements = []
+    file_format = None
+    with open(path, 'rb') as f:
+        if f.readline().strip() != b'ply':
+            raise ValueError(f"Not a PLY file: {path}")
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"PLY header has no end_header: {path}")
+            words = line.decode('ascii', 'replace').split()
+            if not words or words[0] in ('comment', 'obj_info'):
+                continue
+            if words[0] == 'end_header':
+                break
+            if words[0] == 'format':
+                if words[1] not in PLY_FORMATS:
+                    raise ValueError(f"Unknown PLY format '{words[1]}'")
+                file_format = words[1]
+            elif words[0] == 'element':
+                elements.append({'name': words[1], 'count': int(words[2]), 'properties': []})
+            elif words[0] == 'property' and elements:
+                if words[1] == 'list':
+                    elements[-1]['properties'].append({'name': words[4], 'count_type': PLY_TYPES[words[2]],
+                                                       'type': PLY_TYPES[words[3]]})
+                else:
+                    elements[-1]['properties'].append({'name': words[2], 'type': PLY_TYPES[words[1]]})
+            else:
+                raise ValueError(f"Unexpected PLY header line: {line!r}")
+        data_offset = f.tell()
+
+    if file_format is None:
+        raise ValueError(f"PLY header has no format line: {path}")
+    for element in elements:
+        if sum('count_type' in prop for prop in element['properties']) > 1:
+            raise ValueError(f"PLY element '{element['name']}' has more than one list property")
+    return {'format': file_format, 'elements': elements, 'data_offset': data_offset}
+
+
+def split_list_element(element: dict) -> tuple:
+    # Scalars before the list, the list itself, scalars after it.
+    properties = element['properties']
+    for index, prop in enumerate(properties):
+        if 'count_type' in prop:
+            return properties[:index], prop, properties[index + 1:]
+    return properties, None, []
+
+
+def scalar_dtype(properties: list, byte_order: str) -> np.dtype:
+    return np.dtype([(prop['name'], byte_order + prop['type']) for prop in properties])
+
+
+def read_binary_element(data: np.ndarray, offset: int, element: dict, byte_order: str) -> tuple:
+    before, list_prop, after = split_list_element(element)
+    count = element['count']
+    if list_prop is None:
+        dtype = scalar_dtype(before, byte_order)
+        records = np.frombuffer(data, dtype, count, offset)
+        return {name: records[name] for name in dtype.names}, offset + count * dtype.itemsize
+
+    # A triangle mesh is one run of fixed-size records: try viewing the whole
+    # element with the first list length and keep it if every record agrees.
+    count_type = byte_order + list_prop['count_type']
+    item_type = byte_order + list_prop['type']
+    leading = scalar_dtype(before, byte_order).itemsize
+    if count == 0 or offset + leading + np.dtype(count_type).itemsize > len(data):
+        if count == 0:
+            values = {prop['name']: np.empty(0, byte_order + prop['type']) for prop in before + after}
+            values[list_prop['name']] = (np.zeros(1, dtype=np.int64), np.empty(0, dtype=item_type))
+            return values, offset
+        raise ValueError(f"PLY element '{element['name']}' is truncated")
+    length = int(np.frombuffer(data, count_type, 1, offset + leading)[0])
+    fields = [(prop['name'], byte_order + prop['type']) for prop in before]
+    fields.append(('_length', count_type))
+    if length:
+        fields.append(('_items', item_type, (length,)))
+    fields.extend((prop['name'], byte_order + prop['type']) for prop in after)
+    dtype = np.dtype(fields)
+    if offset + count * dtype.itemsize <= len(data):
+        records = np.frombuffer(data, dtype, count, offset)
+        if np.all(records['_length'] == length):
+            values = {prop['name']: records[prop['name']] for prop in before + after}
+            items = records['_items'].reshape(-1) if length else np.empty(0, dtype=item_type)
+            values[list_prop['name']] = (np.arange(count + 1, dtype=np.int64) * length, items)
+            return values, offset + count * dtype.itemsize
+
+    starts, lengths, end = record_starts(data, offset, count, leading, count_type,
+                                         np.dtype(item_type).itemsize,
+                                         scalar_dtype(after, byte_order).itemsize, element['name'])
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    lists = starts + leading + np.dtype(count_type).itemsize
+    values = {}
+    position = 0
+    for prop in before:
+        values[prop['name']] = byte_view(data, byte_order + prop['type'])[starts + position]
+        position += np.dtype(prop['type']).itemsize
+    item_positions = np.repeat(lists - offsets[:-1] * np.dtype(item_type).itemsize, lengths) + \
+        np.arange(offsets[-1], dtype=np.int64) * np.dtype(item_type).itemsize
+    values[list_prop['name']] = (offsets, byte_view(data, item_type)[item_positions])
+    position = lists + lengths * np.dtype(item_type).itemsize
+    for prop in after:
+        values[prop['name']] = byte_view(data, byte_order + prop['type'])[position]
+        position = position + np.dtype(prop['type']).itemsize
+    return values, end
+
+
+def byte_view(data: np.ndarray, dtype) -> np.ndarray:
+    # A value of dtype starting at every byte, so unaligned fields can be
+    # gathered with one fancy index.
+    dtype = np.dtype(dtype)
+    return np.ndarray((max(0, len(data) - dtype.itemsize + 1),), dtype, buffer=data, strides=(1,))
+
+
+def record_starts(data: np.ndarray, offset: int, count: int, leading: int, count_type: str,
+                  item_size: int, trailing: int, name: str) -> tuple:
+    # Where each variable-size record starts. Every byte position gets the
+    # position its record would end at, read from the count found there;
+    # following those links by pointer doubling finds the chain from the
+    # first record in log2(count) vectorized passes.
+    count_size = np.dtype(count_type).itemsize
+    limit = len(data) - offset
+    candidates = max(0, limit - leading - count_size + 1)
+    index_type = np.int32 if limit < 2 ** 31 - 1 else np.int64
+    counts = byte_view(data[offset + leading:], count_type)[:candidates]
+    # Negative or oversized counts link straight to the end sentinel.
+    ends = counts.astype(np.int64) * item_size
+    ends[counts < 0] = limit
+    np.minimum(ends, limit, out=ends)
+    ends += np.arange(leading + count_size + trailing, leading + count_size + trailing + candidates)
+    jump = np.empty(candidates + 1, dtype=index_type)
+    np.minimum(ends, candidates, out=jump[:-1])
+    jump[-1] = candidates
+    del ends
+
+    # Every RECORD_STRIDE-th start comes from the doubled links, and the
+    # records in between are filled in one vectorized step per offset.
+    far = jump
+    for _ in range(RECORD_STRIDE.bit_length() - 1):
+        far = far[far]
+    blocks = -(-count // RECORD_STRIDE)
+    skeleton = np.empty(blocks, dtype=index_type)
+    position = 0
+    for block in range(blocks):
+        skeleton[block] = position
+        position = far[position]
+    del far
+    path = np.empty((RECORD_STRIDE, blocks), dtype=index_type)
+    path[0] = skeleton
+    for step in range(1, RECORD_STRIDE):
+        path[step] = jump[path[step - 1]]
+    path = path.T.reshape(-1)[:count]
+    if candidates == 0 or path.max() >= candidates:
+        raise ValueError(f"PLY element '{name}' is truncated")
+
+    path = path.astype(np.int64)
+    lengths = counts[path].astype(np.int64)
+    end = int(path[-1]) + leading + count_size + trailing + int(lengths[-1]) * item_size
+    if end > limit:
+        raise ValueError(f"PLY element '{name}' is truncated")
+    return path + offset, lengths, offset + end
+
+
+def read_ascii_element(data: np.ndarray, offset: int, element: dict, newlines: np.ndarray) -> tuple:
+    before, list_prop, after = split_list_element(element)
+    count = element['count']
+    if count == 0:
+        values = {prop['name']: np.empty(0, dtype=prop['type']) for prop in before + after}
+        if list_prop is not None:
+            values[list_prop['name']] = (np.zeros(1, dtype=np.int64), np.empty(0, dtype=list_prop['type']))
+        return values, offset
+    first_line = np.searchsorted(newlines, offset)
+    last_line = first_line + count - 1
+    if last_line > len(newlines):
+        raise ValueError(f"PLY element '{element['name']}' is truncated")
+    end = int(newlines[last_line]) + 1 if last_line < len(newlines) else len(data)
+
+    # The C parser turns the whole block into numbers in one call (integers
+    # parse several times faster than floats); lines only matter again if
+    # records have different lengths.
+    block = data[offset:end]
+    integral = all(np.dtype(prop['type']).kind in 'iu' and np.dtype(prop.get('count_type', 'u1')).kind in 'iu'
+                   for prop in element['properties'])
+    tokens = np.fromstring(block.tobytes(), dtype=np.int64 if integral else np.float64, sep=' ')
+    if list_prop is None:
+        if len(tokens) != count * len(before):
+            raise ValueError(f"PLY element '{element['name']}' has malformed lines")
+        tokens = tokens.reshape(count, len(before))
+        return {prop['name']: tokens[:, index].astype(prop['type'])
+                for index, prop in enumerate(before)}, end
+
+    width = len(before) + len(after)
+    length = int(tokens[len(before)]) if len(tokens) > len(before) else 0
+    if len(tokens) == count * (width + 1 + length):
+        records = tokens.reshape(count, width + 1 + length)
+        if np.all(records[:, len(before)] == length):
+            values = {prop['name']: records[:, index].astype(prop['type']) for index, prop in enumerate(before)}
+            for index, prop in enumerate(after):
+                values[prop['name']] = records[:, len(before) + 1 + length + index].astype(prop['type'])
+            values[list_prop['name']] = (np.arange(count + 1, dtype=np.int64) * length,
+                                         records[:, len(before) + 1:len(before) + 1 + length].reshape(-1))
+            return values, end
+
+    # Records of different lengths: count tokens per line from the
+    # whitespace boundaries and gather each line's list from there.
+    space = block <= 32
+    starts = np.flatnonzero(~space & np.concatenate([[True], space[:-1]]))
+    if len(starts) != len(tokens):
+        raise ValueError(f"PLY element '{element['name']}' has malformed numbers")
+    lines = np.searchsorted(newlines[first_line:last_line + 1] - offset, starts)
+    per_line = np.bincount(lines, minlength=count)[:count]
+    line_start = np.cumsum(per_line) - per_line
+    lengths = tokens[line_start + len(before)].astype(np.int64)
+    if np.any(per_line != width + 1 + lengths):
+        raise ValueError(f"PLY element '{element['name']}' has malformed lines")
+
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    owner = np.repeat(np.arange(count), lengths)
+    items = tokens[line_start[owner] + len(before) + 1 + (np.arange(offsets[-1]) - offsets[owner])]
+    values = {prop['name']: tokens[line_start + index].astype(prop['type']) for index, prop in enumerate(before)}
+    for index, prop in enumerate(after):
+        values[prop['name']] = tokens[line_start + len(before) + 1 + lengths + index].astype(prop['type'])
+    values[list_prop['name']] = (offsets, items)
+    return values, end
+
+
+def read_ply_arrays(path: str) -> dict:
+    header = read_ply_header(path)
+    if os.path.getsize(path) == 0:
+        raise ValueError(f"PLY file is empty: {path}")
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    byte_order = PLY_FORMATS[header['format']]
+    newlines = np.flatnonzero(data == 10) if byte_order is None else None
+
+    offset = header['data_offset']
+    elements = {}
+    for element in header['elements']:
+        if byte_order is None:
+            values, offset = read_ascii_element(data, offset, element, newlines)
+        else:
+            values, offset = read_binary_element(data, offset, element, byte_order)
+        elements[element['name']] = values
+
+    vertex = elements.get('vertex')
+    if vertex is None or not all(axis in vertex for axis in 'xyz'):
+        raise ValueError(f"PLY file has no vertex positions: {path}")
+    point_type = np.float64 if any(vertex[axis].dtype == np.float64 for axis in 'xyz') else np.float32
+    arrays = {'points': np.column_stack([vertex[axis] for axis in 'xyz']).astype(point_type, copy=False)}
+    if all(axis in vertex for axis in ('nx', 'ny', 'nz')):
+        arrays['normals'] = np.column_stack([vertex[axis] for axis in ('nx', 'ny', 'nz')]).astype(np.float32)
+    colors = [channel for channel in ('red', 'green', 'blue', 'alpha') if channel in vertex]
+    if len(colors) >= 3:
+        arrays['colors'] = np.column_stack([vertex[channel] for channel in colors]).astype(np.uint8)
+
+    face = elements.get('face', {})
+    faces = face.get('vertex_indices', face.get('vertex_index'))
+    offsets, connectivity = faces if faces is not None else (np.zeros(1), np.empty(0))
+    arrays['offsets'] = np.asarray(offsets, dtype=np.int64)
+    arrays['connectivity'] = np.asarray(connectivity).astype(np.int64)
+    if len(arrays['connectivity']) and (arrays['connectivity'].min() < 0 or
+                                        arrays['connectivity'].max() >= len(arrays['points'])):
+        raise ValueError(f"PLY face refers to a missing vertex: {path}")
+    return arrays
+
+
+def read_ply(path: str) -> vtk.vtkPolyData:
+    arrays = read_ply_arrays(path)
+    mesh = vtk.vtkPolyData()
+    points = vtk.vtkPoints()
+    points.SetData(numpy_support.numpy_to_vtk(arrays['points'], deep=False))
+    mesh.SetPoints(points)
+
+    polys = vtk.vtkCellArray()
+    polys.SetData(numpy_support.numpy_to_vtk(arrays['offsets'], deep=False, array_type=vtk.VTK_ID_TYPE),
+                  numpy_support.numpy_to_vtk(arrays['connectivity'], deep=False, array_type=vtk.VTK_ID_TYPE))
+    mesh.SetPolys(polys)
+
+    # Same array names as vtkPLYReader.
+    if 'normals' in arrays:
+        normals = numpy_support.numpy_to_vtk(arrays['normals'], deep=False)
+        normals.SetName('Normals')
+        mesh.GetPointData().SetNormals(normals)
+    if 'colors' in arrays:
+        colors = numpy_support.numpy_to_vtk(arrays['colors'], deep=False)
+        colors.SetName('RGB' if arrays['colors'].shape[1] == 3 else 'RGBA')
+        mesh.GetPointData().SetScalars(colors)
+    return mesh
+
+
+def face_records(offsets: np.ndarray, connectivity: np.ndarray) -> bytes:
+    lengths = np.diff(offsets)
+    if len(lengths) and lengths.max() > 255:
+        raise ValueError("PLY faces are limited to 255 vertices")
+    indices = np.ascontiguousarray(connectivity[offsets[0]:offsets[-1]], dtype='<i4')
+    if len(lengths) and np.all(lengths == lengths[0]):
+        records = np.empty(len(lengths), dtype=[('count', 'u1'), ('indices', '<i4', (int(lengths[0]),))])
+        records['count'] = lengths[0]
+        records['indices'] = indices.reshape(len(lengths), -1)
+        return records.tobytes()
+
+    # Mixed face sizes: place the count bytes and the index bytes at their
+    # record positions in one buffer.
+    record_sizes = 1 + 4 * lengths
+    starts = np.cumsum(record_sizes) - record_sizes
+    output = np.empty(int(record_sizes.sum()), dtype=np.uint8)
+    output[starts] = lengths
+    owner = np.repeat(np.arange(len(lengths)), lengths)
+    positions = starts[owner] + 1 + 4 * (np.arange(len(indices)) - (offsets[:-1] - offsets[0])[owner])
+    output[positions[:, None] + np.arange(4)] = indices.view(np.uint8).reshape(-1, 4)
+    return output.tobytes()
+
+
+def write_ply(path: str, points: np.ndarray, offsets: np.ndarray, connectivity: np.ndarray,
+              normals: np.ndarray = None, chunk_size: int = PLY_WRITE_CHUNK) -> str:
+    faces = len(offsets) - 1
+    vertex_dtype = np.dtype([(name, '<f4') for name in ('x', 'y', 'z') + (('nx', 'ny', 'nz') if normals is not None else ())])
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as output:
+            output.write(ply_header(len(points), faces, normals is not None))
+            for start in range(0, len(points), chunk_size):
+                stop = min(start + chunk_size, len(points))
+                records = np.empty(stop - start, dtype=vertex_dtype)
+                for axis, name in enumerate('xyz'):
+                    records[name] = points[start:stop, axis]
+                if normals is not None:
+                    for axis, name in enumerate(('nx', 'ny', 'nz')):
+                        records[name] = normals[start:stop, axis]
+                records.tofile(output)
+            for start in range(0, faces, chunk_size):
+                stop = min(start + chunk_size, faces)
+                output.write(face_records(offsets[start:stop + 1], connectivity))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def write_ply_mesh(path: str, mesh: vtk.vtkPolyData, chunk_size: int = PLY_WRITE_CHUNK) -> str:
+    if mesh.GetNumberOfStrips():
+        triangles = vtk.vtkTriangleFilter()
+        triangles.SetInputData(mesh)
+        triangles.PassVertsOff()
+        triangles.PassLinesOff()
+        triangles.Update()
+        mesh = triangles.GetOutput()
+    polys = mesh.GetPolys()
+    normals = mesh.GetPointData().GetNormals()
+    return write_ply(path, numpy_support.vtk_to_numpy(mesh.GetPoints().GetData()),
+                     numpy_support.vtk_to_numpy(polys.GetOffsetsArray()),
+                     numpy_support.vtk_to_numpy(polys.GetConnectivityArray()),
+                     numpy_support.vtk_to_numpy(normals) if normals is not None else None, chunk_size)
+
+
+class StreamingPLYWriter:
+    # PLY wants every vertex before the first face, so both go to scratch
+    # files next to the target and are joined behind the header on close.
+    # Memory stays at whatever the caller passes in per call.
+    def __init__(self, path: str):
+        self.path = path
+        self.vertex_path = path + '.vertices.tmp'
+        self.face_path = path + '.faces.tmp'
+        self.vertex_file = open(self.vertex_path, 'wb')
+        self.face_file = open(self.face_path, 'wb')
+        self.vertices = 0
+        self.faces = 0
+
+    def add_vertices(self, points: np.ndarray) -> int:
+        first = self.vertices
+        np.ascontiguousarray(points, dtype='<f4').tofile(self.vertex_file)
+        self.vertices += len(points)
+        return first
+
+    def add_triangles(self, triangles: np.ndarray):
+        if len(triangles) == 0:
+            return
+        if triangles.min() < 0 or triangles.max() >= self.vertices:
+            raise ValueError("Triangle refers to a vertex that has not been written")
+
+        records = np.empty(len(triangles), dtype=FACE_DTYPE)
+        records['count'] = 3
+        records['indices'] = triangles
+        records.tofile(self.face_file)
+        self.faces += len(triangles)
+
+    def close(self):
+        self.vertex_file.close()
+        self.face_file.close()
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as output:
+            output.write(ply_header(self.vertices, self.faces))
+            for part in (self.vertex_path, self.face_path):
+                with open(part, 'rb') as data:
+                    shutil.copyfileobj(data, output, 16 * 1024 * 1024)
+        os.replace(tmp_path, self.path)
+        self.discard()
+
+    def discard(self):
+        for handle in (self.vertex_file, self.face_file):
+            handle.close()
+        for part in (self.vertex_path, self.face_path, self.path + '.tmp'):
+            if os.path.exists(part):
+                os.remove(part)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from progress import ProcessingCancelled, ProgressMonitor
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class ProcessingWorker:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='processing')
+        self.job_id = 0
+        self.token = None
+        self.future = None
+
+    def submit(self, func, on_progress=None, on_done=None, on_error=None) -> int:
+        # A single worker thread runs jobs in order, so a replaced job only has to
+        # notice its token to get out of the way of the new one.
+        self.cancel()
+        self.job_id += 1
+        job_id = self.job_id
+        token = CancelToken()
+        self.token = token
+
+        def progress(stage, fraction):
+            if token.cancelled:
+                return False
+            if on_progress is not None:
+                on_progress(job_id, stage, fraction)
+            return True
+
+        def job():
+            if token.cancelled:
+                return None
+
+            try:
+                result = func(ProgressMonitor(progress))
+            except ProcessingCancelled:
+                return None
+            except Exception as e:
+                if on_error is not None and not token.cancelled:
+                    on_error(job_id, e)
+                return None
+
+            if not token.cancelled and on_done is not None:
+                on_done(job_id, result)
+            return result
+
+        self.future = self.executor.submit(job)
+        return job_id
+
+    def cancel(self, wait: bool = False):
+        if self.token is not None:
+            self.token.cancel()
+        if wait and self.future is not None:
+            self.future.result()
+
+    def is_busy(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,34 @@
+import SimpleITK as sitk
+
+
+class ProcessingCancelled(Exception):
+    pass
+
+
+class ProgressMonitor:
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.cancelled = False
+
+    def report(self, stage: str, fraction: float) -> bool:
+        if self.callback is not None and self.callback(stage, fraction) is False:
+            self.cancelled = True
+        return not self.cancelled
+
+    def check(self):
+        if self.cancelled:
+            raise ProcessingCancelled()
+
+    def watch_sitk_filter(self, sitk_filter, stage: str):
+        def on_progress():
+            if not self.report(stage, sitk_filter.GetProgress()):
+                sitk_filter.Abort()
+
+        sitk_filter.AddCommand(sitk.sitkProgressEvent, on_progress)
+
+    def watch_vtk_filter(self, vtk_filter, stage: str):
+        def on_progress(caller, event):
+            if not self.report(stage, caller.GetProgress()):
+                caller.AbortExecuteOn()
+
+        vtk_filter.AddObserver('ProgressEvent', on_progress)
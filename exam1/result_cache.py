@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, budget_mb: float = 512.0):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes: int):
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            if nbytes > self.budget_bytes:
+                return False
+
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+
+            while self.current_bytes > self.budget_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def set_budget(self, budget_mb: float):
+        with self._lock:
+            self.budget_bytes = int(budget_mb * 1024 * 1024)
+            while self._entries and self.current_bytes > self.budget_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'used_mb': self.current_bytes / (1024.0 * 1024.0),
+            'budget_mb': self.budget_bytes / (1024.0 * 1024.0),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,120 @@
+import math
+import mmap
+
+import numpy as np
+import SimpleITK as sitk
+
+
+# Tolerance against whole-volume processing:
+# - SmoothingRecursiveGaussian is an IIR filter, so a slab boundary still
+#   leaks into the result. A halo of 4 sigma keeps float output within ~2e-5
+#   of the intensity range (+-1 after rounding to an integer type).
+# - CLAHE only looks at its radius, so a halo of one radius plus the range
+#   plane from read_slab gives bit-identical output for identical input.
+# - Chained, the rare Gaussian rounding flips survive the uint8 quantisation,
+#   and CLAHE can amplify them: expect under 0.1% of voxels to differ, by up
+#   to ~30 grey levels. 6 sigma cuts that to ~0.01%.
+GAUSSIAN_HALO_SIGMAS = 4.0
+
+# Estimated bytes held per voxel of a slab while it is being filtered: the
+# slab read from the store, its sitk copy and the float32 working images.
+BYTES_PER_VOXEL_OVERHEAD = 16
+
+
+def gaussian_halo(sigma: float, spacing_z: float, halo_sigmas: float = GAUSSIAN_HALO_SIGMAS) -> int:
+    if sigma <= 0:
+        return 0
+    # apply_gaussian_smoothing skips images thinner than 4 planes, so even a
+    # one-plane remainder slab has to be read with 3 neighbours.
+    return max(3, int(math.ceil(halo_sigmas * sigma / spacing_z)))
+
+
+def clahe_halo() -> int:
+    return int(sitk.AdaptiveHistogramEqualizationImageFilter().GetRadius()[2])
+
+
+def slab_depth_for_budget(shape: tuple, itemsize: int, halo: int, memory_budget_mb: float) -> int:
+    plane_bytes = shape[1] * shape[2] * (2 * itemsize + BYTES_PER_VOXEL_OVERHEAD)
+    planes = int(memory_budget_mb * 1024 * 1024 // plane_bytes)
+    depth = planes - 2 * halo - 1
+    if depth < 1:
+        raise ValueError(f"Memory budget of {memory_budget_mb} MB cannot hold a slab with "
+                         f"a halo of {halo} planes ({plane_bytes / (1024.0 * 1024.0):.1f} MB per plane)")
+    return depth
+
+
+def plan_slabs(depth: int, slab_depth: int, halo: int) -> list:
+    slabs = []
+    for start in range(0, depth, slab_depth):
+        stop = min(depth, start + slab_depth)
+        slabs.append((start, stop, max(0, start - halo), min(depth, stop + halo)))
+    return slabs
+
+
+def release_planes(array: np.ndarray, start: int, stop: int):
+    # Mapped pages count towards RSS until the kernel reclaims them. Dropping
+    # the planes a slab is done with keeps the process inside its budget;
+    # the data stays in the file and is paged back in if touched again.
+    handle = getattr(array, '_mmap', None)
+    if handle is None or not hasattr(handle, 'madvise') or stop <= start:
+        return
+    plane_bytes = array.strides[0]
+    base = array.offset % mmap.ALLOCATIONGRANULARITY
+    begin = base + start * plane_bytes
+    begin -= begin % mmap.PAGESIZE
+    end = base + stop * plane_bytes
+    try:
+        if array.flags.writeable:
+            array.flush()
+        handle.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+    except (OSError, ValueError):
+        pass
+
+
+def read_slab(source: np.ndarray, read_start: int, read_stop: int,
+              value_range: tuple = None) -> tuple:
+    block = np.asarray(source[read_start:read_stop])
+    offset = 0
+
+    # Filters that normalise by the image min/max (RescaleIntensity, CLAHE)
+    # would see only the slab's range. One extra plane holding the global
+    # range fixes that; it sits more than a halo away from the kept planes,
+    # so it never enters their neighbourhoods.
+    if value_range is not None and (read_start > 0 or read_stop < source.shape[0]):
+        plane = np.full((1,) + block.shape[1:], value_range[0], dtype=block.dtype)
+        plane.flat[0] = value_range[1]
+        if read_stop < source.shape[0]:
+            block = np.concatenate([block, plane])
+        else:
+            block = np.concatenate([plane, block])
+            offset = 1
+
+    return block, offset
+
+
+def run_slabs(source: np.ndarray, target: np.ndarray, spacing: tuple, func,
+              slab_depth: int, halo: int, value_range: tuple = None, on_slab=None) -> tuple:
+    low = np.inf
+    high = -np.inf
+    slabs = plan_slabs(source.shape[0], slab_depth, halo)
+
+    for index, (start, stop, read_start, read_stop) in enumerate(slabs):
+        block, offset = read_slab(source, read_start, read_stop, value_range)
+        image = sitk.GetImageFromArray(block)
+        image.SetSpacing(spacing)
+
+        result = func(image)
+        result_array = sitk.GetArrayViewFromImage(result)
+        core = result_array[offset + start - read_start:offset + stop - read_start]
+        target[start:stop] = core
+        low = min(low, float(core.min()))
+        high = max(high, float(core.max()))
+        del result_array, result, image, block
+
+        release_planes(source, 0, read_stop)
+        release_planes(target, start, stop)
+
+        if on_slab is not None:
+            on_slab((index + 1) / len(slabs))
+
+    return low, high
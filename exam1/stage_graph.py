@@ -0,0 +1,116 @@
+import time
+
+
+class Stage:
+    def __init__(self, name: str, func, inputs: tuple = (), params: tuple = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self.result = None
+        self.dirty = True
+        self.version = 0
+        self.input_versions = None
+        self.last_seconds = None
+        self.run_count = 0
+
+
+class StageGraph:
+    def __init__(self):
+        self.stages = {}
+        self.params = {}
+        self.last_run = []
+
+    def add_stage(self, name: str, func, inputs: tuple = (), params: tuple = ()) -> Stage:
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already exists")
+        for input_name in inputs:
+            if input_name not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{input_name}'")
+
+        stage = Stage(name, func, inputs, params)
+        self.stages[name] = stage
+        return stage
+
+    def result(self, name: str):
+        return self.stages[name].result
+
+    def invalidate(self, name: str):
+        self.stages[name].dirty = True
+
+    def set_params(self, **params) -> list:
+        changed = set()
+        for key, value in params.items():
+            if key not in self.params or self.params[key] != value:
+                changed.add(key)
+            self.params[key] = value
+
+        invalidated = []
+        for stage in self.stages.values():
+            if changed.intersection(stage.params):
+                stage.dirty = True
+                invalidated.append(stage.name)
+        return invalidated
+
+    def upstream(self, *targets) -> list:
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in needed:
+                continue
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'")
+            needed.add(name)
+            pending.extend(self.stages[name].inputs)
+
+        # Stages can only depend on stages added before them, so insertion
+        # order is already a topological order.
+        return [name for name in self.stages if name in needed]
+
+    def downstream(self, name: str) -> list:
+        affected = {name}
+        for stage in self.stages.values():
+            if affected.intersection(stage.inputs):
+                affected.add(stage.name)
+        return [stage_name for stage_name in self.stages if stage_name in affected]
+
+    def is_stale(self, name: str) -> bool:
+        stage = self.stages[name]
+        if stage.dirty:
+            return True
+        input_versions = tuple(self.stages[i].version for i in stage.inputs)
+        return input_versions != stage.input_versions
+
+    def run(self, *targets):
+        self.last_run = []
+
+        for name in self.upstream(*targets):
+            if not self.is_stale(name):
+                continue
+
+            stage = self.stages[name]
+            args = [self.stages[i].result for i in stage.inputs]
+            kwargs = {key: self.params.get(key) for key in stage.params}
+
+            start = time.perf_counter()
+            result = stage.func(*args, **kwargs)
+            stage.last_seconds = time.perf_counter() - start
+
+            # Stages that update an object in place return the same object,
+            # which lets their consumers skip re-running.
+            if result is not stage.result or stage.version == 0:
+                stage.version += 1
+            stage.result = result
+            stage.dirty = False
+            stage.input_versions = tuple(self.stages[i].version for i in stage.inputs)
+            stage.run_count += 1
+            self.last_run.append((name, stage.last_seconds))
+
+        if len(targets) == 1:
+            return self.stages[targets[0]].result
+        return tuple(self.stages[name].result for name in targets)
+
+    def timings(self) -> dict:
+        return {stage.name: stage.last_seconds for stage in self.stages.values()
+                if stage.last_seconds is not None}
@@ -0,0 +1,200 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Blend chunks are sized so the eight LUT gathers stay around this many bytes.
+BLEND_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Volumes below this many voxels are equalized serially; handing them to
+# the pool costs more than it saves.
+PARALLEL_MIN_VOXELS = 128 ** 3
+
+# One thread pool per process, shared by every call. bincount and the LUT
+# gathers release the GIL, and threads need neither a fork of the
+# multi-threaded GUI process nor copies of the volume.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def tile_membership(length: int, tiles: int) -> np.ndarray:
+    return (np.arange(length) * tiles) // length
+
+
+def tile_weights(length: int, tiles: int) -> tuple:
+    # Position of each voxel in tile-centre coordinates; beyond the outer
+    # centres the nearest tile is used on its own.
+    centre = (np.arange(length) + 0.5) * tiles / length - 0.5
+    lower = np.floor(centre)
+    weight = (centre - lower).astype(np.float32)
+    lower = lower.astype(np.intp)
+    return np.clip(lower, 0, tiles - 1), np.clip(lower + 1, 0, tiles - 1), weight
+
+
+def quantize(array: np.ndarray, n_bins: int) -> tuple:
+    low = float(array.min())
+    high = float(array.max())
+    if array.dtype == np.uint8 and n_bins == 256:
+        return array, 0.0, 255.0
+
+    bin_type = np.uint8 if n_bins <= 256 else np.uint16
+    if high <= low:
+        return np.zeros(array.shape, dtype=bin_type), low, high
+    scale = (n_bins - 1) / (high - low)
+    bins = np.empty(array.shape, dtype=bin_type)
+    for z in range(array.shape[0]):
+        bins[z] = (array[z].astype(np.float32) - low) * scale + 0.5
+    return bins, low, high
+
+
+def row_histograms(bins: np.ndarray, tiles_y: np.ndarray, tiles_x: np.ndarray,
+                   tile_count: int, n_bins: int) -> np.ndarray:
+    # One bincount over (tile, bin) keys gives every tile of the row at once,
+    # including the uneven tiles at the edges.
+    plane_tiles = (tiles_y[:, None] * (tiles_x.max() + 1) + tiles_x[None, :]) * n_bins
+    counts = np.zeros(tile_count * n_bins, dtype=np.int64)
+    for plane in bins:
+        counts += np.bincount((plane_tiles + plane).ravel(), minlength=tile_count * n_bins)
+    return counts.reshape(tile_count, n_bins)
+
+
+def clipped_luts(histograms: np.ndarray, clip_limit: float) -> np.ndarray:
+    n_bins = histograms.shape[-1]
+    voxels = histograms.sum(axis=-1, keepdims=True).astype(np.float64)
+    voxels[voxels == 0] = 1.0
+
+    # OpenCV convention: clip_limit is relative to a flat histogram, and the
+    # clipped excess is spread evenly over all bins.
+    limit = np.maximum(1.0, clip_limit * voxels / n_bins)
+    clipped = np.minimum(histograms, limit)
+    excess = (histograms - clipped).sum(axis=-1, keepdims=True)
+    clipped += excess / n_bins
+
+    cdf = np.cumsum(clipped, axis=-1)
+    return (cdf * ((n_bins - 1) / voxels)).astype(np.float32)
+
+
+def blend_planes(bins: np.ndarray, luts: np.ndarray, z_weights: tuple,
+                 y_weights: tuple, x_weights: tuple) -> np.ndarray:
+    tiles_z, tiles_y, tiles_x, n_bins = luts.shape
+    flat_luts = luts.reshape(-1)
+    bins = bins.astype(np.intp)
+    z_low, z_high, wz = z_weights
+    y_low, y_high, wy = y_weights
+    x_low, x_high, wx = x_weights
+    wz = wz[:, None, None]
+    wy = wy[:, None]
+
+    # Flat offsets of each corner's LUT turn the eight gathers into np.take
+    # calls on a single index array.
+    def lookup(z_tile, y_tile, x_tile):
+        offset = ((z_tile[:, None, None] * tiles_y + y_tile[None, :, None]) * tiles_x +
+                  x_tile[None, None, :]) * n_bins
+        return np.take(flat_luts, bins + offset)
+
+    def plane_blend(z_tile):
+        low_y = lookup(z_tile, y_low, x_low)
+        low_y += wx * (lookup(z_tile, y_low, x_high) - low_y)
+        high_y = lookup(z_tile, y_high, x_low)
+        high_y += wx * (lookup(z_tile, y_high, x_high) - high_y)
+        low_y += wy * (high_y - low_y)
+        return low_y
+
+    result = plane_blend(z_low)
+    result += wz * (plane_blend(z_high) - result)
+    return result
+
+
+def to_output(values: np.ndarray, dtype, low: float, high: float, n_bins: int) -> np.ndarray:
+    if high > low:
+        values = low + values * ((high - low) / (n_bins - 1))
+    else:
+        values = np.full(values.shape, low, dtype=np.float32)
+    if np.issubdtype(dtype, np.integer):
+        limits = np.iinfo(dtype)
+        values = np.clip(np.rint(values), limits.min, limits.max)
+    return values.astype(dtype)
+
+
+def histogram_task(state: dict, z_start: int, z_stop: int) -> np.ndarray:
+    return row_histograms(state['bins'][z_start:z_stop], state['tiles_y'], state['tiles_x'],
+                          state['tile_count'], state['n_bins'])
+
+
+def blend_task(state: dict, z_start: int, z_stop: int) -> np.ndarray:
+    z_weights = tuple(w[z_start:z_stop] for w in state['z_weights'])
+    values = blend_planes(state['bins'][z_start:z_stop], state['luts'], z_weights,
+                          state['y_weights'], state['x_weights'])
+    return to_output(values, state['dtype'], state['low'], state['high'], state['n_bins'])
+
+
+def shared_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='clahe')
+        return _pool
+
+
+def run_tasks(task, state: dict, bounds: list, parallel: bool) -> list:
+    if not parallel:
+        return [task(state, z_start, z_stop) for z_start, z_stop in bounds]
+    pool = shared_pool()
+    futures = [pool.submit(task, state, z_start, z_stop) for z_start, z_stop in bounds]
+    return [future.result() for future in futures]
+
+
+def equalize(array: np.ndarray, tile_grid_size: tuple = (8, 8, 8), clip_limit: float = 2.0,
+             n_bins: int = None, workers: int = None) -> np.ndarray:
+    if array.ndim != 3:
+        raise ValueError("Tiled CLAHE needs a single-component 3D volume")
+
+    if n_bins is None:
+        n_bins = 256 if array.dtype.itemsize == 1 else 4096
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if array.size < PARALLEL_MIN_VOXELS:
+        workers = 1
+
+    # tile_grid_size is given in (x, y, z) order like the rest of the sitk API.
+    depth, rows, columns = array.shape
+    tiles = [max(1, min(int(count), length))
+             for count, length in zip(tile_grid_size[::-1], array.shape)]
+
+    bins, low, high = quantize(array, n_bins)
+    tiles_z = tile_membership(depth, tiles[0])
+    row_bounds = [(int(np.searchsorted(tiles_z, k)), int(np.searchsorted(tiles_z, k, side='right')))
+                  for k in range(tiles[0])]
+
+    plane_bytes = rows * columns * 4 * 10
+    chunk = max(1, BLEND_CHUNK_BYTES // plane_bytes)
+    blend_bounds = [(z, min(depth, z + chunk)) for z in range(0, depth, chunk)]
+    if workers > 1:
+        per_worker = -(-depth // workers)
+        blend_bounds = [(z, min(depth, z + min(chunk, per_worker)))
+                        for z in range(0, depth, min(chunk, per_worker))]
+
+    state = {
+        'bins': bins,
+        'tiles_y': tile_membership(rows, tiles[1]),
+        'tiles_x': tile_membership(columns, tiles[2]),
+        'tile_count': tiles[1] * tiles[2],
+        'n_bins': n_bins,
+        'dtype': array.dtype,
+        'low': low,
+        'high': high,
+        'z_weights': tile_weights(depth, tiles[0]),
+        'y_weights': tile_weights(rows, tiles[1]),
+        'x_weights': tile_weights(columns, tiles[2])
+    }
+
+    parallel = workers > 1
+    histograms = np.stack(run_tasks(histogram_task, state, row_bounds, parallel))
+    state['luts'] = clipped_luts(histograms, clip_limit).reshape(tiles[0], tiles[1], tiles[2], n_bins)
+
+    output = np.empty(array.shape, dtype=array.dtype)
+    for (z_start, z_stop), values in zip(blend_bounds, run_tasks(blend_task, state, blend_bounds, parallel)):
+        output[z_start:z_stop] = values
+    return output
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import SimpleITK as sitk
+import vtk
+
+from image_bridge import image_array_view, numpy_to_vtk_image
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'vtk_tutorial', 'volumes')
+
+
+def series_content_hash(file_names: list, header_bytes: int = 4096) -> str:
+    # Each slice contributes its size and mtime, which catch edits to the
+    # pixel data, plus the start of the file, which holds the DICOM header
+    # (instance UIDs, geometry). Pixel data is not read, so a large study
+    # keys in milliseconds. header_bytes=0 hashes every byte instead.
+    digest = hashlib.blake2b(digest_size=16)
+    for file_name in file_names:
+        stat = os.stat(file_name)
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        with open(file_name, 'rb') as f:
+            digest.update(f.read(header_bytes) if header_bytes > 0 else f.read())
+    return digest.hexdigest()
+
+
+class CachedVolume:
+    def __init__(self, array: np.ndarray, geometry: dict):
+        self.array = array
+        self.geometry = geometry
+        self._image = None
+        self._vtk_image = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def to_sitk(self) -> sitk.Image:
+        # SimpleITK cannot wrap foreign memory, so this is the point where the
+        # mapped pages are actually read.
+        if self._image is None:
+            image = sitk.GetImageFromArray(self.array, isVector=self.geometry['components'] > 1)
+            image.SetSpacing(self.geometry['spacing'])
+            image.SetOrigin(self.geometry['origin'])
+            image.SetDirection(self.geometry['direction'])
+            self._image = image
+        return self._image
+
+    def to_vtk(self) -> vtk.vtkImageData:
+        if self._vtk_image is None:
+            if self.array.ndim != 3:
+                raise ValueError("Only single-component 3D volumes can be wrapped as vtkImageData")
+            self._vtk_image = numpy_to_vtk_image(self.array, self.geometry['spacing'],
+                                                 self.geometry['origin'])
+        return self._vtk_image
+
+
+class VolumeCache:
+    def __init__(self, cache_dir: str = None, header_bytes: int = 4096):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.header_bytes = header_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, file_names: list) -> str:
+        return series_content_hash(file_names, self.header_bytes)
+
+    def paths(self, key: str) -> tuple:
+        base = os.path.join(self.cache_dir, key)
+        return base + '.npy', base + '.json'
+
+    def __contains__(self, key: str) -> bool:
+        return all(os.path.exists(path) for path in self.paths(key))
+
+    def load(self, key: str) -> CachedVolume:
+        array_path, geometry_path = self.paths(key)
+        if not os.path.exists(geometry_path) or not os.path.exists(array_path):
+            return None
+
+        with open(geometry_path) as f:
+            geometry = json.load(f)
+        array = np.load(array_path, mmap_mode='r')
+        if list(array.shape) != geometry['shape'] or str(array.dtype) != geometry['dtype']:
+            return None
+        return CachedVolume(array, geometry)
+
+    def store(self, key: str, image: sitk.Image) -> str:
+        array_path, geometry_path = self.paths(key)
+        array = image_array_view(image)
+        geometry = {
+            'shape': list(array.shape),
+            'dtype': str(array.dtype),
+            'components': image.GetNumberOfComponentsPerPixel(),
+            'spacing': list(image.GetSpacing()),
+            'origin': list(image.GetOrigin()),
+            'direction': list(image.GetDirection()),
+            'pixel_type': image.GetPixelIDTypeAsString()
+        }
+
+        # The sidecar is renamed into place last, so a half-written entry is
+        # never picked up by load().
+        temp_array_path = array_path + '.tmp'
+        with open(temp_array_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(temp_array_path, array_path)
+
+        temp_geometry_path = geometry_path + '.tmp'
+        with open(temp_geometry_path, 'w') as f:
+            json.dump(geometry, f)
+        os.replace(temp_geometry_path, geometry_path)
+        return array_path
+
+    def remove(self, key: str):
+        for path in self.paths(key)[::-1]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                self.remove(name[:-len('.json')])
+
+    def stats(self) -> dict:
+        entries = 0
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                entries += 1
+            if name.endswith('.npy') or name.endswith('.json'):
+                total += os.path.getsize(os.path.join(self.cache_dir, name))
+        return {
+            'entries': entries,
+            'size_mb': total / (1024.0 * 1024.0),
+            'cache_dir': self.cache_dir
+        }
@@ -2,23 +2,164 @@ import SimpleITK as sitk
 import numpy as np
 import os
 
+import copy_tracker
+import dicom_loader
+import frame_access
+import slab_processing
+import tiled_clahe
+import volume_stats
+from image_bridge import image_array_view
+from instrumentation import timed
+from result_cache import ResultCache
+
+
+CLAHE_BACKENDS = ('sitk', 'tiled')
+
+INTEGER_PIXEL_TYPES = {
+    sitk.sitkUInt8: np.uint8,
+    sitk.sitkInt8: np.int8,
+    sitk.sitkUInt16: np.uint16,
+    sitk.sitkInt16: np.int16,
+    sitk.sitkUInt32: np.uint32,
+    sitk.sitkInt32: np.int32,
+}
+
+
+def image_nbytes(image: sitk.Image) -> int:
+    return image.GetNumberOfPixels() * image.GetNumberOfComponentsPerPixel() * \
+        image.GetSizeOfPixelComponent()
+
 
 class VolumeProcessor:
-    def __init__(self):
+    def __init__(self, preserve_dtype: bool = False, cache_budget_mb: float = 512.0,
+                 volume_cache=None, clahe_backend: str = 'sitk', clahe_workers: int = None,
+                 stats_max_samples: int = None):
+        self.volume_token = 0
+        self.result_cache = ResultCache(cache_budget_mb)
+        self.volume_cache = volume_cache
+        self.clahe_backend = clahe_backend
+        self.clahe_workers = clahe_workers
+        self.frame_sequence = None
+        self.stats_max_samples = stats_max_samples
+        self.statistics = {}
         self.volume = None
         self.processed_volume = None
+        self.processed_image = None
+        self.processed_statistics = {}
+        self.preserve_dtype = preserve_dtype
+        self.progress = None
+    
+    @property
+    def volume(self) -> sitk.Image:
+        # A volume opened from the disk cache is only turned into a sitk.Image
+        # the first time something asks for it.
+        if self._volume is None and self.cached_volume is not None:
+            self._volume = self.cached_volume.to_sitk()
+        return self._volume
+    
+    def has_volume(self) -> bool:
+        return self._volume is not None or self.cached_volume is not None
+    
+    def volume_source(self):
+        # What the loaded volume comes from, without materializing a cache hit.
+        return self.cached_volume if self.cached_volume is not None else self._volume
+    
+    def cached_size(self) -> tuple:
+        geometry = self.cached_volume.geometry
+        shape = geometry['shape'][:-1] if geometry['components'] > 1 else geometry['shape']
+        return tuple(int(n) for n in reversed(shape))
+    
+    def cached_frame_array(self) -> np.ndarray:
+        # The current frame as a view of the mapped cache array; frames are
+        # numbered like frame_access, with the first extra axis fastest.
+        if self.cached_volume.geometry['components'] > 1:
+            return None
+        size = self.cached_size()
+        if len(size) <= 3:
+            return self.cached_volume.array
+        index = np.unravel_index(self.frame_index, size[3:], order='F')
+        return self.cached_volume.array[tuple(int(i) for i in index[::-1])]
+    
+    def voxel_count(self) -> int:
+        if self._volume is not None:
+            return self._volume.GetNumberOfPixels()
+        if self.cached_volume is not None:
+            return int(np.prod(self.cached_size(), dtype=np.int64))
+        return 0
+    
+    @volume.setter
+    def volume(self, image: sitk.Image):
+        # Cached results belong to the previous volume and can never be hit again.
+        self._volume = image
+        self.cached_volume = None
+        self.frame_index = 0
+        self.statistics = {}
+        if self.frame_sequence is not None:
+            self.frame_sequence.close()
+            self.frame_sequence = None
+        self.volume_token += 1
+        self.result_cache.clear()
+    
+    def open_cached_volume(self, dicom_names: list):
+        if self.volume_cache is None or not dicom_names:
+            return None, None
+        try:
+            cache_key = self.volume_cache.key_for(dicom_names)
+            return cache_key, self.volume_cache.load(cache_key)
+        except Exception:
+            return None, None
+    
+    def store_cached_volume(self, cache_key: str):
+        if self.volume_cache is None or cache_key is None:
+            return
+        try:
+            self.volume_cache.store(cache_key, self.volume)
+        except Exception:
+            pass
         
-    def load_dicom_series(self, dicom_directory: str) -> sitk.Image:
-        if not os.path.exists(dicom_directory):
-            raise FileNotFoundError(f"Directory {dicom_directory} not found")
-            
+    @timed('volume.load_dicom', counts=lambda processor: {'voxels': processor.voxel_count()})
+    def load_dicom_series(self, dicom_directory: str, parallel: bool = False,
+                          workers: int = None, use_processes: bool = False,
+                          series_uid: str = None, index=None) -> sitk.Image:
         reader = sitk.ImageSeriesReader()
-        dicom_names = reader.GetGDCMSeriesFileNames(dicom_directory)
+        
+        # Like GDCM, the index only reads the directory itself, not its
+        # subfolders or other copies of the same series.
+        if index is not None and series_uid is not None:
+            dicom_names = index.series_files(series_uid, dicom_directory, recursive=False)
+        else:
+            if not os.path.exists(dicom_directory):
+                raise FileNotFoundError(f"Directory {dicom_directory} not found")
+            
+            if index is not None:
+                index.update(dicom_directory, recursive=False)
+                series = index.series(dicom_directory, recursive=False)
+                dicom_names = (index.series_files(series[0]['series_uid'], dicom_directory, recursive=False)
+                               if series else [])
+            elif series_uid is not None:
+                dicom_names = reader.GetGDCMSeriesFileNames(dicom_directory, series_uid)
+            else:
+                dicom_names = reader.GetGDCMSeriesFileNames(dicom_directory)
+        
+        cache_key, cached = self.open_cached_volume(dicom_names)
+        if cached is not None:
+            self.volume = None
+            self.cached_volume = cached
+            return True
+        
+        if dicom_names and parallel and len(dicom_names) > 1:
+            try:
+                self.volume = dicom_loader.read_series_parallel(dicom_names, workers, use_processes)
+                self.store_cached_volume(cache_key)
+                return True
+            except Exception:
+                pass
         
         if dicom_names:
             reader.SetFileNames(dicom_names)
             try:
                 self.volume = reader.Execute()
+                self.store_cached_volume(cache_key)
                 return True
             except Exception:
                 pass
@@ -36,48 +177,68 @@ class VolumeProcessor:
         except Exception as e:
             raise RuntimeError(f"Error reading DICOM: {e}")
     
-    def apply_gaussian_smoothing(self, sigma: float = 1.0) -> sitk.Image:
-        if self.volume is None:
+    def frame_count(self) -> int:
+        if not self.has_volume():
+            return 0
+        if self._volume is None:
+            size = self.cached_size()
+            return int(np.prod(size[3:], dtype=np.int64)) if len(size) > 3 else 1
+        return frame_access.frame_count(self.volume)
+    
+    def set_frame(self, frame_index: int):
+        if not 0 <= frame_index < max(1, self.frame_count()):
+            raise ValueError(f"Frame {frame_index} out of range")
+        self.frame_index = frame_index
+    
+    def current_frame(self, image: sitk.Image) -> sitk.Image:
+        if image.GetDimension() <= 3:
+            return image
+        
+        # Frames of the loaded volume come from one shared sequence, which
+        # extracts each frame once and prefetches the next ones once stepping.
+        if image is self.volume:
+            if self.frame_sequence is None:
+                self.frame_sequence = frame_access.FrameSequence(image)
+            return self.frame_sequence[self.frame_index]
+        return frame_access.extract_frame(image, min(self.frame_index, frame_access.frame_count(image) - 1))
+    
+    def check_cancelled(self):
+        if self.progress is not None:
+            self.progress.check()
+    
+    def cast_to_pixel_type(self, image: sitk.Image, pixel_id: int, stage: str) -> sitk.Image:
+        if image.GetPixelID() == pixel_id:
+            return image
+        
+        if pixel_id in INTEGER_PIXEL_TYPES:
+            limits = np.iinfo(INTEGER_PIXEL_TYPES[pixel_id])
+            result = sitk.Clamp(image, pixel_id, float(limits.min), float(limits.max))
+        else:
+            result = sitk.Cast(image, pixel_id)
+        
+        copy_tracker.record(stage, image_nbytes(result))
+        return result
+    
+    @timed('volume.gaussian')
+    def apply_gaussian_smoothing(self, sigma: float = 1.0, 
+                                 preserve_dtype: bool = None,
+                                 input_volume: sitk.Image = None) -> sitk.Image:
+        volume_to_process = input_volume if input_volume is not None else self.volume
+        
+        if volume_to_process is None:
             raise ValueError("No volume loaded")
         
-        volume_to_process = self.volume
+        if preserve_dtype is None:
+            preserve_dtype = self.preserve_dtype
         
+        volume_to_process = self.current_frame(volume_to_process)
         original_spacing = volume_to_process.GetSpacing()
         original_origin = volume_to_process.GetOrigin()
         
-        if volume_to_process.GetDimension() > 3:
-            original_spacing = volume_to_process.GetSpacing()
-            original_origin = volume_to_process.GetOrigin()
-            
-            if len(original_spacing) > 3:
-                original_spacing = original_spacing[:3]
-            if len(original_origin) > 3:
-                original_origin = original_origin[:3]
-            
-            array = sitk.GetArrayFromImage(volume_to_process)
-            
-            while len(array.shape) > 3:
-                if array.shape[0] == 1:
-                    array = array[0]
-                elif array.shape[-1] == 1:
-                    array = array[..., 0]
-                else:
-                    array = array[0]
-            
-            while len(array.shape) > 3:
-                if array.shape[-1] <= 4:
-                    array = array[..., 0]
-                else:
-                    array = array[0]
-            
-            volume_to_process = sitk.GetImageFromArray(array)
-            
-            if len(original_spacing) == 3:
-                volume_to_process.SetSpacing(original_spacing)
-            if len(original_origin) == 3:
-                volume_to_process.SetOrigin(original_origin)
+        source_pixel_id = volume_to_process.GetPixelID()
         
-        if volume_to_process.GetPixelID() != sitk.sitkFloat32:
+        if not preserve_dtype and volume_to_process.GetPixelID() != sitk.sitkFloat32:
+            copy_tracker.record('gaussian.to_float32', image_nbytes(volume_to_process))
             try:
                 volume_to_process = sitk.Cast(volume_to_process, sitk.sitkFloat32)
             except Exception:
@@ -101,62 +262,70 @@ class VolumeProcessor:
         try:
             smoothing_filter = sitk.SmoothingRecursiveGaussianImageFilter()
             smoothing_filter.SetSigma(sigma)
+            if self.progress is not None:
+                self.progress.watch_sitk_filter(smoothing_filter, 'gaussian')
             smoothed = smoothing_filter.Execute(volume_to_process)
-            return smoothed
+            copy_tracker.record('gaussian.filter', image_nbytes(smoothed))
         except Exception:
+            self.check_cancelled()
             return volume_to_process
+        
+        if preserve_dtype:
+            try:
+                smoothed = self.cast_to_pixel_type(smoothed, source_pixel_id, 'gaussian.to_source_type')
+            except Exception:
+                pass
+        
+        return smoothed
     
+    @timed('volume.clahe')
     def apply_clahe(self, input_volume: sitk.Image = None, clip_limit: float = 2.0, 
-                   tile_grid_size: tuple = (8, 8, 8)) -> sitk.Image:
+                   tile_grid_size: tuple = (8, 8, 8),
+                   preserve_dtype: bool = None,
+                   backend: str = None) -> sitk.Image:
         volume_to_process = input_volume if input_volume is not None else self.volume
         
         if volume_to_process is None:
             raise ValueError("No volume loaded")
         
-        original_spacing = volume_to_process.GetSpacing()
-        original_origin = volume_to_process.GetOrigin()
+        if preserve_dtype is None:
+            preserve_dtype = self.preserve_dtype
         
-        if volume_to_process.GetDimension() > 3:
-            original_spacing = volume_to_process.GetSpacing()
-            original_origin = volume_to_process.GetOrigin()
-            
-            if len(original_spacing) > 3:
-                original_spacing = original_spacing[:3]
-            if len(original_origin) > 3:
-                original_origin = original_origin[:3]
-            
-            array = sitk.GetArrayFromImage(volume_to_process)
-            
-            while len(array.shape) > 3:
-                if array.shape[0] == 1:
-                    array = array[0]
-                elif array.shape[-1] == 1:
-                    array = array[..., 0]
-                else:
-                    array = array[0]
-            
-            while len(array.shape) > 3:
-                if array.shape[-1] <= 4:
-                    array = array[..., 0]
-                else:
-                    array = array[0]
-            
-            volume_to_process = sitk.GetImageFromArray(array)
+        if backend is None:
+            backend = self.clahe_backend
+        if backend not in CLAHE_BACKENDS:
+            raise ValueError(f"Unknown CLAHE backend '{backend}', expected one of {CLAHE_BACKENDS}")
+        
+        volume_to_process = self.current_frame(volume_to_process)
             
-            if len(original_spacing) == 3:
-                volume_to_process.SetSpacing(original_spacing)
-            if len(original_origin) == 3:
-                volume_to_process.SetOrigin(original_origin)
+        clahe_filter = sitk.AdaptiveHistogramEqualizationImageFilter()
+        normalized_clip_limit = min(1.0, max(0.1, clip_limit / 10.0))
+        clahe_filter.SetAlpha(normalized_clip_limit)
+        clahe_filter.SetBeta(normalized_clip_limit)
+        if self.progress is not None:
+            self.progress.watch_sitk_filter(clahe_filter, 'clahe')
+        
+        if preserve_dtype:
+            if volume_to_process.GetNumberOfComponentsPerPixel() > 1:
+                volume_to_process = sitk.VectorIndexSelectionCast(volume_to_process, 0)
+                copy_tracker.record('clahe.select_component', image_nbytes(volume_to_process))
             
+            clahe_result = self.run_clahe(clahe_filter, volume_to_process, clip_limit,
+                                          tile_grid_size, backend)
+            copy_tracker.record('clahe.filter', image_nbytes(clahe_result))
+            return clahe_result
+        
         rescale_filter = sitk.RescaleIntensityImageFilter()
         rescale_filter.SetOutputMinimum(0)
         rescale_filter.SetOutputMaximum(255)
         rescaled = rescale_filter.Execute(volume_to_process)
+        copy_tracker.record('clahe.rescale', image_nbytes(rescaled))
         
         pixel_type = rescaled.GetPixelIDTypeAsString()
         
         if 'vector' in pixel_type.lower():
             array = sitk.GetArrayFromImage(rescaled)
+            copy_tracker.record('clahe.to_uint8', array.nbytes)
             
             if len(array.shape) > 3:
                 array = array[..., 0]
@@ -166,6 +335,8 @@ class VolumeProcessor:
             rescaled.SetOrigin(volume_to_process.GetOrigin())
         else:
             try:
+                if rescaled.GetPixelID() != sitk.sitkUInt8:
+                    copy_tracker.record('clahe.to_uint8', image_nbytes(rescaled))
                 rescaled = sitk.Cast(rescaled, sitk.sitkUInt8)
             except Exception:
                 array = sitk.GetArrayFromImage(rescaled)
@@ -173,88 +344,202 @@ class VolumeProcessor:
                 rescaled.SetSpacing(volume_to_process.GetSpacing())
                 rescaled.SetOrigin(volume_to_process.GetOrigin())
         
-        clahe_filter = sitk.AdaptiveHistogramEqualizationImageFilter()
-        normalized_clip_limit = min(1.0, max(0.1, clip_limit / 10.0))
-        clahe_filter.SetAlpha(normalized_clip_limit)
-        clahe_filter.SetBeta(normalized_clip_limit)
-        clahe_result = clahe_filter.Execute(rescaled)
+        clahe_result = self.run_clahe(clahe_filter, rescaled, clip_limit, tile_grid_size, backend)
+        copy_tracker.record('clahe.filter', image_nbytes(clahe_result))
         
         return clahe_result
     
+    def run_clahe(self, clahe_filter, image: sitk.Image, clip_limit: float,
+                  tile_grid_size: tuple, backend: str) -> sitk.Image:
+        if backend != 'tiled' or image.GetDimension() != 3 or \
+                image.GetNumberOfComponentsPerPixel() > 1:
+            return clahe_filter.Execute(image)
+        
+        equalized = tiled_clahe.equalize(image_array_view(image), tile_grid_size, clip_limit,
+                                         workers=self.clahe_workers)
+        self.check_cancelled()
+        result = sitk.GetImageFromArray(equalized)
+        result.CopyInformation(image)
+        if self.progress is not None:
+            self.progress.report('clahe', 1.0)
+        return result
+    
     def process_volume(self, gaussian_sigma: float = 1.0, 
                       clahe_clip_limit: float = 2.0,
-                      use_clahe: bool = True) -> np.ndarray:
-        if self.volume is None:
+                      use_clahe: bool = True,
+                      preserve_dtype: bool = None) -> np.ndarray:
+        if not self.has_volume():
             raise ValueError("No volume loaded")
+        
+        if preserve_dtype is None:
+            preserve_dtype = self.preserve_dtype
+        
+        cache_key = (self.volume_token, float(gaussian_sigma), float(clahe_clip_limit),
+                     bool(use_clahe), bool(preserve_dtype), self.clahe_backend, self.frame_index)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            self.processed_image, self.processed_volume, self.processed_statistics = cached
+            return self.processed_volume
             
-        processed = self.apply_gaussian_smoothing(gaussian_sigma)
+        processed = self.apply_gaussian_smoothing(gaussian_sigma, preserve_dtype=preserve_dtype)
         
         if use_clahe:
-            processed = self.apply_clahe(processed, clahe_clip_limit)
+            processed = self.apply_clahe(processed, clahe_clip_limit, preserve_dtype=preserve_dtype)
         
-        self.processed_volume = sitk.GetArrayFromImage(processed)
+        self.check_cancelled()
+        self.processed_image = processed
+        self.processed_volume = image_array_view(processed)
+        self.processed_statistics = {}
+        self.result_cache.put(cache_key, (self.processed_image, self.processed_volume,
+                                          self.processed_statistics),
+                              self.processed_volume.nbytes)
         
         return self.processed_volume
     
+    def process_volume_out_of_core(self, output_path: str,
+                                   gaussian_sigma: float = 1.0,
+                                   clahe_clip_limit: float = 2.0,
+                                   use_clahe: bool = True,
+                                   preserve_dtype: bool = None,
+                                   memory_budget_mb: float = 256.0,
+                                   source: np.ndarray = None,
+                                   spacing: tuple = None,
+                                   halo_sigmas: float = slab_processing.GAUSSIAN_HALO_SIGMAS) -> np.ndarray:
+        if preserve_dtype is None:
+            preserve_dtype = self.preserve_dtype
+        
+        if source is None:
+            if self.cached_volume is not None:
+                source = self.cached_volume.array
+                spacing = spacing or self.cached_volume.geometry['spacing']
+            elif self.volume is not None:
+                frame = self.current_frame(self.volume)
+                source = image_array_view(frame)
+                spacing = spacing or frame.GetSpacing()
+            else:
+                raise ValueError("No volume loaded")
+        
+        if source.ndim != 3:
+            raise ValueError("Out-of-core processing needs a single-component 3D volume")
+        
+        spacing = tuple(float(s) for s in (spacing or (1.0, 1.0, 1.0)))[:3]
+        smoothed_dtype = source.dtype if preserve_dtype else np.float32
+        
+        def report(stage):
+            if self.progress is None:
+                return None
+            return lambda fraction: self.progress.report(stage, fraction)
+        
+        gaussian_halo = slab_processing.gaussian_halo(gaussian_sigma, spacing[2], halo_sigmas)
+        itemsize = max(source.dtype.itemsize, 4)
+        slab_depth = slab_processing.slab_depth_for_budget(source.shape, itemsize, gaussian_halo,
+                                                           memory_budget_mb)
+        
+        smoothed_path = output_path + '.smoothed.npy' if use_clahe else output_path
+        smoothed = np.lib.format.open_memmap(smoothed_path, mode='w+', dtype=smoothed_dtype,
+                                             shape=source.shape)
+        try:
+            value_range = slab_processing.run_slabs(
+                source, smoothed, spacing,
+                lambda image: self.apply_gaussian_smoothing(gaussian_sigma, preserve_dtype, image),
+                slab_depth, gaussian_halo, on_slab=report('gaussian slabs'))
+            self.check_cancelled()
+            
+            if use_clahe:
+                clahe_halo = slab_processing.clahe_halo()
+                slab_depth = slab_processing.slab_depth_for_budget(source.shape, itemsize, clahe_halo,
+                                                                   memory_budget_mb)
+                output_dtype = smoothed_dtype if preserve_dtype else np.uint8
+                # The tiled backend lays its grid over whatever image it gets,
+                # so slabs always use the sliding-window filter.
+                output = np.lib.format.open_memmap(output_path, mode='w+', dtype=output_dtype,
+                                                   shape=source.shape)
+                slab_processing.run_slabs(
+                    smoothed, output, spacing,
+                    lambda image: self.apply_clahe(image, clahe_clip_limit, preserve_dtype=preserve_dtype,
+                                                   backend='sitk'),
+                    slab_depth, clahe_halo, value_range=value_range, on_slab=report('clahe slabs'))
+                output.flush()
+                del output
+                self.check_cancelled()
+            else:
+                smoothed.flush()
+        finally:
+            del smoothed
+            if use_clahe and os.path.exists(smoothed_path):
+                os.remove(smoothed_path)
+        
+        return np.load(output_path, mmap_mode='r')
+    
+    def get_statistics(self, max_samples: int = None) -> dict:
+        if not self.has_volume():
+            raise ValueError("No volume loaded")
+        
+        if max_samples is None:
+            max_samples = self.stats_max_samples
+        
+        # Computed once per volume and frame; the histograms then serve info
+        # display, transfer-function ranges and isovalue defaults.
+        key = (self.frame_index, max_samples)
+        if key not in self.statistics:
+            array = self.cached_frame_array() if self.cached_volume is not None else None
+            if array is None:
+                array = image_array_view(self.current_frame(self.volume))
+            self.statistics[key] = volume_stats.compute_statistics(array, max_samples=max_samples)
+        return self.statistics[key]
+    
+    def get_processed_statistics(self) -> dict:
+        if self.processed_volume is None:
+            raise ValueError("No processed volume available")
+        
+        # The dict is shared with the result-cache entry, so a cache hit
+        # brings its statistics back along with the image.
+        if 'stats' not in self.processed_statistics:
+            self.processed_statistics['stats'] = volume_stats.compute_statistics(
+                self.processed_volume, max_samples=self.stats_max_samples)
+        return self.processed_statistics['stats']
+    
     def get_volume_info(self) -> dict:
-        if self.volume is None:
+        if not self.has_volume():
             return {}
         
-        volume_info = {
-            'size': self.volume.GetSize(),
-            'spacing': self.volume.GetSpacing(),
-            'origin': self.volume.GetOrigin(),
-            'direction': self.volume.GetDirection(),
-            'pixel_type': self.volume.GetPixelIDTypeAsString(),
-            'dimensions': self.volume.GetDimension()
-        }
+        if self._volume is None:
+            # A cache hit answers from its sidecar, so showing the info does
+            # not read the mapped pixel data.
+            geometry = self.cached_volume.geometry
+            size = self.cached_size()
+            volume_info = {
+                'size': size,
+                'spacing': tuple(geometry['spacing']),
+                'origin': tuple(geometry['origin']),
+                'direction': tuple(geometry['direction']),
+                'pixel_type': geometry['pixel_type'],
+                'dimensions': len(size),
+                'frames': self.frame_count(),
+                'frame_index': self.frame_index
+            }
+        else:
+            volume_info = {
+                'size': self.volume.GetSize(),
+                'spacing': self.volume.GetSpacing(),
+                'origin': self.volume.GetOrigin(),
+                'direction': self.volume.GetDirection(),
+                'pixel_type': self.volume.GetPixelIDTypeAsString(),
+                'dimensions': self.volume.GetDimension(),
+                'frames': frame_access.frame_count(self.volume),
+                'frame_index': self.frame_index
+            }
         
         try:
-            volume_for_stats = self.volume
-            
-            original_spacing = volume_for_stats.GetSpacing()
-            original_origin = volume_for_stats.GetOrigin()
-            
-            if volume_for_stats.GetDimension() > 3:
-                original_spacing = volume_for_stats.GetSpacing()
-                original_origin = volume_for_stats.GetOrigin()
-                
-                if len(original_spacing) > 3:
-                    original_spacing = original_spacing[:3]
-                if len(original_origin) > 3:
-                    original_origin = original_origin[:3]
-                
-                array = sitk.GetArrayFromImage(volume_for_stats)
-                
-                while len(array.shape) > 3:
-                    if array.shape[0] == 1:
-                        array = array[0]
-                    elif array.shape[-1] == 1:
-                        array = array[..., 0]
-                    else:
-                        array = array[0]
-                
-                while len(array.shape) > 3:
-                    if array.shape[-1] <= 4:
-                        array = array[..., 0]
-                    else:
-                        array = array[0]
-                
-                volume_for_stats = sitk.GetImageFromArray(array)
-                
-                if len(original_spacing) == 3:
-                    volume_for_stats.SetSpacing(original_spacing)
-                if len(original_origin) == 3:
-                    volume_for_stats.SetOrigin(original_origin)
-            
-            stats_filter = sitk.StatisticsImageFilter()
-            stats_filter.Execute(volume_for_stats)
+            stats = self.get_statistics()
             
             volume_info.update({
-                'min_value': stats_filter.GetMinimum(),
-                'max_value': stats_filter.GetMaximum(),
-                'mean_value': stats_filter.GetMean(),
-                'std_value': stats_filter.GetSigma()
+                'min_value': stats['min'],
+                'max_value': stats['max'],
+                'mean_value': stats['mean'],
+                'std_value': stats['std'],
+                'stats_sampled': stats['sampled'],
+                'stats_cdf_error': stats['cdf_error']
             })
         except Exception:
             volume_info.update({
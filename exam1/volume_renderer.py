@@ -1,46 +1,73 @@
 import numpy as np
 import vtk
 
+import copy_tracker
+import image_bridge
+import volume_stats
+from instrumentation import timed
+
 
 class VolumeRenderer:
     
     def __init__(self):
         self.vtk_image = None
+        self.statistics = None
+        self.scalar_range = None
         self.volume_mapper = None
         self.volume_property = None
+        self.color_transfer = None
+        self.opacity_transfer = None
+        self.gradient_opacity = None
         self.volume = None
+        self.use_gpu = True
+        self.pyramid = []
+        self.pyramid_source = None
+        self.lod_ids = []
         self.renderer = None
         self.render_window = None
         self.interactor = None
         
-    def numpy_to_vtk_image(self, numpy_array: np.ndarray):
+    @timed('render.vtk_image')
+    def numpy_to_vtk_image(self, numpy_array: np.ndarray, preserve_dtype: bool = False,
+                           statistics: dict = None):
         if numpy_array.ndim != 3:
             raise ValueError("Array must be 3D")
 
-        if numpy_array.dtype != np.uint8:
+        if not preserve_dtype and numpy_array.dtype != np.uint8:
+            copy_tracker.record('renderer.to_uint8', numpy_array.nbytes)
             numpy_array = numpy_array.astype(np.uint8)
+            statistics = None
 
-        vtk_data_array = vtk.vtkUnsignedCharArray()
-        vtk_data_array.SetNumberOfComponents(1)
-        vtk_data_array.SetNumberOfTuples(numpy_array.size)
-        
-        flat_array = numpy_array.ravel(order='C')
-        for i in range(len(flat_array)):
-            vtk_data_array.SetValue(i, int(flat_array[i]))
-        
-        self.vtk_image = vtk.vtkImageData()
-        self.vtk_image.SetDimensions(numpy_array.shape[::-1])
-        self.vtk_image.SetSpacing(1.0, 1.0, 1.0)
-        self.vtk_image.SetOrigin(0.0, 0.0, 0.0)
-        self.vtk_image.GetPointData().SetScalars(vtk_data_array)
-
-        self.vtk_image.GetPointData().GetScalars().Modified()
-        self.vtk_image.Modified()
+        self.vtk_image = image_bridge.numpy_to_vtk_image(numpy_array)
+        self.statistics = statistics
+        self.scalar_range = None
+        return self.vtk_image
+    
+    def data_range(self) -> tuple:
+        if self.statistics is not None:
+            return self.statistics['min'], self.statistics['max']
+        if self.vtk_image is None:
+            return 0.0, 255.0
+        # Without precomputed statistics the range is scanned once per image.
+        if self.scalar_range is None:
+            self.scalar_range = self.vtk_image.GetScalarRange()
+        return self.scalar_range
+    
+    def default_isovalue(self) -> float:
+        if self.statistics is not None:
+            return volume_stats.otsu_threshold(self.statistics)
+        low, high = self.data_range()
+        return (low + high) / 2.0
     
     def create_volume_mapper(self):
         if self.vtk_image is None:
             raise ValueError("No VTK image data available")
         
+        if not self.use_gpu:
+            self.volume_mapper = vtk.vtkFixedPointVolumeRayCastMapper()
+            self.volume_mapper.SetInputData(self.vtk_image)
+            return
+        
         try:
             self.volume_mapper = vtk.vtkGPUVolumeRayCastMapper()
             self.volume_mapper.SetInputData(self.vtk_image)
@@ -55,10 +82,7 @@ class VolumeRenderer:
         color_func = vtk.vtkColorTransferFunction()
         
         if data_range is None:
-            if self.vtk_image:
-                data_range = self.vtk_image.GetScalarRange()
-            else:
-                data_range = (0.0, 255.0)
+            data_range = self.data_range()
         
         color_func.AddRGBPoint(data_range[0], *low_color)
         color_func.AddRGBPoint(data_range[1] * 0.25, *low_color)
@@ -73,15 +97,14 @@ class VolumeRenderer:
     
     def create_opacity_function(self, 
                                opacity: float = 0.5,
-                               isovalue: float = 128.0,
+                               isovalue: float = None,
                                data_range = None) -> vtk.vtkPiecewiseFunction:
         opacity_func = vtk.vtkPiecewiseFunction()
         
         if data_range is None:
-            if self.vtk_image:
-                data_range = self.vtk_image.GetScalarRange()
-            else:
-                data_range = (0.0, 255.0)
+            data_range = self.data_range()
+        if isovalue is None:
+            isovalue = self.default_isovalue()
         
         opacity_func.AddPoint(data_range[0], 0.0)
         opacity_func.AddPoint(isovalue - 10, 0.0)
@@ -107,41 +130,55 @@ class VolumeRenderer:
         
         return gradient_func
     
-    def create_volume_property(self, 
-                              low_color = (0.0, 0.2, 0.4),
-                              high_color = (1.0, 0.8, 0.6),
-                              opacity: float = 0.3,
-                              isovalue: float = 128.0) -> vtk.vtkVolumeProperty:
-        self.volume_property = vtk.vtkVolumeProperty()
+    def fill_transfer_functions(self, 
+                                low_color = (0.0, 0.2, 0.4),
+                                high_color = (1.0, 0.8, 0.6),
+                                opacity: float = 0.3,
+                                isovalue: float = None):
+        data_min, data_max = self.data_range()
+        if isovalue is None:
+            isovalue = self.default_isovalue()
         
-        if self.vtk_image:
-            data_range = self.vtk_image.GetScalarRange()
-            data_min, data_max = data_range
-        else:
-            data_min, data_max = 0.0, 255.0
+        if self.color_transfer is None:
+            self.color_transfer = vtk.vtkColorTransferFunction()
+            self.opacity_transfer = vtk.vtkPiecewiseFunction()
+            self.gradient_opacity = vtk.vtkPiecewiseFunction()
         
-        color_transfer = vtk.vtkColorTransferFunction()
+        color_transfer = self.color_transfer
+        color_transfer.RemoveAllPoints()
         color_transfer.AddRGBPoint(data_min, 0.0, 0.0, 0.0)
         color_transfer.AddRGBPoint(data_min + (data_max - data_min) * 0.3, low_color[0], low_color[1], low_color[2])
         color_transfer.AddRGBPoint(data_min + (data_max - data_min) * 0.7, high_color[0], high_color[1], high_color[2])
         color_transfer.AddRGBPoint(data_max, 1.0, 1.0, 1.0)
         
-        opacity_transfer = vtk.vtkPiecewiseFunction()
+        opacity_transfer = self.opacity_transfer
+        opacity_transfer.RemoveAllPoints()
         opacity_transfer.AddPoint(data_min, 0.0)
         opacity_transfer.AddPoint(isovalue - abs(data_max - data_min) * 0.1, 0.0)
         opacity_transfer.AddPoint(isovalue, opacity * 0.5)
         opacity_transfer.AddPoint(isovalue + (data_max - isovalue) * 0.5, opacity * 0.8)
         opacity_transfer.AddPoint(data_max, opacity)
         
-        gradient_opacity = vtk.vtkPiecewiseFunction()
+        gradient_opacity = self.gradient_opacity
+        gradient_opacity.RemoveAllPoints()
         gradient_range = abs(data_max - data_min) * 0.1
         gradient_opacity.AddPoint(0, 0.0)
         gradient_opacity.AddPoint(gradient_range * 0.5, 0.3)
         gradient_opacity.AddPoint(gradient_range, 1.0)
+    
+    def create_volume_property(self, 
+                              low_color = (0.0, 0.2, 0.4),
+                              high_color = (1.0, 0.8, 0.6),
+                              opacity: float = 0.3,
+                              isovalue: float = None) -> vtk.vtkVolumeProperty:
+        if self.volume_property is None:
+            self.volume_property = vtk.vtkVolumeProperty()
+        
+        self.fill_transfer_functions(low_color, high_color, opacity, isovalue)
         
-        self.volume_property.SetColor(color_transfer)
-        self.volume_property.SetScalarOpacity(opacity_transfer)
-        self.volume_property.SetGradientOpacity(gradient_opacity)
+        self.volume_property.SetColor(self.color_transfer)
+        self.volume_property.SetScalarOpacity(self.opacity_transfer)
+        self.volume_property.SetGradientOpacity(self.gradient_opacity)
         self.volume_property.SetInterpolationTypeToLinear()
         self.volume_property.ShadeOn()
         self.volume_property.SetAmbient(0.4)
@@ -160,18 +197,77 @@ class VolumeRenderer:
         
         return self.volume
     
+    @timed('render.volume_lod')
+    def build_volume_pyramid(self, levels: int = 3) -> list:
+        if self.vtk_image is None:
+            raise ValueError("No VTK image data available")
+        
+        if self.pyramid_source is self.vtk_image and len(self.pyramid) >= levels - 1:
+            return self.pyramid[:levels - 1]
+        
+        self.pyramid = []
+        source = self.vtk_image
+        for level in range(1, levels):
+            dimensions = source.GetDimensions()
+            if min(dimensions) < 4:
+                break
+            
+            shrink = vtk.vtkImageShrink3D()
+            shrink.SetInputData(source)
+            shrink.SetShrinkFactors(2, 2, 2)
+            shrink.AveragingOn()
+            shrink.Update()
+            
+            source = shrink.GetOutput()
+            self.pyramid.append(source)
+        
+        self.pyramid_source = self.vtk_image
+        return self.pyramid
+    
+    def create_lod_volume(self, levels: int = 3) -> vtk.vtkLODProp3D:
+        if self.vtk_image is None or self.volume_property is None:
+            raise ValueError("Volume image and property must be created first")
+        
+        # Level 0 is the full-resolution volume; the coarser levels come from the
+        # pyramid, in lod_ids order. The viewer selects the level per frame,
+        # and every mapper additionally coarsens its ray spacing to stay
+        # within the time the render window allocates.
+        lod_volume = vtk.vtkLODProp3D()
+        
+        full_mapper = vtk.vtkFixedPointVolumeRayCastMapper()
+        full_mapper.SetInputData(self.vtk_image)
+        full_mapper.AutoAdjustSampleDistancesOn()
+        lod_id = lod_volume.AddLOD(full_mapper, self.volume_property, 0.0)
+        lod_volume.SetLODLevel(lod_id, 0.0)
+        self.lod_ids = [lod_id]
+        
+        for level, image in enumerate(self.build_volume_pyramid(levels), start=1):
+            mapper = vtk.vtkFixedPointVolumeRayCastMapper()
+            mapper.SetInputData(image)
+            mapper.AutoAdjustSampleDistancesOn()
+            mapper.SetSampleDistance(min(image.GetSpacing()))
+            lod_id = lod_volume.AddLOD(mapper, self.volume_property, 0.0)
+            lod_volume.SetLODLevel(lod_id, float(level))
+            self.lod_ids.append(lod_id)
+        
+        lod_volume.AutomaticLODSelectionOff()
+        lod_volume.SetSelectedLODID(self.lod_ids[0])
+        
+        self.volume_mapper = full_mapper
+        self.volume = lod_volume
+        return self.volume
+    
     def update_volume_properties(self, 
                                 low_color,
                                 high_color,
-                                opacity: float):
+                                opacity: float,
+                                isovalue: float = None):
         if self.volume_property is None:
             return
-            
-        color_func = self.create_color_transfer_function(low_color, high_color)
-        self.volume_property.SetColor(color_func)
         
-        opacity_func = self.create_opacity_function(opacity)
-        self.volume_property.SetScalarOpacity(opacity_func)
+        # Editing the existing transfer functions keeps the mapper and the
+        # uploaded volume untouched; only the lookup tables change.
+        self.fill_transfer_functions(low_color, high_color, opacity, isovalue)
     
     def get_volume_info(self) -> dict:
         if self.vtk_image is None:
@@ -179,7 +275,7 @@ class VolumeRenderer:
         
         dimensions = self.vtk_image.GetDimensions()
         spacing = self.vtk_image.GetSpacing()
-        scalar_range = self.vtk_image.GetScalarRange()
+        scalar_range = self.data_range()
         
         return {
             'dimensions': dimensions,
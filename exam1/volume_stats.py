@@ -0,0 +1,150 @@
+import math
+
+import numpy as np
+
+
+HISTOGRAM_BINS = (256, 4096)
+
+# Planes are processed in chunks of about this many voxels to bound the
+# temporaries of the single pass.
+CHUNK_VOXELS = 16 * 1024 * 1024
+
+
+def dkw_bound(samples: int, confidence: float = 0.99) -> float:
+    # Dvoretzky-Kiefer-Wolfowitz: with probability `confidence` the sampled
+    # CDF is within this distance of the true CDF everywhere, so every
+    # quantile (and histogram mass) read from it is off by at most that much.
+    if samples <= 0:
+        return 1.0
+    return math.sqrt(math.log(2.0 / (1.0 - confidence)) / (2.0 * samples))
+
+
+def _chunks(array: np.ndarray):
+    if array.ndim == 0:
+        yield array.reshape(1)
+        return
+    plane = max(1, int(np.prod(array.shape[1:], dtype=np.int64)))
+    step = max(1, CHUNK_VOXELS // plane)
+    for start in range(0, array.shape[0], step):
+        yield np.asarray(array[start:start + step]).reshape(-1)
+
+
+def _rebin(counts: np.ndarray, low: float, high: float, full_low: int, bins: int) -> np.ndarray:
+    # Map a one-bin-per-integer histogram onto `bins` equal-width bins.
+    values = np.arange(counts.size, dtype=np.float64) + full_low
+    if high > low:
+        index = np.minimum(((values - low) * bins / (high - low)).astype(np.int64), bins - 1)
+    else:
+        index = np.zeros(counts.size, dtype=np.int64)
+    return np.bincount(index, weights=counts, minlength=bins).astype(np.int64)
+
+
+def _integer_statistics(array: np.ndarray, bins: tuple) -> dict:
+    # Integer data of at most 16 bits gets one exact per-value histogram in a
+    # single pass; min, max, mean, std and the coarser histograms all follow
+    # from it without touching the voxels again.
+    limits = np.iinfo(array.dtype)
+    counts = np.zeros(int(limits.max) - int(limits.min) + 1, dtype=np.int64)
+    for chunk in _chunks(array):
+        if limits.min < 0:
+            chunk = chunk.astype(np.int32) - int(limits.min)
+        counts += np.bincount(chunk, minlength=counts.size)
+
+    present = np.flatnonzero(counts)
+    low = int(present[0]) + int(limits.min)
+    high = int(present[-1]) + int(limits.min)
+    counts = counts[present[0]:present[-1] + 1]
+    values = np.arange(low, high + 1, dtype=np.float64)
+    voxels = int(counts.sum())
+    mean = float(np.dot(counts, values) / voxels)
+    variance = float(np.dot(counts, (values - mean) ** 2) / max(1, voxels - 1))
+
+    return {
+        'min': float(low),
+        'max': float(high),
+        'mean': mean,
+        'std': math.sqrt(variance),
+        'voxels': voxels,
+        'histograms': {n: _rebin(counts, low, high, low, n) for n in bins}
+    }
+
+
+def _float_statistics(array: np.ndarray, bins: tuple) -> dict:
+    low = np.inf
+    high = -np.inf
+    for chunk in _chunks(array):
+        low = min(low, float(chunk.min()))
+        high = max(high, float(chunk.max()))
+
+    histograms = {n: np.zeros(n, dtype=np.int64) for n in bins}
+    total = 0.0
+    total_squares = 0.0
+    voxels = 0
+    for chunk in _chunks(array):
+        chunk = chunk.astype(np.float64)
+        total += float(chunk.sum())
+        total_squares += float(np.dot(chunk, chunk))
+        voxels += chunk.size
+        for n in bins:
+            histograms[n] += np.histogram(chunk, bins=n, range=(low, high if high > low else low + 1))[0]
+
+    mean = total / voxels
+    variance = (total_squares - voxels * mean * mean) / max(1, voxels - 1)
+    return {
+        'min': low,
+        'max': high,
+        'mean': mean,
+        'std': math.sqrt(max(0.0, variance)),
+        'voxels': voxels,
+        'histograms': histograms
+    }
+
+
+def compute_statistics(array: np.ndarray, bins: tuple = HISTOGRAM_BINS, max_samples: int = None,
+                       confidence: float = 0.99, seed: int = 0) -> dict:
+    if array.size == 0:
+        raise ValueError("Cannot compute statistics of an empty volume")
+
+    sampled = max_samples is not None and array.size > max_samples
+    data = array
+    if sampled:
+        # Uniform random voxels (sorted for locality when the array is memory
+        # mapped); min/max become estimates and the histograms carry the DKW
+        # error bound.
+        rng = np.random.default_rng(seed)
+        index = np.sort(rng.integers(0, array.size, int(max_samples)))
+        data = np.asarray(array).reshape(-1)[index]
+
+    if data.dtype.kind in 'iub' and data.dtype.itemsize <= 2:
+        stats = _integer_statistics(data.view(np.uint8) if data.dtype == np.bool_ else data, bins)
+    else:
+        stats = _float_statistics(data, bins)
+
+    stats.update({
+        'voxels': int(array.size),
+        'samples': int(data.size),
+        'sampled': sampled,
+        'confidence': confidence,
+        'cdf_error': dkw_bound(data.size, confidence) if sampled else 0.0
+    })
+    return stats
+
+
+def histogram_quantile(stats: dict, quantile: float, bins: int = 4096) -> float:
+    counts = stats['histograms'][bins]
+    cumulative = np.cumsum(counts) / max(1, counts.sum())
+    index = int(np.searchsorted(cumulative, quantile))
+    return stats['min'] + (stats['max'] - stats['min']) * (index + 0.5) / bins
+
+
+def otsu_threshold(stats: dict, bins: int = 256) -> float:
+    counts = stats['histograms'][bins].astype(np.float64)
+    centres = np.arange(bins) + 0.5
+    weight_low = np.cumsum(counts)
+    weight_high = weight_low[-1] - weight_low
+    mass_low = np.cumsum(counts * centres)
+    mean_low = mass_low / np.maximum(weight_low, 1e-12)
+    mean_high = (mass_low[-1] - mass_low) / np.maximum(weight_high, 1e-12)
+    between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    index = int(np.argmax(between[:-1])) if bins > 1 else 0
+    return stats['min'] + (stats['max'] - stats['min']) * (index + 1) / bins